@@ -0,0 +1,108 @@
+"""
+声纹提取基准测试：SpeakerEngine.diarize 逐窗口 (batch 1) 与整批推理的对比
+
+    python -m benchmarks.bench_diarize --minutes 10 --batch 1 16 32 64
+    python -m benchmarks.bench_diarize --minutes 60 --threads 4 --target 10 --out diarize.json   # 加速比低于 10x 返回 1
+    python -m benchmarks.bench_diarize --minutes 10 --batch 32 --step 0.25 --compare-features    # 共享 Fbank vs 逐窗口特征
+
+在合成会议上测量墙钟时间、窗口吞吐、x 实时与阶段内峰值内存，并以 batch 1 的时间轴为参照统计说话人标签一致率
+(逐窗口特征下整批与逐窗口推理应给出相同的结果；共享特征受 top_db 截断与窗口上下文影响，结果可能略有差异)。未安装 SpeechBrain 时声纹为随机向量，只能反映调度开销。
+"""
+import os
+import sys
+import json
+import itertools
+import time
+import argparse
+import tempfile
+import numpy as np
+
+SR = 16000
+
+def _labels(timeline, audio_s, hop=0.1):
+    """时间轴按 hop 秒采样为说话人标签序列 (无片段处为空串)"""
+    labels = np.full(int(audio_s / hop), "", dtype=object)
+    for seg in timeline:
+        labels[int(seg["start"] / hop):int(seg["end"] / hop)] = seg["speaker"]
+    return labels
+
+def run(minutes, args, res_dir):
+    from benchmarks.synth import make_meeting
+    from benchmarks.run_pipeline import StageMeter, _enroll
+    from utilities.diarization.engine import SpeakerEngine
+    audio, _, speakers = make_meeting(minutes, n_speakers=args.speakers, seed=args.seed)
+    audio_s = len(audio) / SR
+    _enroll(res_dir, speakers, lambda msg: None)
+    engine = SpeakerEngine(os.path.join(res_dir, "speakers.db"))
+    engine.db.load_model()
+    n_windows = int((audio_s - args.window) / args.step) + 1
+    modes = ["per-window", "shared"] if args.compare_features else ["shared"]
+    rows, ref = [], None
+    try:
+        for batch, mode in itertools.product(args.batch, modes):
+            with StageMeter() as m:
+                timeline = engine.diarize(audio, sr=SR, window_sec=args.window, step_sec=args.step, auto_unload=False,
+                                          batch_size=batch, shared_features=mode == "shared")
+            labels = _labels(timeline, audio_s)
+            if ref is None: ref = labels
+            row = {"batch": batch, "features": mode, "wall_s": round(m.wall, 3), "windows_per_s": round(n_windows / max(m.wall, 1e-9), 1),
+                   "x_realtime": round(audio_s / max(m.wall, 1e-9), 1), "rss_delta_mb": round(m.peak - m.base, 1),
+                   "segments": len(timeline), "agreement": round(float(np.mean(labels == ref)), 4)}
+            rows.append(row)
+            print(f"[Bench] {minutes:g} min / batch {batch} / {mode} features: {m.wall:.2f}s ({row['windows_per_s']:.0f} windows/s)", flush=True)
+    finally:
+        engine.db.unload_model()
+    base = rows[0]["wall_s"]
+    for row in rows: row["speedup"] = round(base / max(row["wall_s"], 1e-9), 2)
+    return {"minutes": minutes, "audio_s": round(audio_s, 2), "windows": n_windows, "results": rows}
+
+def format_table(report):
+    header = f"{'Min':>5}{'Batch':>7}{'Features':>12}{'Wall(s)':>10}{'Win/s':>9}{'xRT':>8}{'Speedup':>9}{'+MB':>7}{'Agree':>8}"
+    lines = [header, "-" * len(header)]
+    for r in report["runs"]:
+        for s in r["results"]:
+            lines.append(f"{r['minutes']:>5g}{s['batch']:>7}{s['features']:>12}{s['wall_s']:>10.2f}{s['windows_per_s']:>9.0f}{s['x_realtime']:>8.1f}"
+                         f"{s['speedup']:>9.2f}{s['rss_delta_mb']:>7.0f}{s['agreement']:>8.3f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_diarize", description="声纹提取基准测试 (逐窗口 vs 整批)")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10], help="合成会议时长 (分钟)")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 32, 64], help="待比较的 batch 大小，第一个为基准")
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU 线程数 (默认不修改)")
+    parser.add_argument("--window", type=float, default=1.5)
+    parser.add_argument("--step", type=float, default=0.75)
+    parser.add_argument("--compare-features", action="store_true", help="每个 batch 另测逐窗口计算特征 (第一行为基准)")
+    parser.add_argument("--speakers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", type=float, default=None, help="最快 batch 相对基准需达到的加速比，低于此值返回 1")
+    parser.add_argument("--out", default=None, help="JSON 报告路径")
+    args = parser.parse_args(argv)
+
+    from utilities.diarization.speaker_db import has_model
+    from utilities.model_manager import set_torch_threads
+    set_torch_threads(args.threads)
+    simulated = not has_model()
+    if simulated: print("!!! SpeechBrain not installed: embeddings are simulated, timings only reflect overhead.")
+
+    report = {"meta": {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "args": vars(args), "simulated": simulated},
+              "runs": []}
+    with tempfile.TemporaryDirectory(prefix="ima_bench_diarize_") as res_dir:
+        for minutes in args.minutes:
+            print(f">>> Synthesizing {minutes:g} min meeting...", flush=True)
+            report["runs"].append(run(minutes, args, res_dir))
+    print("\n" + format_table(report))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report saved: {args.out}")
+
+    if args.target and not simulated:
+        slow = [f"{r['minutes']:g} min: {max(s['speedup'] for s in r['results']):.1f}x" for r in report["runs"]
+                if max(s["speedup"] for s in r["results"]) < args.target]
+        if slow:
+            print(f"\n!!! Below {args.target:g}x speedup:\n  " + "\n  ".join(slow))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+VAD 基准测试：对比旧的逐帧 Python 循环实现与向量化的 FrameVAD
+
+    python -m benchmarks.bench_vad --minutes 10 60
+    python -m benchmarks.bench_vad --minutes 60 --target 20 --out vad.json   # 新实现低于 20x 实时返回 1
+
+在合成会议上测量墙钟时间、x 实时、阶段内峰值内存，并以标注的发言区间为参照统计帧级准确率 / 召回率。
+"""
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+SR = 16000
+FRAME_SEC = 0.03
+
+def _truth(turns, n_frames):
+    gt = np.zeros(n_frames, dtype=bool)
+    for t in turns: gt[int(t["start"] / FRAME_SEC):int(t["end"] / FRAME_SEC)] = True
+    return gt
+
+def _scores(mask, gt):
+    n = min(len(mask), len(gt))
+    mask, gt = mask[:n], gt[:n]
+    return {"speech_ratio": round(float(mask.mean()), 4), "accuracy": round(float((mask == gt).mean()), 4),
+            "recall": round(float(mask[gt].mean()) if gt.any() else 0.0, 4),
+            "false_alarm": round(float(mask[~gt].mean()) if (~gt).any() else 0.0, 4)}
+
+def _candidates(agg):
+    """[(名称, 计时的调用, 取掩码的调用)]；未安装 webrtcvad 时跳过对应项"""
+    from core.processors import SimpleEnergyVAD, AdvancedVAD
+    from utilities.audio_processor.vad_engine import FrameVAD
+    legacy = SimpleEnergyVAD(0.005 * (agg + 1))
+    cands = [("legacy energy", lambda a: legacy.process(a, sr=SR), lambda a: legacy.speech_mask(a, sr=SR))]
+    if AdvancedVAD:
+        old = AdvancedVAD(aggressiveness=agg, sr=SR)
+        cands.append(("legacy webrtc", lambda a: old.process(a, sr=SR), lambda a: old.speech_mask(a, sr=SR)))
+    fast = FrameVAD(agg, sr=SR, backend="energy")
+    cands.append(("FrameVAD energy", fast.speech_mask, fast.speech_mask))
+    try:
+        fast_rtc = FrameVAD(agg, sr=SR, backend="webrtc")
+        cands.append(("FrameVAD webrtc", fast_rtc.speech_mask, fast_rtc.speech_mask))
+    except ImportError:
+        pass
+    return cands
+
+def run(minutes, args):
+    from benchmarks.synth import make_meeting
+    from benchmarks.run_pipeline import StageMeter
+    audio, turns, _ = make_meeting(minutes, n_speakers=args.speakers, seed=args.seed, snr_db=args.snr)
+    audio_s = len(audio) / SR
+    gt = _truth(turns, int(audio_s / FRAME_SEC))
+    rows = []
+    for name, timed, get_mask in _candidates(args.aggressiveness):
+        best = None
+        for _ in range(args.repeat):
+            with StageMeter() as m: timed(audio)
+            if best is None or m.wall < best.wall: best = m
+        row = {"method": name, "wall_s": round(best.wall, 4), "x_realtime": round(audio_s / max(best.wall, 1e-9), 1),
+               "peak_rss_mb": round(best.peak, 1), "rss_delta_mb": round(best.peak - best.base, 1)}
+        row.update(_scores(np.asarray(get_mask(audio), dtype=bool), gt))
+        rows.append(row)
+        print(f"[Bench] {minutes:g} min / {name}: {best.wall:.3f}s ({row['x_realtime']:.0f}x RT)", flush=True)
+    return {"minutes": minutes, "audio_s": round(audio_s, 2), "results": rows}
+
+def format_table(report):
+    header = f"{'Min':>5}  {'Method':<17}{'Wall(s)':>9}{'xRT':>9}{'+MB':>8}{'Speech':>8}{'Acc':>7}{'Recall':>8}{'FA':>7}"
+    lines = [header, "-" * len(header)]
+    for r in report["runs"]:
+        for s in r["results"]:
+            lines.append(f"{r['minutes']:>5g}  {s['method']:<17}{s['wall_s']:>9.3f}{s['x_realtime']:>9.0f}{s['rss_delta_mb']:>8.0f}"
+                         f"{s['speech_ratio']:>8.2f}{s['accuracy']:>7.2f}{s['recall']:>8.2f}{s['false_alarm']:>7.2f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_vad", description="VAD 基准测试 (旧实现 vs FrameVAD)")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 60], help="合成会议时长 (分钟)")
+    parser.add_argument("--speakers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--snr", type=float, default=20.0, help="背景噪声信噪比 (dB)")
+    parser.add_argument("--aggressiveness", type=int, default=3, choices=[0, 1, 2, 3])
+    parser.add_argument("--repeat", type=int, default=3, help="每种方法重复次数，取最快一次")
+    parser.add_argument("--target", type=float, default=20.0, help="FrameVAD 需达到的 x 实时，低于此值返回 1")
+    parser.add_argument("--out", default=None, help="JSON 报告路径")
+    args = parser.parse_args(argv)
+
+    report = {"meta": {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "args": vars(args)}, "runs": []}
+    for minutes in args.minutes:
+        print(f">>> Synthesizing {minutes:g} min meeting...", flush=True)
+        report["runs"].append(run(minutes, args))
+    print("\n" + format_table(report))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report saved: {args.out}")
+
+    slow = [f"{r['minutes']:g} min / {s['method']}: {s['x_realtime']:.0f}x" for r in report["runs"]
+            for s in r["results"] if s["method"].startswith("FrameVAD") and s["x_realtime"] < args.target]
+    if slow:
+        print(f"\n!!! Below {args.target:g}x real-time:\n  " + "\n  ".join(slow))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
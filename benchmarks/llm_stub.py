@@ -0,0 +1,78 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 固定的结构化纪要，字段与 meeting_extractor 的 Prompt 一致
+STUB_SUMMARY = {
+    "会议主题": "Benchmark Meeting",
+    "参与人员": [{"姓名": "Alice", "职位": "PM"}, {"姓名": "Bob", "职位": "Engineer"}],
+    "重要决定": ["Ship the build after the regression check."],
+    "行动项": [{"任务": "Review benchmark report", "负责人": "Alice", "截止时间": "Friday"}],
+    "问题与风险": ["Synthetic audio only."],
+    "会议总结": "Stub response generated by benchmarks/llm_stub.py."
+}
+
+class StubLLMServer:
+    """
+    本地 LLM 桩服务，用于在无网络、无 GPU 的环境下测量 LLM 节点自身的开销：
+    - Ollama:  POST /api/chat            (meeting_extractor.py，通过 OLLAMA_HOST 指向本服务)
+    - OpenAI:  POST .../chat/completions (meeting_extractor_ol.py，通过 IMA_LLM_BASE_URL 指向本服务)
+    latency 模拟模型生成耗时 (秒)。
+    """
+
+    def __init__(self, latency=0.5, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stub.requests += 1
+                time.sleep(stub.latency)
+                content = json.dumps(STUB_SUMMARY, ensure_ascii=False)
+                model = body.get("model", "stub")
+                if self.path.rstrip("/").endswith("/api/chat"):
+                    reply = {"model": model, "created_at": "1970-01-01T00:00:00Z",
+                             "message": {"role": "assistant", "content": content},
+                             "done": True, "done_reason": "stop"}
+                elif self.path.rstrip("/").endswith("/chat/completions"):
+                    reply = {"id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                             "choices": [{"index": 0, "finish_reason": "stop",
+                                          "message": {"role": "assistant", "content": content}}],
+                             "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}}
+                else:
+                    self.send_error(404); return
+                data = json.dumps(reply, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
\ No newline at end of file
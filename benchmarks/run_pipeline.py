@@ -0,0 +1,248 @@
+"""
+端到端管道基准测试 (CPU)：
+
+    python -m benchmarks.run_pipeline --minutes 1 10 60 --out bench.json
+    python -m benchmarks.run_pipeline --minutes 1 --baseline bench.json   # 与基线对比，RTF 退化时返回 1
+
+对每段合成会议依次运行 Source -> Enhancer -> VAD -> Speaker ID -> Whisper ASR -> LLM (本地桩)，
+记录每个阶段的墙钟时间、进程 CPU 时间、实时率 (RTF)、吞吐 (x 实时)、阶段内峰值内存与模型加载耗时。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import subprocess
+import threading
+
+SR = 16000
+
+class StageMeter:
+    """测量一个阶段：墙钟 / 进程 CPU 时间，并用后台线程采样阶段内的 RSS 峰值"""
+
+    def __init__(self, interval=0.02):
+        from core.tracing import rss_mb
+        self.rss_mb = rss_mb
+        self.interval = interval
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss_mb())
+
+    def __enter__(self):
+        self.base = self.peak = self.rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self.t0, self.c0 = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self.t0
+        self.cpu = time.process_time() - self.c0
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss_mb())
+
+def _stages(args):
+    return [
+        ("Audio Source", {'mode': 'file'}),
+        ("Audio Enhancer", {'enable': True}),
+        ("VAD Detector", {'aggressiveness': 3}),
+        ("Speaker ID", {'window': 1.5, 'step': 0.75}),
+        ("Whisper ASR", {'model': args.asr_model, 'full_text_correction': False, 'enhanced_audio': False}),
+        ("LLM Summary", {'enable': True, 'backend': args.llm_backend}),
+    ]
+
+def _processors(res_dir):
+    from core.processors import (SourceProcessor, EnhancerProcessor, VADProcessor,
+                                 SpeakerIDProcessor, ASRProcessor, LLMProcessor)
+    procs = {
+        "Audio Source": SourceProcessor(res_dir),
+        "Audio Enhancer": EnhancerProcessor(),
+        "VAD Detector": VADProcessor(),
+        "Speaker ID": SpeakerIDProcessor(res_dir),
+        "Whisper ASR": ASRProcessor(res_dir),
+        "LLM Summary": LLMProcessor(),
+    }
+    return procs
+
+def _items(label, ctx):
+    """各阶段的处理单元数，用于计算吞吐 (items/s)"""
+    if label == "Speaker ID": return len(ctx.get('timeline', []))
+    if label == "Whisper ASR": return len(ctx.get('transcript_lines', []))
+    return None
+
+def _enroll(res_dir, speakers, log):
+    """把合成说话人录入基准专用的声纹库，使 Speaker ID 的匹配路径被真实执行"""
+    import soundfile as sf
+    from utilities.diarization.speaker_db import SpeakerDB
+    from benchmarks.synth import enrollment_clip
+    db = SpeakerDB(os.path.join(res_dir, "speakers.db"))
+    enrolled = {row[0] for row in db.get_all_speakers()}
+    clip_dir = os.path.join(res_dir, "enroll")
+    os.makedirs(clip_dir, exist_ok=True)
+    for i, spk in enumerate(speakers):
+        if spk["name"] in enrolled: continue
+        path = os.path.join(clip_dir, f"{spk['name']}.wav")
+        sf.write(path, enrollment_clip(spk, i), SR)
+        ok, msg = db.add_speaker(spk["name"], spk.get("title", ""), path)
+        log(f"[Enroll] {spk['name']}: {msg}")
+    db.unload_model()
+
+def run_meeting(wav_path, procs, stages, log):
+    """依次运行各阶段，返回 (阶段统计列表, 音频时长)"""
+    from core.cancel import CancelToken
+    from core.tracing import Tracer
+    tracer = Tracer("IMA Benchmark")
+    ctx = {'tracer': tracer}
+    token = CancelToken()
+    audio_s = None
+    results = []
+    for label, cfg in stages:
+        cfg = dict(cfg, file_path=wav_path) if label == "Audio Source" else cfg
+        n_events = len(tracer.events)
+        with StageMeter() as m:
+            ctx = procs[label].process(ctx, cfg, log, token, lambda p: None)
+        if audio_s is None: audio_s = ctx['orig_audio'].duration
+        load_s = sum(e["dur"] for e in tracer.events[n_events:] if e["name"].startswith("model load")) / 1e6
+        items = _items(label, ctx)
+        results.append({
+            "stage": label,
+            "wall_s": round(m.wall, 3),
+            "cpu_s": round(m.cpu, 3),
+            "rtf": round(m.wall / audio_s, 4),
+            "rtf_excl_load": round(max(m.wall - load_s, 0.0) / audio_s, 4),
+            "x_realtime": round(audio_s / m.wall, 2) if m.wall > 0 else None,
+            "model_load_s": round(load_s, 3),
+            "peak_rss_mb": round(m.peak, 1),
+            "rss_delta_mb": round(m.peak - m.base, 1),
+            "items": items,
+            "items_per_s": round(items / m.wall, 2) if items and m.wall > 0 else None,
+        })
+        log(f"[Bench] {label}: {m.wall:.2f}s (RTF {m.wall / audio_s:.3f}, peak {m.peak:.0f} MB)")
+    return results, audio_s
+
+def _meta(args):
+    meta = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "device": "cpu",
+            "args": {k: v for k, v in vars(args).items() if k != "func"}}
+    try:
+        import torch
+        meta["torch"] = torch.__version__
+        meta["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    try:
+        meta["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                        text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        meta["commit"] = None
+    return meta
+
+def compare(report, baseline, tolerance):
+    """按 (时长, 阶段) 对比 RTF，返回退化项列表；绝对差小于 0.005 视为噪声"""
+    old = {(r["minutes"], s["stage"]): s["rtf"] for r in baseline.get("runs", []) for s in r["stages"]}
+    regressions = []
+    for r in report["runs"]:
+        for s in r["stages"]:
+            prev = old.get((r["minutes"], s["stage"]))
+            if prev is None: continue
+            if s["rtf"] > prev * (1 + tolerance) and s["rtf"] - prev > 0.005:
+                regressions.append(f"{r['minutes']:g} min / {s['stage']}: RTF {prev:.4f} -> {s['rtf']:.4f}")
+    return regressions
+
+def format_table(report):
+    header = f"{'Min':>5}  {'Stage':<16}{'Wall(s)':>9}{'RTF':>9}{'xRT':>9}{'Load(s)':>9}{'Peak(MB)':>10}"
+    lines = [header, "-" * len(header)]
+    for r in report["runs"]:
+        for s in r["stages"]:
+            xrt = f"{s['x_realtime']:.1f}" if s["x_realtime"] else "-"
+            lines.append(f"{r['minutes']:>5g}  {s['stage']:<16}{s['wall_s']:>9.2f}{s['rtf']:>9.4f}{xrt:>9}"
+                         f"{s['model_load_s']:>9.2f}{s['peak_rss_mb']:>10.0f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run_pipeline", description="IMA 管道基准测试 (合成会议, CPU)")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60], help="合成会议时长 (分钟)")
+    parser.add_argument("--speakers", type=int, default=4, help="说话人数 (最多 6 个合成音色)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--snr", type=float, default=20.0, help="背景噪声信噪比 (dB)")
+    parser.add_argument("--clips", default=None, help="可选：真实语音片段目录 (每个子目录/文件为一个说话人)")
+    parser.add_argument("--asr-model", default="tiny", help="Whisper 模型大小")
+    parser.add_argument("--llm-backend", default="Local", choices=["Local", "Online"], help="LLM 节点后端 (均指向本地桩)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="LLM 桩的模拟生成耗时 (秒)")
+    parser.add_argument("--warm", action="store_true", help="先用短音频预热并保留模型，排除模型加载时间")
+    parser.add_argument("--work", default=os.path.join(tempfile.gettempdir(), "ima_bench"), help="工作目录 (合成音频、资源目录)")
+    parser.add_argument("--out", default=None, help="JSON 报告路径 (默认 <work>/bench_<时间>.json)")
+    parser.add_argument("--baseline", default=None, help="基线 JSON，RTF 退化超过 --tolerance 时返回 1")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的 RTF 相对退化 (默认 20%%)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    def log(msg, is_result=False):
+        if args.verbose or (not is_result and msg.startswith(("[Bench]", "[Enroll]"))): print(msg, flush=True)
+
+    # 强制 CPU；LLM 客户端在导入时读取地址，须在导入处理器之前设置
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    from benchmarks.llm_stub import StubLLMServer
+    stub = StubLLMServer(latency=args.llm_latency).start()
+    os.environ["OLLAMA_HOST"] = stub.url
+    os.environ["IMA_LLM_BASE_URL"] = f"{stub.url}/v1"
+    from benchmarks.synth import write_meeting
+
+    res_dir = os.path.join(args.work, "resource")
+    if os.path.exists(res_dir): shutil.rmtree(res_dir)
+    input_dir = os.path.join(args.work, "inputs")
+    # --warm 时模型常驻，否则每个阶段结束即卸载 (冷启动耗时计入 model_load_s)
+    from utilities.model_manager import MODELS, AUTO_UNLOAD, KEEP_WARM
+    MODELS.configure(policy=KEEP_WARM if args.warm else AUTO_UNLOAD, idle_timeout=0)
+    procs = _processors(res_dir)
+    stages = _stages(args)
+    synth_kw = dict(n_speakers=args.speakers, seed=args.seed, snr_db=args.snr, clips_dir=args.clips)
+
+    report = {"meta": _meta(args), "runs": []}
+    try:
+        if args.warm:
+            print(">>> Warm-up (0.25 min)...")
+            wav, speakers = write_meeting(input_dir, 0.25, **synth_kw)
+            _enroll(res_dir, speakers, log)
+            run_meeting(wav, procs, stages, lambda *a, **k: None)
+        for minutes in args.minutes:
+            print(f">>> Synthesizing {minutes:g} min meeting...")
+            t0 = time.perf_counter()
+            wav, speakers = write_meeting(input_dir, minutes, **synth_kw)
+            synth_s = time.perf_counter() - t0
+            _enroll(res_dir, speakers, log)
+            stage_stats, audio_s = run_meeting(wav, procs, stages, log)
+            wall = sum(s["wall_s"] for s in stage_stats)
+            report["runs"].append({
+                "minutes": minutes, "audio_s": round(audio_s, 2), "speakers": len(speakers), "synth_s": round(synth_s, 2),
+                "stages": stage_stats,
+                "total": {"wall_s": round(wall, 3), "rtf": round(wall / audio_s, 4),
+                          "peak_rss_mb": max(s["peak_rss_mb"] for s in stage_stats)},
+            })
+    finally:
+        stub.stop()
+    report["meta"]["llm_requests"] = stub.requests
+    report["meta"]["model_pool"] = dict(MODELS.stats)
+
+    out = args.out or os.path.join(args.work, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    print("\n" + format_table(report))
+    print(f"\nReport saved: {out}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions: print(f"!!! Regression: {line}")
+        if regressions: return 1
+        print(f"No RTF regression beyond {args.tolerance:.0%} vs {os.path.basename(args.baseline)}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
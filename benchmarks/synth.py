@@ -0,0 +1,127 @@
+import os
+import json
+import numpy as np
+import soundfile as sf
+
+SR = 16000
+
+# 合成说话人的声学参数：基频 (Hz) 与两个共振峰 (Hz)
+VOICES = [
+    {"name": "Alice", "title": "PM", "f0": 210, "formants": (850, 2300)},
+    {"name": "Bob", "title": "Engineer", "f0": 115, "formants": (650, 1700)},
+    {"name": "Carol", "title": "Designer", "f0": 240, "formants": (500, 2700)},
+    {"name": "David", "title": "QA", "f0": 135, "formants": (750, 1200)},
+    {"name": "Erin", "title": "Ops", "f0": 185, "formants": (400, 2000)},
+    {"name": "Frank", "title": "Sales", "f0": 100, "formants": (600, 1000)},
+]
+
+def _load_clips(clips_dir, sr=SR):
+    """
+    读取可选的真实语音片段：clips_dir 下每个子目录 (或每个音频文件) 视为一个说话人。
+    :return: {说话人名: float32 数组}
+    """
+    from utilities.audio_processor.audio_buffer import AudioBuffer
+    clips = {}
+    for entry in sorted(os.listdir(clips_dir)):
+        path = os.path.join(clips_dir, entry)
+        files = [os.path.join(path, f) for f in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        parts = []
+        for f in files:
+            if not f.lower().endswith((".wav", ".flac", ".ogg")): continue
+            buf = AudioBuffer.from_file(f)
+            if buf.sr != sr: raise ValueError(f"Clip must be {sr} Hz: {f}")
+            parts.append(buf.samples)
+        if parts: clips[os.path.splitext(entry)[0]] = np.concatenate(parts)
+    return clips
+
+def synth_voice(rng, voice, n, sr=SR):
+    """
+    用谐波 + 共振峰加权模拟一段 "说话"：基频带语调起伏，按音节节奏调幅并随机插入词间停顿。
+    同一说话人的音色固定，足以让声纹模型区分不同人。
+    """
+    t = np.arange(n, dtype=np.float32) / sr
+    f0 = voice["f0"] * (1 + 0.06 * np.sin(2 * np.pi * rng.uniform(0.3, 0.8) * t + rng.uniform(0, 2 * np.pi)))
+    phase = 2 * np.pi * np.cumsum(f0, dtype=np.float64) / sr
+    out = np.zeros(n, dtype=np.float32)
+    for h in range(1, 25):
+        freq = h * voice["f0"]
+        if freq > 3800: break
+        gain = sum(np.exp(-((freq - fm) / 250.0) ** 2) for fm in voice["formants"]) + 0.15 / h
+        out += (gain * np.sin(h * phase)).astype(np.float32)
+
+    # 音节包络 (4~6 Hz) 与词间停顿
+    syllables = np.abs(np.sin(np.pi * rng.uniform(4, 6) * t)).astype(np.float32) ** 0.6
+    gate = np.ones(n, dtype=np.float32)
+    pos = int(rng.uniform(0.3, 1.0) * sr)
+    while pos < n:
+        gap = int(rng.uniform(0.08, 0.35) * sr)
+        gate[pos:pos + gap] = 0.0
+        pos += gap + int(rng.uniform(0.4, 1.5) * sr)
+    out *= syllables * gate
+    peak = np.max(np.abs(out))
+    return out / peak * 0.5 if peak > 0 else out
+
+def make_meeting(minutes, n_speakers=4, seed=0, snr_db=20.0, clips_dir=None, sr=SR):
+    """
+    生成确定性的多人会议音频：说话人轮流发言 (2~12 s)，间隔 0.2~1.5 s 静音，
+    叠加背景噪声、50 Hz 交流声与偶发的提示音。
+    :return: (samples float32, turns [{start, end, speaker}], speakers [voice dict])
+    """
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * sr)
+    clips = _load_clips(clips_dir, sr) if clips_dir else {}
+    if clips:
+        speakers = [{"name": name, "title": "", "clip": clip} for name, clip in list(clips.items())[:n_speakers]]
+    else:
+        speakers = [dict(v) for v in VOICES[:n_speakers]]
+
+    audio = np.zeros(total, dtype=np.float32)
+    turns = []
+    pos = int(rng.uniform(0.5, 1.5) * sr)
+    last = -1
+    while pos < total - sr:
+        k = int(rng.integers(len(speakers)))
+        if k == last: k = (k + 1) % len(speakers)
+        last = k
+        n = min(int(rng.uniform(2, 12) * sr), total - pos)
+        spk = speakers[k]
+        if "clip" in spk:
+            clip = spk["clip"]
+            off = int(rng.integers(max(len(clip) - n, 1)))
+            seg = np.resize(clip[off:off + n], n)
+        else:
+            seg = synth_voice(rng, spk, n, sr)
+        audio[pos:pos + n] = seg * rng.uniform(0.6, 1.0)
+        turns.append({"start": round(pos / sr, 2), "end": round((pos + n) / sr, 2), "speaker": spk["name"]})
+        pos += n + int(rng.uniform(0.2, 1.5) * sr)
+
+    # 背景：白噪声 (按语音平均功率设定 SNR) + 交流声 + 提示音
+    speech_power = float(np.mean(audio[audio != 0] ** 2)) if np.any(audio) else 1e-4
+    noise_std = np.sqrt(speech_power / (10 ** (snr_db / 10)))
+    audio += rng.normal(0, noise_std, total).astype(np.float32)
+    t = np.arange(total, dtype=np.float32) / sr
+    audio += (noise_std * 0.5 * np.sin(2 * np.pi * 50 * t)).astype(np.float32)
+    for _ in range(max(1, int(minutes))):
+        s = int(rng.integers(max(total - sr // 4, 1)))
+        beep = np.sin(2 * np.pi * 1000 * np.arange(sr // 4) / sr).astype(np.float32) * 0.1
+        audio[s:s + len(beep)] += beep[:total - s]
+    np.clip(audio, -1.0, 1.0, out=audio)
+    return audio, turns, speakers
+
+def enrollment_clip(voice, index, seconds=8.0, seed=1000, sr=SR):
+    """为第 index 个说话人生成一段独立的录入音频 (不同随机种子，避免与会议内容完全相同)"""
+    n = int(seconds * sr)
+    if "clip" in voice: return np.resize(voice["clip"][-n:], n)
+    return synth_voice(np.random.default_rng(seed + index), voice, n, sr)
+
+def write_meeting(out_dir, minutes, **kwargs):
+    """写出 meeting_<m>min.wav 及对应的标注 JSON，返回 (wav 路径, 说话人列表)"""
+    os.makedirs(out_dir, exist_ok=True)
+    audio, turns, speakers = make_meeting(minutes, **kwargs)
+    name = f"meeting_{minutes:g}min"
+    wav_path = os.path.join(out_dir, f"{name}.wav")
+    sf.write(wav_path, audio, SR, subtype="PCM_16")
+    with open(os.path.join(out_dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+        json.dump({"minutes": minutes, "sr": SR, "turns": turns,
+                   "speakers": [s["name"] for s in speakers]}, f, ensure_ascii=False, indent=2)
+    return wav_path, speakers
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import json
+import pickle
+import hashlib
+import threading
+
+class StageCache:
+    """
+    内容寻址的节点结果缓存。
+    key = sha256(输入音频哈希 / 上游节点 key + 节点 label + config + 版本)，
+    每个条目保存节点产生的上下文增量 (pickle)，按总大小做 LRU 淘汰 (以 mtime 作为最近访问时间)。
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        blob = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path): return None
+        try:
+            with open(path, 'rb') as f: delta = pickle.load(f)
+            os.utime(path, None) # 刷新 LRU 时间
+            return delta
+        except Exception as e:
+            print(f"[Cache] Corrupted entry {key[:12]}: {e}")
+            try: os.remove(path)
+            except: pass
+            return None
+
+    def put(self, key, delta):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f: pickle.dump(delta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[Cache] Failed to store {key[:12]}: {e}")
+            try: os.remove(tmp)
+            except: pass
+            return
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.pkl'): continue
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                    entries.append((st.st_mtime, st.st_size, name))
+                except FileNotFoundError: pass
+            total = sum(e[1] for e in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes: break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    total -= size
+                except FileNotFoundError: pass
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            try: os.remove(os.path.join(self.cache_dir, name))
+            except: pass
\ No newline at end of file
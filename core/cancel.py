@@ -0,0 +1,44 @@
+import threading
+
+class CancelledError(Exception):
+    """用户按下 Stop 后，由 CancelToken.check() 在处理器内部抛出"""
+    pass
+
+class CancelToken:
+    """
+    协作式取消令牌：GraphExecutor.stop() 调用 cancel()，
+    各处理器及底层引擎在循环中调用 check() / 读取 cancelled 及时退出。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set(): return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for cb in callbacks:
+            try: cb()
+            except Exception as e: print(f"[Cancel] Callback error: {e}")
+
+    def check(self):
+        if self._event.is_set(): raise CancelledError("Cancelled by user.")
+
+    def wait(self, timeout):
+        """代替 time.sleep 的轮询等待，取消时立即返回 True"""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """注册取消时的回调 (如清空 Whisper 队列)；已取消则立即执行"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
\ No newline at end of file
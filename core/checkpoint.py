@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import threading
+
+RESUMABLE = ('running', 'stopped', 'failed')
+
+def _atomic_write(path, data, mode='w'):
+    """先写临时文件再 os.replace，进程崩溃时不会留下写了一半的文件"""
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    kwargs = {'encoding': 'utf-8'} if 'b' not in mode else {}
+    with open(tmp, mode, **kwargs) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class SegmentJournal:
+    """
+    ASR 逐段结果的追加日志 (JSONL)：每完成一段写入一行并 fsync。
+    恢复运行时据此跳过已转写的片段；最后一行因崩溃被截断时忽略该行。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def load(self):
+        """:return: {key: entry}"""
+        entries = {}
+        if not os.path.exists(self.path): return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try: entry = json.loads(line)
+                except ValueError: continue
+                entries[entry['key']] = entry
+        return entries
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+class RunCheckpoint:
+    """
+    崩溃安全的运行检查点，每次运行对应 resource/runs/<run_id>/：
+    - manifest.json          运行状态、已完成节点 (label / 缓存 key / 耗时)、说话人时间轴
+    - graph.pkl              节点、连线与初始上下文，恢复运行时据此重建管道
+    - node_<nid>.pkl         已完成节点的上下文增量 (运行成功后删除)
+    - segments_<nid>.jsonl   ASR 逐段结果，每完成一段追加一行
+    """
+
+    def __init__(self, run_dir, manifest):
+        self.run_dir = run_dir
+        self.manifest = manifest
+        self.lock = threading.Lock()
+
+    @property
+    def run_id(self):
+        return self.manifest['run_id']
+
+    @classmethod
+    def create(cls, runs_dir, start_id, nodes, links, context=None):
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        run_id, n = ts, 1
+        while os.path.exists(os.path.join(runs_dir, run_id)):
+            run_id = f"{ts}_{n}"; n += 1
+        run_dir = os.path.join(runs_dir, run_id)
+        os.makedirs(run_dir)
+        graph = {'start_id': start_id, 'nodes': nodes, 'links': links, 'context': dict(context or {})}
+        _atomic_write(os.path.join(run_dir, "graph.pkl"), pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL), 'wb')
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        source = nodes.get(start_id, {}).get('config', {}).get('file_path')
+        manifest = {'run_id': run_id, 'created': now, 'updated': now, 'status': 'running',
+                    'source': source, 'nodes': {}, 'timeline': None}
+        ckpt = cls(run_dir, manifest)
+        ckpt._save()
+        return ckpt
+
+    @classmethod
+    def load(cls, run_dir):
+        with open(os.path.join(run_dir, "manifest.json"), 'r', encoding='utf-8') as f:
+            return cls(run_dir, json.load(f))
+
+    def graph(self):
+        """:return: (start_id, nodes, links, context)"""
+        with open(os.path.join(self.run_dir, "graph.pkl"), 'rb') as f: g = pickle.load(f)
+        return g['start_id'], g['nodes'], g['links'], g['context']
+
+    def _save(self):
+        self.manifest['updated'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        _atomic_write(os.path.join(self.run_dir, "manifest.json"),
+                      json.dumps(self.manifest, ensure_ascii=False, indent=2, default=str))
+
+    def _delta_path(self, nid):
+        return os.path.join(self.run_dir, f"node_{nid}.pkl")
+
+    def is_done(self, nid):
+        return str(nid) in self.manifest['nodes']
+
+    def node_key(self, nid):
+        return self.manifest['nodes'].get(str(nid), {}).get('key')
+
+    def load_delta(self, nid):
+        """读取已完成节点的增量；文件缺失或损坏时返回 None (该节点重新执行)"""
+        try:
+            with open(self._delta_path(nid), 'rb') as f: return pickle.load(f)
+        except Exception:
+            return None
+
+    def node_done(self, nid, label, delta, elapsed, key=None):
+        _atomic_write(self._delta_path(nid), pickle.dumps(delta, protocol=pickle.HIGHEST_PROTOCOL), 'wb')
+        with self.lock:
+            self.manifest['nodes'][str(nid)] = {'label': label, 'key': key, 'elapsed': round(elapsed, 3),
+                                                'finished': time.strftime("%Y-%m-%d %H:%M:%S")}
+            if 'timeline' in delta: self.manifest['timeline'] = delta['timeline']
+            if 'log_path' in delta: self.manifest['log_path'] = delta['log_path']
+            self._save()
+
+    def journal(self, nid):
+        return SegmentJournal(os.path.join(self.run_dir, f"segments_{nid}.jsonl"))
+
+    def set_status(self, status):
+        with self.lock:
+            self.manifest['status'] = status
+            self._save()
+
+    def finish(self, status):
+        """记录最终状态；成功完成时删除节点增量，只保留 manifest 与逐段结果"""
+        self.set_status(status)
+        if status != 'done': return
+        for name in os.listdir(self.run_dir):
+            if name.startswith("node_") and name.endswith(".pkl"):
+                try: os.remove(os.path.join(self.run_dir, name))
+                except OSError: pass
+
+    @staticmethod
+    def list_runs(runs_dir):
+        """:return: [(run_dir, manifest)]，最新的在前"""
+        runs = []
+        if not os.path.isdir(runs_dir): return runs
+        for name in sorted(os.listdir(runs_dir), reverse=True):
+            path = os.path.join(runs_dir, name, "manifest.json")
+            try:
+                with open(path, 'r', encoding='utf-8') as f: runs.append((os.path.dirname(path), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return runs
+
+    @classmethod
+    def latest_resumable(cls, runs_dir):
+        for run_dir, manifest in cls.list_runs(runs_dir):
+            if manifest.get('status') in RESUMABLE: return run_dir
+        return None
+
+    @classmethod
+    def prune(cls, runs_dir, keep=20):
+        """只保留最近 keep 次运行的目录"""
+        for run_dir, _ in cls.list_runs(runs_dir)[keep:]:
+            shutil.rmtree(run_dir, ignore_errors=True)
\ No newline at end of file
@@ -11,4 +11,16 @@ COLOR_TIMELINE = (255, 255, 100, 255) # Yellow
 COLOR_TEXT = (100, 150, 255, 255)    # Blue
 
 # UI Tags
-TAG_NODE_EDITOR = "NodeEditor"
\ No newline at end of file
+TAG_NODE_EDITOR = "NodeEditor"
+
+# Node Ports: label -> 输入/输出端口 (name, type, color)，static 表示节点带有参数控件
+# 控件属性位于输入与输出之间，保存的配置中的 attr_idx 依赖此顺序
+NODE_PORTS = {
+    "Audio Source":   {"ins": [], "outs": [("Audio Out", TYPE_AUDIO, COLOR_AUDIO)], "static": False},
+    "Audio Enhancer": {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO)], "outs": [("Audio Out", TYPE_AUDIO, COLOR_AUDIO)], "static": True},
+    "VAD Detector":   {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO)], "outs": [("Audio Out", TYPE_AUDIO, COLOR_AUDIO)], "static": True},
+    "Speaker ID":     {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO)], "outs": [("Timeline Out", TYPE_TIMELINE, COLOR_TIMELINE)], "static": True},
+    "Whisper ASR":    {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO), ("Timeline", TYPE_TIMELINE, COLOR_TIMELINE)], "outs": [("Text Out", TYPE_TEXT, COLOR_TEXT)], "static": True},
+    "Full Text ASR":  {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO)], "outs": [("Text Out", TYPE_TEXT, COLOR_TEXT)], "static": True},
+    "LLM Summary":    {"ins": [("Text In", TYPE_TEXT, COLOR_TEXT)], "outs": [("Report", TYPE_TEXT, COLOR_TEXT)], "static": True},
+}
\ No newline at end of file
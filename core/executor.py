@@ -1,86 +1,390 @@
-import dearpygui.dearpygui as dpg
+import os
+import json
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from .processors import *
-from .ui_utils import NodeThemeManager
+from .cache import StageCache
+from .cancel import CancelToken, CancelledError
+from .tracing import Tracer, NULL_TRACER
+from .checkpoint import RunCheckpoint
+from utilities.model_manager import MODELS
 
 class GraphExecutor:
-    def __init__(self, resource_dir):
+    # 各节点的初始耗时估计 (秒)，首次实测后由 node_costs.json 中的数据取代
+    DEFAULT_COSTS = {
+        "Audio Source": 1.0,
+        "Audio Enhancer": 10.0,
+        "VAD Detector": 3.0,
+        "Speaker ID": 30.0,
+        "Whisper ASR": 60.0,
+        "Full Text ASR": 60.0,
+        "LLM Summary": 20.0
+    }
+
+    def __init__(self, resource_dir, max_workers=2, materialize_intermediates=False,
+                 use_cache=True, cache_bytes=2 * 1024**3, model_policy=None, tracing=True):
         self.res_dir = resource_dir
         self.processors = {
             "Audio Source": SourceProcessor(resource_dir),
-            "Audio Enhancer": EnhancerProcessor(),
+            "Audio Enhancer": EnhancerProcessor(resource_dir),
             "VAD Detector": VADProcessor(),
-            "Speaker ID": SpeakerIDProcessor(),
+            "Speaker ID": SpeakerIDProcessor(resource_dir),
             "Whisper ASR": ASRProcessor(resource_dir),
+            "Full Text ASR": FullTextASRProcessor(resource_dir),
             "LLM Summary": LLMProcessor()
         }
-        self.recorder = self.processors["Audio Source"].recorder
-        self.theme_mgr = None 
-        
-        # [新增] 中断控制标志
+        # [修改] 执行器不再依赖 Dear PyGui：节点状态通过 status_cb(node_id, status) 回调，
+        # GUI 中由 NodeThemeManager 着色，批处理模式下为空
+        self.status_cb = None
+
+        # [修改] 模型由进程级模型池管理；model_policy 为 None 时沿用池的当前策略
+        if model_policy: MODELS.configure(policy=model_policy)
+
+        # [新增] 每次运行导出 Chrome-trace/Perfetto JSON (meeting_logs/Trace_*.json)
+        self.tracing = tracing
+        self.last_trace_path = None
+
+        # 最近一次运行的结果: 'done' / 'failed' / 'stopped'，以及各节点耗时
+        self.last_status = None
+        self.last_timings = {}
+
+        # [新增] 中断控制标志 & 取消令牌 (传入每个节点，节点内部也能及时响应 Stop)
         self.stop_flag = False
+        self.token = CancelToken()
+
+        # [新增] 并行分支的工作线程数 & 实测节点耗时 (用于加权进度)
+        self.max_workers = max_workers
+        self.cost_path = os.path.join(resource_dir, "node_costs.json")
+        self.node_costs = self._load_costs()
+
+        # [调试] 节点间默认只在内存中传递音频；打开后把每个中间结果写成 WAV
+        self.materialize_intermediates = materialize_intermediates
+
+        # [新增] 节点结果缓存：只改了下游配置 (如 LLM 后端) 时，上游节点直接复用
+        self.use_cache = use_cache
+        self.cache = StageCache(os.path.join(resource_dir, "cache", "stages"), max_bytes=cache_bytes)
+
+        # [新增] 崩溃安全的检查点 (resource/runs/<run_id>)，中断后可 resume() 继续
+        self.checkpointing = True
+        self.runs_dir = os.path.join(resource_dir, "runs")
+        self.keep_runs = 20
+        self.last_run_dir = None
+        self._show_status = True
+
+        # [新增] 流式 (边录边处理) 模式的管道，录音期间有效
+        self.live = None
+
+    @property
+    def recorder(self):
+        return self.processors["Audio Source"].recorder
+
+    def _set_status(self, nid, status):
+        if self.status_cb and self._show_status: self.status_cb(nid, status)
 
     def stop(self):
         """外部调用此方法来中断执行"""
         self.stop_flag = True
+        self.token.cancel()
+
+    def _load_costs(self):
+        try:
+            with open(self.cost_path, 'r') as f: return json.load(f)
+        except: return {}
+
+    def _save_costs(self):
+        try:
+            with open(self.cost_path, 'w') as f: json.dump(self.node_costs, f, indent=2)
+        except: pass
+
+    def _update_cost(self, label, elapsed):
+        """指数滑动平均，平滑单次运行的抖动"""
+        old = self.node_costs.get(label)
+        self.node_costs[label] = elapsed if old is None else 0.7 * old + 0.3 * elapsed
+
+    def _cost(self, label):
+        return max(self.node_costs.get(label, self.DEFAULT_COSTS.get(label, 5.0)), 0.1)
+
+    def _export_trace(self, tracer, log_cb):
+        """导出追踪文件，并在日志面板输出耗时汇总表"""
+        if not tracer.events: return
+        log_dir = os.path.join(self.res_dir, "meeting_logs")
+        os.makedirs(log_dir, exist_ok=True)
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(log_dir, f"Trace_{ts}.json")
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(log_dir, f"Trace_{ts}_{n}.json"); n += 1
+        try:
+            self.last_trace_path = tracer.export(path)
+        except Exception as e:
+            log_cb(f"[Trace] Export failed: {e}"); return
+        log_cb(f"[Trace] Saved {os.path.basename(path)} (open in ui.perfetto.dev)")
+        for line in tracer.summary(): log_cb(line)
+
+    def build_graph(self, start_id, nodes, links):
+        """
+        根据连线构建从 start_id 出发可达的有向无环图。
+        :return: (order, parents, children) —— order 为拓扑序
+        """
+        owner = {}
+        for nid, n in nodes.items():
+            for a in n['inputs']: owner[a] = nid
+            for a in n['outputs']: owner[a] = nid
+
+        parents = {nid: [] for nid in nodes}
+        children = {nid: [] for nid in nodes}
+        for src_attr, dst_attr in links.values():
+            s, d = owner.get(src_attr), owner.get(dst_attr)
+            if s is None or d is None or s == d: continue
+            if d not in children[s]:
+                children[s].append(d)
+                parents[d].append(s)
+
+        # 只保留从 Source 可达的节点，孤立节点不执行
+        reach, stack = {start_id}, [start_id]
+        while stack:
+            for c in children[stack.pop()]:
+                if c not in reach:
+                    reach.add(c); stack.append(c)
+        parents = {n: [p for p in parents[n] if p in reach] for n in reach}
+        children = {n: [c for c in children[n] if c in reach] for n in reach}
+
+        # Kahn 拓扑排序
+        indeg = {n: len(parents[n]) for n in reach}
+        ready = [n for n in reach if indeg[n] == 0]
+        order = []
+        while ready:
+            n = ready.pop(0)
+            order.append(n)
+            for c in children[n]:
+                indeg[c] -= 1
+                if indeg[c] == 0: ready.append(c)
+        if len(order) != len(reach):
+            raise ValueError("Pipeline graph contains a cycle.")
+        return order, parents, children
+
+    def _node_input(self, nid, base, order, ancestors, deltas):
+        """按拓扑序叠加所有祖先节点的上下文增量，实现 fan-in 合并"""
+        ctx = dict(base)
+        for a in order:
+            if a in ancestors[nid]: ctx.update(deltas[a])
+        return ctx
 
-    def execute(self, start_id, nodes, links, context, log_cb, prog_cb):
-        if not self.theme_mgr: self.theme_mgr = NodeThemeManager()
-        
+    def _node_key(self, nid, node, proc, parents, keys):
+        """节点缓存 key：上游 key 链 + label + config + 模型版本；任一上游无 key 则不缓存"""
+        parent_keys = [keys.get(p) for p in parents[nid]]
+        if not parent_keys or None in parent_keys: return None
+        version = proc.cache_version(node['config']) if proc else None
+        return StageCache.make_key(node['label'], node['config'], version, sorted(parent_keys))
+
+    def _run_node(self, proc, label, ctx, config, log_cb, token, progress_cb):
+        inp = dict(ctx)
+        t0 = time.time()
+        with ctx['tracer'].span(label, cat="node"):
+            out = proc.process(ctx, config, log_cb, token, progress_cb)
+        delta = {k: v for k, v in out.items() if k not in inp or inp[k] is not v}
+        return delta, time.time() - t0
+
+    def resume(self, run_dir, log_cb, prog_cb):
+        """
+        [新增] 从检查点恢复中断的运行：已完成的节点直接载入结果，ASR 只转写缺失的片段。
+        图来自上一次会话，其节点 id 与当前画布无关，因此恢复期间不回调节点状态。
+        """
+        checkpoint = RunCheckpoint.load(run_dir)
+        start_id, nodes, links, context = checkpoint.graph()
+        log_cb(f"[Resume] Run {checkpoint.run_id}: {len(checkpoint.manifest['nodes'])}/{len(nodes)} node(s) already finished.")
+        checkpoint.set_status('running')
+        self._show_status = False
+        try:
+            return self.execute(start_id, nodes, links, context, log_cb, prog_cb, checkpoint=checkpoint)
+        finally:
+            self._show_status = True
+
+    def start_live(self, start_id, nodes, links, log_cb):
+        """
+        [新增] 流式模式：开始录音前调用，录音块直接送入 LivePipeline，转写随说随出。
+        只使用从 Source 可达的节点的配置；停止录音后调用 finish_live()。
+        """
+        from .streaming import LivePipeline, live_config
+        order, _, _ = self.build_graph(start_id, nodes, links)
+        self.stop_flag = False
+        self.token = CancelToken()
+        tracer = Tracer("IMA Live Pipeline") if self.tracing else NULL_TRACER
+        config = live_config({n: nodes[n] for n in order})
+        self.live = LivePipeline(config, log_cb, token=self.token, tracer=tracer,
+                                 db_path=self.processors["Speaker ID"].db_path,
+                                 noise_path=self.processors["Audio Enhancer"].profile_path(config['room'])).start()
+        self.recorder.on_chunk = self.live.feed
+        return self.live
+
+    def finish_live(self, audio_path, log_cb, prog_cb):
+        """录音停止后处理尾部、写出日志，并按管道配置生成 LLM 纪要"""
+        live, self.live = self.live, None
+        self.recorder.on_chunk = None
+        prog_cb(0.0)
+        context = live.finish(self.res_dir)
+        context.update(audio_path=audio_path, orig_audio_path=audio_path, tracer=live.tracer)
+        llm = live.config['llm']
+        if llm and not self.stop_flag:
+            try: context = self.processors["LLM Summary"].process(context, llm, log_cb, self.token, prog_cb)
+            except CancelledError: pass
+            except Exception as e: log_cb(f"!!! LLM Summary Error: {e}")
+        if self.tracing: self._export_trace(live.tracer, log_cb)
+        if self.stop_flag: log_cb(">>> 🛑 Process Interrupted by User.", is_result=True)
+        self.last_status = 'stopped' if self.stop_flag else 'done'
+        prog_cb(0.0 if self.stop_flag else 1.0)
+        return context
+
+    def _start_checkpoint(self, start_id, nodes, links, context, log_cb):
+        if not self.checkpointing: return None
+        try:
+            RunCheckpoint.prune(self.runs_dir, keep=self.keep_runs)
+            return RunCheckpoint.create(self.runs_dir, start_id, nodes, links, context)
+        except Exception as e:
+            log_cb(f"[Checkpoint] Disabled for this run: {e}")
+            return None
+
+    def execute(self, start_id, nodes, links, context, log_cb, prog_cb, checkpoint=None):
         # [新增] 开始执行前重置标志
         self.stop_flag = False
-        
-        curr_id = start_id
-        link_map = {l[0]: l[1] for l in links.values()}
-        
-        step = 0
-        while curr_id and step < 15:
-            # [新增] 每一轮循环开始前，检查是否需要停止
-            if self.stop_flag:
-                log_cb(">>> 🛑 Process Interrupted by User.", is_result=True)
-                # 将当前节点状态设回 idle，防止卡在 running 绿色状态
-                dpg.split_frame()
-                self.theme_mgr.set_status(curr_id, 'idle')
-                break
-
-            node = nodes[curr_id]
-            label = node['label']
-            
-            # Visual Feedback
-            dpg.split_frame()
-            self.theme_mgr.set_status(curr_id, 'running')
-            
-            # Execute
-            proc = self.processors.get(label)
-            if proc:
-                try:
-                    # [优化] 如果是耗时操作，理论上 Processor 内部也应该支持检查 stop_flag
-                    # 这里暂时只支持"节点级"中断（即做完当前节点后停止）
-                    context = proc.process(context, node['config'], log_cb)
-                    self.theme_mgr.set_status(curr_id, 'idle')
-                except Exception as e:
-                    log_cb(f"!!! Error in {label}: {e}")
-                    traceback.print_exc()
-                    self.theme_mgr.set_status(curr_id, 'error')
-                    break
-            
-            # Find Next
-            output_ids = node['outputs']
-            next_id = None
-            if output_ids and output_ids[0] in link_map:
-                target_in = link_map[output_ids[0]]
-                for nid, ndata in nodes.items():
-                    if target_in in ndata['inputs']:
-                        next_id = nid
-                        break
-            
-            curr_id = next_id
-            step += 1
-            prog_cb(step/6.0)
-        
-        # 结束或中断后，进度条归位
+        self.token = token = CancelToken()
+        user_context = context
+        context = dict(context)
+        context['materialize_intermediates'] = self.materialize_intermediates
+        context['tracer'] = tracer = Tracer() if self.tracing else NULL_TRACER
+        # [新增] 本次运行内共享的噪声样本与降噪结果 (同一输入只降噪一次)，与 tracer 一样不进入节点增量
+        context['enhance_memo'] = {}
+
+        try:
+            order, parents, children = self.build_graph(start_id, nodes, links)
+        except ValueError as e:
+            log_cb(f"!!! {e}")
+            prog_cb(0.0)
+            return context
+
+        if checkpoint is None: checkpoint = self._start_checkpoint(start_id, nodes, links, user_context, log_cb)
+        self.last_run_dir = checkpoint.run_dir if checkpoint else None
+
+        ancestors = {}
+        for n in order:
+            anc = set(parents[n])
+            for p in parents[n]: anc |= ancestors[p]
+            ancestors[n] = anc
+
+        weights = {n: self._cost(nodes[n]['label']) for n in order}
+        total_w = sum(weights.values())
+        done_w = 0.0
+        # 运行中节点的内部进度 (0~1)，与已完成节点的权重一起折算总进度
+        node_frac = {}
+
+        def node_progress(nid):
+            def cb(frac):
+                node_frac[nid] = min(max(frac, 0.0), 1.0)
+                prog_cb((done_w + sum(weights[n] * f for n, f in list(node_frac.items()))) / total_w)
+            return cb
+
+        self.last_timings = {}
+        deltas = {}
+        keys = {}
+        remaining = {n: len(parents[n]) for n in order}
+        ready = [start_id]
+        running = {}
+        failed = False
+
+        # 相互独立的分支 (如 Speaker ID 与 Full Text ASR) 在线程池中并发执行
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while ready or running:
+                while ready and not (failed or self.stop_flag):
+                    nid = ready.pop(0)
+                    node = nodes[nid]
+                    proc = self.processors.get(node['label'])
+                    ctx = self._node_input(nid, context, order, ancestors, deltas)
+                    keys[nid] = self._node_key(nid, node, proc, parents, keys)
+                    # [新增] 恢复运行时优先载入检查点中的结果，其次查缓存
+                    cached = None
+                    if proc and checkpoint and checkpoint.is_done(nid):
+                        cached = checkpoint.load_delta(nid)
+                        if cached is not None:
+                            keys[nid] = checkpoint.node_key(nid) or keys[nid]
+                            log_cb(f"[Resume] Restored {node['label']} from checkpoint.")
+                    if cached is None and proc and proc.cacheable and self.use_cache and keys[nid]:
+                        cached = self.cache.get(keys[nid])
+                        if cached is not None:
+                            log_cb(f"[Cache] Reusing {node['label']} result.")
+                            if checkpoint: checkpoint.node_done(nid, node['label'], cached, 0.0, keys[nid])
+                    if not proc or cached is not None:
+                        deltas[nid] = cached or {}
+                        if cached is not None:
+                            self.last_timings[node['label']] = 0.0
+                            proc.replay(cached, log_cb)
+                            done_w += weights[nid]
+                            prog_cb(done_w / total_w)
+                        for c in children[nid]:
+                            remaining[c] -= 1
+                            if remaining[c] == 0: ready.append(c)
+                        continue
+                    # [新增] ASR 等节点通过 journal 逐段写入检查点 (不进入节点增量)
+                    if checkpoint: ctx['journal'] = checkpoint.journal(nid)
+                    # Visual Feedback
+                    self._set_status(nid, 'running')
+                    running[pool.submit(self._run_node, proc, node['label'], ctx, node['config'], log_cb,
+                                        token, node_progress(nid))] = nid
+
+                if not running: break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    nid = running.pop(fut)
+                    label = nodes[nid]['label']
+                    node_frac.pop(nid, None)
+                    try:
+                        deltas[nid], elapsed = fut.result()
+                    except CancelledError:
+                        log_cb(f"[{label}] Cancelled.")
+                        self._set_status(nid, 'idle')
+                        continue
+                    except Exception as e:
+                        log_cb(f"!!! Error in {label}: {e}")
+                        traceback.print_exception(type(e), e, e.__traceback__)
+                        self._set_status(nid, 'error')
+                        failed = True
+                        continue
+                    self._set_status(nid, 'idle')
+                    self._update_cost(label, elapsed)
+                    self.last_timings[label] = elapsed
+                    if not keys[nid] and 'audio_hash' in deltas[nid]:
+                        keys[nid] = StageCache.make_key(label, deltas[nid]['audio_hash'])
+                    proc = self.processors[label]
+                    if proc.cacheable and self.use_cache and keys[nid]:
+                        self.cache.put(keys[nid], deltas[nid])
+                    if checkpoint:
+                        try: checkpoint.node_done(nid, label, deltas[nid], elapsed, keys[nid])
+                        except Exception as e: log_cb(f"[Checkpoint] Failed to save {label}: {e}")
+                    done_w += weights[nid]
+                    prog_cb(done_w / total_w)
+                    for c in children[nid]:
+                        remaining[c] -= 1
+                        if remaining[c] == 0: ready.append(c)
+
+        self._save_costs()
+        if self.tracing: self._export_trace(tracer, log_cb)
+        warm = MODELS.status()
+        if warm: log_cb("[Models] Warm: " + ", ".join(f"{m['name']} ({m['mb']} MB)" for m in warm))
         if self.stop_flag:
+            log_cb(">>> 🛑 Process Interrupted by User.", is_result=True)
+
+        self.last_status = 'failed' if failed else ('stopped' if self.stop_flag else 'done')
+        if checkpoint:
+            checkpoint.finish(self.last_status)
+            if self.last_status != 'done': log_cb(f"[Checkpoint] Run {checkpoint.run_id} can be resumed.")
+
+        # 结束或中断后，进度条归位
+        if self.stop_flag or failed:
             prog_cb(0.0)
         else:
-            prog_cb(1.0)
\ No newline at end of file
+            prog_cb(1.0)
+
+        final = dict(context)
+        for n in order:
+            if n in deltas: final.update(deltas[n])
+        return final
\ No newline at end of file
@@ -0,0 +1,40 @@
+from .constants import NODE_PORTS
+from utilities.model_manager import WHISPER, SPEAKER_ENCODER
+
+def graph_from_state(state):
+    """
+    将保存的管道配置 (config/*.json) 解析为 GraphExecutor 所需的结构，无需 GUI。
+    属性 id 用 (node_idx, attr_idx) 表示，attr_idx 与 Dear PyGui 中的子项顺序一致：
+    输入端口 -> 参数控件 (若有) -> 输出端口。
+    :return: (nodes, links, start_id)
+    """
+    nodes = {}
+    for idx, n_data in enumerate(state.get("nodes", [])):
+        label = n_data["label"]
+        spec = NODE_PORTS.get(label)
+        if not spec: continue
+        n_in = len(spec["ins"])
+        out_start = n_in + (1 if spec["static"] else 0)
+        nodes[idx] = {
+            'label': label,
+            'config': dict(n_data.get("config", {})),
+            'inputs': [(idx, i) for i in range(n_in)],
+            'outputs': [(idx, out_start + i) for i in range(len(spec["outs"]))]
+        }
+
+    links = {}
+    for i, l_data in enumerate(state.get("links", [])):
+        links[i] = ((l_data["src_node_idx"], l_data["src_attr_idx"]),
+                    (l_data["dst_node_idx"], l_data["dst_attr_idx"]))
+
+    start_id = next((nid for nid, d in nodes.items() if d['label'] == "Audio Source"), None)
+    return nodes, links, start_id
+
+def required_models(state):
+    """按管道配置推断需要的模型 [(kind, variant)]，用于启动时预热"""
+    models = []
+    for n_data in state.get("nodes", []):
+        label, cfg = n_data["label"], n_data.get("config", {})
+        if label == "Speaker ID": models.append((SPEAKER_ENCODER, None))
+        elif label in ("Whisper ASR", "Full Text ASR"): models.append((WHISPER, cfg.get("model", "small")))
+    return list(dict.fromkeys(models))
\ No newline at end of file
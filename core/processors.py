@@ -1,21 +1,30 @@
 import os
-import shutil
 import datetime
 import time
 import soundfile as sf
 import numpy as np
-import gc
-# 导入 torch 用于清理显存
-try:
-    import torch
-except ImportError:
-    torch = None
+import threading
+from contextlib import nullcontext
 
 # --- 导入底层模块 ---
-from utilities.audio_processor.recorder import RealTimeAudioProvider
-from utilities.audio_processor.enhancer import AudioEnhancer
+# [修改] 录音 (pyaudio)、降噪 (noisereduce / pydub) 与 LLM (ollama / openai) 模块在首次使用时才导入，加快启动
+from utilities.audio_processor.audio_buffer import AudioBuffer
+from utilities.audio_processor.audio_io import AudioCache, link_or_copy
+from utilities.audio_processor.wav_writer import repair_header
+from utilities.audio_processor.speech_regions import SpeechRegions
+from utilities.audio_processor.vad_engine import FrameVAD, index_path, load_index
+from .cancel import CancelledError
+from .tracing import NULL_TRACER
 from utilities.diarization.engine import SpeakerEngine
-from utilities.ASR.whisper_engine import AsyncWhisperEngine
+from utilities.model_manager import MODELS, WHISPER
+
+def _frame_len(sr):
+    return int(sr * 0.03)
+
+def _concat_voiced(audio_np, mask, frame_len):
+    """旧接口：把语音帧拼接成一段音频 (会丢失时间坐标，管道中改用 SpeechRegions)"""
+    voiced = [audio_np[i*frame_len:(i+1)*frame_len] for i in np.flatnonzero(mask)]
+    return np.concatenate(voiced) if voiced else np.array([])
 
 try:
     import webrtcvad
@@ -23,114 +32,372 @@ try:
         def __init__(self, aggressiveness=3, sr=16000):
             self.vad = webrtcvad.Vad(aggressiveness)
             self.sr = sr
-        def process(self, audio_np, sr=16000):
+        def speech_mask(self, audio_np, sr=16000):
+            """[新增] 逐帧 (30 ms) 语音标记，第 i 帧覆盖采样 [i*frame_len, (i+1)*frame_len)"""
             pcm_data = (audio_np * 32767).astype(np.int16).tobytes()
-            frame_ms = 30
-            n_samples = int(sr * frame_ms / 1000)
-            n_bytes = n_samples * 2
-            voiced = []
-            for i in range(0, len(pcm_data) - n_bytes, n_bytes):
-                chunk = pcm_data[i:i+n_bytes]
-                if self.vad.is_speech(chunk, sr):
-                    idx_start = i // 2
-                    idx_end = idx_start + n_samples
-                    voiced.append(audio_np[idx_start:idx_end])
-            return np.concatenate(voiced) if voiced else np.array([])
+            n_bytes = _frame_len(sr) * 2
+            return np.array([self.vad.is_speech(pcm_data[i:i+n_bytes], sr)
+                             for i in range(0, len(pcm_data) - n_bytes, n_bytes)], dtype=bool)
+        def process(self, audio_np, sr=16000):
+            return _concat_voiced(audio_np, self.speech_mask(audio_np, sr), _frame_len(sr))
     AdvancedVAD = WebRTCVADWrapper
 except ImportError:
     AdvancedVAD = None
 
 class SimpleEnergyVAD:
     def __init__(self, threshold=0.01): self.threshold = threshold
-    def process(self, audio_np, sr=16000):
-        frame_len = int(sr * 0.03)
+    def speech_mask(self, audio_np, sr=16000):
+        frame_len = _frame_len(sr)
         n_frames = len(audio_np) // frame_len
-        speech = []
-        for i in range(n_frames):
-            frame = audio_np[i*frame_len : (i+1)*frame_len]
-            if np.mean(frame**2) > self.threshold: speech.append(frame)
-        return np.concatenate(speech) if speech else np.array([])
+        return np.array([np.mean(audio_np[i*frame_len : (i+1)*frame_len]**2) > self.threshold
+                         for i in range(n_frames)], dtype=bool)
+    def process(self, audio_np, sr=16000):
+        return _concat_voiced(audio_np, self.speech_mask(audio_np, sr), _frame_len(sr))
 
-try:
+def _llm_extractor(backend):
+    """按后端导入对应的 LLM 纪要提取器 (缺少依赖时抛出 ImportError)"""
+    if 'Online' in backend:
+        from utilities.meeting_extractor import meeting_extractor_ol as llm_online
+        return llm_online.RobustMeetingExtractor
     from utilities.meeting_extractor import meeting_extractor as llm_local
-    from utilities.meeting_extractor import meeting_extractor_ol as llm_online
-    HAS_LLM = True
-except ImportError:
-    HAS_LLM = False
+    return llm_local.RobustMeetingExtractor
+
+FULL_TEXT_HEADER = "=== Full Text Reference (Continuous Audio) ==="
+# Whisper 可直接接收该采样率的 float32 数组，无需写临时文件
+WHISPER_SR = 16000
+
+def _tracer(context):
+    return context.get('tracer') or NULL_TRACER
+
+def _get_audio(context):
+    """取当前音频缓冲区；上下文中只有 audio_path 时解码一次并缓存"""
+    buf = context.get('audio')
+    if buf is None:
+        with _tracer(context).span("audio decode", cat="io"):
+            buf = AudioBuffer.from_file(context['audio_path'])
+        context['audio'] = buf
+    return buf
+
+def _persist(context, buf, suffix):
+    """[调试] materialize_intermediates 打开时，把中间结果写到原始文件旁边"""
+    if context.get('materialize_intermediates'):
+        base = os.path.splitext(context.get('orig_audio_path') or context['audio_path'])[0]
+        with _tracer(context).span("write intermediate", cat="io"):
+            buf.materialize(f"{base}_{suffix}.wav")
+    return buf
+
+def _sub_progress(progress_cb, lo, hi):
+    """把子步骤的 0~1 进度映射到节点进度的 [lo, hi] 区间"""
+    return lambda frac: progress_cb(lo + (hi - lo) * frac)
+
+# 保护 context['enhance_memo'] (并行分支可能同时降噪同一段音频)
+_ENHANCE_LOCK = threading.Lock()
+
+def _noise_profile(context):
+    """
+    [新增] 本次运行使用的平稳噪声样本：优先用 Enhancer 节点给出的 (会议室 / 录音) 样本，
+    否则按录音估计一次，缓存在 context['enhance_memo'] 中供所有降噪调用共用
+    """
+    profile = context.get('noise_profile')
+    if profile is not None: return profile
+    memo = context.get('enhance_memo')
+    key = ('profile', context.get('audio_hash'))
+    with _ENHANCE_LOCK:
+        if memo is not None and key in memo: return memo[key]
+        from utilities.audio_processor.noise_profile import NoiseProfile
+        orig = context.get('orig_audio') or _get_audio(context)
+        with _tracer(context).span("noise profile", cat="dsp"):
+            profile = NoiseProfile.estimate(orig.samples, orig.sr)
+        if memo is not None and context.get('audio_hash'): memo[key] = profile
+    return profile
+
+def _enhance(context, buf, step, token=None, progress_cb=None):
+    """
+    [修改] 降噪以整段录音共用的噪声样本为参照；同一次运行中输入与噪声样本都相同的降噪只计算一次
+    (如未接 Enhancer 节点时，asr_clean 与 full_clean 都作用于原始音频)，结果以新的 step 名共享同一数组
+    """
+    tracer = _tracer(context)
+    profile = _noise_profile(context)
+    if profile is not None and profile.sr != buf.sr: profile = None
+    memo = context.get('enhance_memo')
+    entry = {}
+    if memo is not None and context.get('audio_hash'):
+        key = ('enhance', context['audio_hash'], tuple(buf.provenance), profile.id if profile else None)
+        with _ENHANCE_LOCK: entry = memo.setdefault(key, {'lock': threading.Lock()})
+    with entry.get('lock') or nullcontext():
+        if 'samples' in entry:
+            with tracer.span(f"enhance ({step}, reused)", cat="dsp"):
+                if progress_cb: progress_cb(1.0)
+            return buf.derive(entry['samples'], step)
+        with tracer.span(f"enhance ({step})", cat="dsp"):
+            from utilities.audio_processor.enhancer import AudioEnhancer
+            clean = AudioEnhancer(sr=buf.sr).reduce_noise(buf.samples, token=token, progress_cb=progress_cb, noise=profile)
+        entry['samples'] = clean = np.asarray(clean, dtype=np.float32)
+    return buf.derive(clean, step)
+
+def _whisper_input(buf, temp_dir, name, start=0, end=None):
+    """
+    返回 (whisper 输入, 临时文件路径)。16 kHz 时直接传零拷贝切片；
+    其他采样率才落盘，交给 whisper 内部的 ffmpeg 重采样。
+    """
+    audio = buf.view(start, len(buf) if end is None else end)
+    if buf.sr == WHISPER_SR: return audio, None
+    path = os.path.join(temp_dir, f"{name}.wav")
+    sf.write(path, audio, buf.sr)
+    return path, path
+
+def _full_text_input(context, enhanced_opt, log_cb, reuse=None, token=None, progress_cb=None):
+    """
+    返回用于全文转写的音频缓冲区 (原始连续音频，可选降噪)。
+    reuse: 若分段输入就是原始音频且已做过 ASR 降噪，则直接复用
+    """
+    orig = context.get('orig_audio') or _get_audio(context)
+    if enhanced_opt and not orig.is_enhanced:
+        if reuse is not None and context.get('audio') is orig:
+            log_cb("[ASR] Reusing enhanced audio for full text.")
+            return reuse
+        log_cb("[ASR] Enhancing full input...")
+        return _persist(context, _enhance(context, orig, 'full_clean', token, progress_cb), 'full_clean')
+    return orig
+
+def _wait_whisper(engine, task_ids, token, progress_cb, tracer=NULL_TRACER, on_done=None):
+    """
+    轮询等待 Whisper 任务；取消时立即清空引擎队列并抛出 CancelledError
+    on_done(tid, task): 每个任务成功完成时回调一次 (用于逐段写入检查点)
+    :return: {task_id: 任务状态}；[修改] 任务随之从引擎的任务表中移除 (取消 / 出错时同样移除)
+    """
+    reported = set()
+    try:
+        with tracer.span("whisper wait (polling)", cat="wait"):
+            while True:
+                status = {tid: engine.get_task_status(tid) for tid in task_ids}
+                if on_done:
+                    for tid, t in status.items():
+                        if t['status'] == 'COMPLETED' and tid not in reported:
+                            reported.add(tid); on_done(tid, t)
+                done = sum(1 for t in status.values() if t['status'] in WHISPER_DONE)
+                progress_cb(done / max(len(task_ids), 1))
+                if done == len(task_ids): break
+                if token.wait(0.5):
+                    engine.cancel_pending()
+                    token.check()
+    finally:
+        results = {tid: engine.pop_task(tid) for tid in task_ids}
+    # 工作线程中记录的逐段推理耗时，补记为独立 span
+    for t in results.values():
+        if t.get('finished'):
+            tracer.add("transcribe segment", t['started'], t['finished'], cat="asr", tid=t['tid'],
+                       cpu=t.get('cpu'), file=os.path.basename(t['file']))
+    return results
+
+WHISPER_DONE = ('COMPLETED', 'FAILED', 'CANCELLED')
+
+def _new_log_path(res_dir):
+    """meeting_logs/Log_<时间戳>.txt；批处理时多个进程可能在同一秒完成，重名时追加序号"""
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_dir = os.path.join(res_dir, "meeting_logs")
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"Log_{ts}.txt")
+    n = 1
+    while os.path.exists(log_path):
+        log_path = os.path.join(log_dir, f"Log_{ts}_{n}.txt"); n += 1
+    return log_path
+
+def _append_full_text(context, full_text, log_cb):
+    """将全文参考追加到转写记录 (及日志文件) 中；已包含时跳过"""
+    transcript = context.get('transcript')
+    if not full_text or transcript is None or FULL_TEXT_HEADER in transcript: return context
+    transcript += "\n\n" + FULL_TEXT_HEADER + "\n" + full_text
+    context['transcript'] = transcript
+    if context.get('log_path'):
+        with open(context['log_path'], 'w', encoding='utf-8') as f: f.write(transcript)
+    log_cb("[ASR] Full text reference added.")
+    return context
 
 class NodeProcessor:
-    def process(self, context, config, log_cb): raise NotImplementedError
+    # 结果能否被 StageCache 复用 (有外部副作用或结果不确定的节点设为 False)
+    cacheable = True
+    # 处理逻辑变更时递增，使旧的缓存条目失效
+    version = "1"
+
+    def process(self, context, config, log_cb, token, progress_cb):
+        """
+        :param token: CancelToken，长循环中调用 token.check() 响应 Stop
+        :param progress_cb: progress_cb(0~1)，汇报节点内部进度
+        """
+        raise NotImplementedError
+
+    def cache_version(self, config):
+        """参与缓存 key 的模型/版本信息"""
+        return self.version
+
+    def replay(self, delta, log_cb):
+        """命中缓存时调用，用于重放节点原本会产生的界面输出"""
+        pass
 
 class SourceProcessor(NodeProcessor):
+    cacheable = False
+
     def __init__(self, resource_dir):
         self.raw_dir = os.path.join(resource_dir, "raw")
-        self.recorder = RealTimeAudioProvider(resource_path=resource_dir)
+        self.resource_dir = resource_dir
+        # [新增] 解码缓存：同一录音只解码 / 重采样一次，之后内存映射
+        self.audio_cache = AudioCache(os.path.join(resource_dir, "audio_cache"))
+        self._recorder = None
         os.makedirs(self.raw_dir, exist_ok=True)
 
-    def process(self, context, config, log_cb):
+    @property
+    def recorder(self):
+        # 录音器 (PyAudio) 只在 GUI 真正录音时才创建，批处理无需声卡
+        if self._recorder is None:
+            from utilities.audio_processor.recorder import RealTimeAudioProvider
+            self._recorder = RealTimeAudioProvider(resource_path=self.resource_dir)
+        return self._recorder
+
+    def process(self, context, config, log_cb, token, progress_cb):
         path = config.get('file_path')
         if not path: path = context.get('audio_path')
         if not path: raise ValueError("Audio path not provided in config or context.")
         if not os.path.exists(path): raise FileNotFoundError(f"Audio file not found: {path}")
 
-        target = os.path.join(self.raw_dir, os.path.basename(path))
-        if os.path.abspath(path) != os.path.abspath(target):
-            try: shutil.copy2(path, target)
-            except: target = path
+        # [新增] 异常中断的录音 (已在 resource/raw 中)：按实际数据长度修正 WAV 头部
+        in_raw = os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.raw_dir)
+        if in_raw and path.lower().endswith('.wav') and repair_header(path):
+            log_cb(f"[Source] Repaired header of interrupted recording: {os.path.basename(path)}")
+
+        # [修改] 按内容哈希入库 (硬链接，不再整份复制)；哈希同时作为下游节点缓存 key 的根
+        tracer = _tracer(context)
+        with tracer.span("audio hash", cat="io"):
+            try: target, context['audio_hash'] = self.audio_cache.ingest(path, self.raw_dir)
+            except OSError: target, context['audio_hash'] = path, self.audio_cache.content_hash(path)
+        # [新增] 录音时生成的语音索引随音频一起入库
+        if target != path and os.path.exists(index_path(path)) and not os.path.exists(index_path(target)):
+            link_or_copy(index_path(path), index_path(target))
         
         context['audio_path'] = target
         context['orig_audio_path'] = target 
+        # [新增] 只在此处解码一次 (16 kHz float32，按哈希缓存并内存映射)，后续节点通过缓冲区传递零拷贝切片
+        with tracer.span("audio decode", cat="io"):
+            context['audio'] = AudioBuffer.from_file(target, self.audio_cache, context['audio_hash'], token, progress_cb)
+        context['orig_audio'] = context['audio']
         
         mode_label = "Recorded" if config.get('mode') == 'mic' else "Loaded"
         log_cb(f"[Source] {mode_label}: {os.path.basename(target)}")
         return context
 
 class EnhancerProcessor(NodeProcessor):
-    def process(self, context, config, log_cb):
+    # [修改] 降噪以平稳噪声样本为参照：room 为空时每段录音估计一次；
+    # 填写会议室名时样本保存到 resource/noise_profiles/<room>.npz，之后同一会议室 / 设备的录音直接复用
+    version = "2"
+
+    def __init__(self, resource_dir=None):
+        self.profile_dir = os.path.join(resource_dir, "noise_profiles") if resource_dir else None
+
+    def profile_path(self, room):
+        if not room or not self.profile_dir: return None
+        name = "".join(c if c.isalnum() or c in "-_" else "_" for c in room.strip())
+        return os.path.join(self.profile_dir, f"{name}.npz")
+
+    def cache_version(self, config):
+        # 会议室样本被重新估计 (文件删除后重建) 会改变降噪结果
+        path = self.profile_path(config.get('room', ''))
+        if not path: return self.version
+        try: st = os.stat(path); sig = f"{st.st_size}:{st.st_mtime_ns}"
+        except OSError: sig = "none"
+        return f"{self.version}/room:{sig}"
+
+    def process(self, context, config, log_cb, token, progress_cb):
         if not config.get('enable', True): 
             log_cb("[Enhancer] Skipped")
             return context
-        path = context['audio_path']
+        from utilities.audio_processor.noise_profile import NoiseProfile
+        room = config.get('room', '').strip()
+        path = self.profile_path(room)
+        if path and os.path.exists(path):
+            profile = NoiseProfile.load(path)
+            log_cb(f"[Enhancer] Using saved noise profile '{room}'.")
+        else:
+            profile = _noise_profile(context)
+            if path and profile is not None:
+                profile = NoiseProfile(profile.clip, profile.sr, profile.level_db, source=room)
+                profile.save(path)
+                log_cb(f"[Enhancer] Noise profile '{room}' saved ({profile.level_db:.0f} dB).")
+        # 下游 ASR / Full Text 的降噪沿用同一样本
+        if profile is not None: context['noise_profile'] = profile
         log_cb("[Enhancer] Denoising...")
-        audio, sr = sf.read(path)
-        if len(audio.shape) > 1: audio = np.mean(audio, axis=1)
-        clean = AudioEnhancer(sr=sr).reduce_noise(audio)
-        out_path = path.replace(".wav", "_clean.wav")
-        sf.write(out_path, clean, sr)
-        context['audio_path'] = out_path
+        context['audio'] = _persist(context, _enhance(context, _get_audio(context), 'clean', token, progress_cb), 'clean')
         return context
 
 class VADProcessor(NodeProcessor):
-    def process(self, context, config, log_cb):
-        path = context['audio_path']
+    # [修改] 输出语音区间索引 context['speech_regions']，不再拼接出 _vad.wav：
+    # 音频保持原样，下游节点据此跳过静音，时间轴与 [12.3s] 标签保持真实会议时间
+    # [修改] 改用向量化的 FrameVAD (长录音 20x 实时以上)，带滞回与拖尾平滑
+    version = "3"
+
+    def process(self, context, config, log_cb, token, progress_cb):
+        token.check()
+        buf = _get_audio(context)
         agg = int(config.get('aggressiveness', 3))
-        log_cb(f"[VAD] Processing (Agg={agg})...")
-        audio, sr = sf.read(path)
-        if len(audio.shape) > 1: audio = np.mean(audio, axis=1)
-        vad = AdvancedVAD(aggressiveness=agg, sr=sr) if AdvancedVAD else SimpleEnergyVAD(0.005 * (agg + 1))
-        try: clean_speech = vad.process(audio, sr=sr)
+        vad = FrameVAD(aggressiveness=agg, sr=buf.sr)
+        # [新增] 录音器边录边做的 webrtc 判决 (旁路索引) 与本节点参数一致时直接复用，无需重新扫描
+        index = self._live_index(context, vad, buf)
+        try:
+            if index is not None:
+                log_cb(f"[VAD] Using speech index recorded live (Agg={agg}).")
+                mask = vad.smooth(index['mask'])
+            else:
+                log_cb(f"[VAD] Processing (Agg={agg}, {vad.backend})...")
+                with _tracer(context).span("vad", cat="dsp"): mask = vad.speech_mask(buf.samples, sr=buf.sr)
         except Exception as e: log_cb(f"[VAD] Error: {e}"); return context
-        if len(clean_speech) == 0: log_cb("[VAD] Warning: All silence. Keeping original."); return context
-        out_path = path.replace(".wav", "_vad.wav")
-        sf.write(out_path, clean_speech, sr)
-        context['audio_path'] = out_path
+        regions = SpeechRegions.from_mask(mask, vad.frame_len(buf.sr), buf.sr, len(buf))
+        if len(regions) == 0: log_cb("[VAD] Warning: All silence. Keeping original."); return context
+        context['speech_regions'] = regions
+        log_cb(f"[VAD] Speech {regions.speech_sec:.1f}s / {buf.duration:.1f}s ({regions.ratio:.0%}) in {len(regions)} region(s).")
+        if context.get('materialize_intermediates'):
+            _persist(context, buf.derive(np.concatenate([buf.view(s, e) for s, e in zip(regions.starts, regions.ends)]), 'vad'), 'vad')
         return context
 
+    @staticmethod
+    def _live_index(context, vad, buf):
+        path = context.get('orig_audio_path') or context.get('audio_path')
+        index = load_index(path) if path else None
+        if index is None: return None
+        frame_len = vad.frame_len(buf.sr)
+        # 采样率、帧长、灵敏度一致，且总长与音频吻合 (防止文件被替换) 才复用
+        if (index['sr'], index['frame_len'], index['aggressiveness']) != (buf.sr, frame_len, vad.aggressiveness): return None
+        if abs(index['total'] - len(buf)) >= frame_len: return None
+        return index
+
 class SpeakerIDProcessor(NodeProcessor):
-    def process(self, context, config, log_cb):
+    # [修改] 末尾不足一个步长的音频也会生成窗口 (最后一个整窗恰好到达末尾时不补)；
+    # 窗口特征取自连续段共享的 Fbank 矩阵 (窗口边缘使用真实上下文)
+    version = "5"
+
+    def __init__(self, res_dir):
+        self.db_path = os.path.join(res_dir, "speakers.db")
+
+    def cache_version(self, config):
+        # 声纹库变化 (录入/删除/改名) 会改变识别结果，需使缓存失效
+        try: st = os.stat(self.db_path); db_sig = f"{st.st_size}:{st.st_mtime_ns}"
+        except OSError: db_sig = "none"
+        return f"{self.version}/db:{db_sig}"
+
+    def process(self, context, config, log_cb, token, progress_cb):
         log_cb("[SpeakerID] Analyzing...")
-        audio, sr = sf.read(context['audio_path'])
+        buf = _get_audio(context)
         
-        # Engine 内部现在会在 diarize 结束后自动 unload_model
-        timeline = SpeakerEngine().diarize(audio, sr=sr, 
-                                         window_sec=config.get('window', 1.5),
-                                         step_sec=config.get('step', 0.75))
+        # [修改] 声纹模型来自进程级模型池，diarize 结束后归还，是否卸载由池的策略决定
+        tracer = _tracer(context)
+        engine = SpeakerEngine(self.db_path)
+        with tracer.span("model load: speaker encoder", cat="model"): engine.db.load_model()
+        timeline = engine.diarize(buf.samples, sr=buf.sr, 
+                                  window_sec=config.get('window', 1.5),
+                                  step_sec=config.get('step', 0.75),
+                                  batch_size=config.get('batch', 32),
+                                  token=token, progress_cb=progress_cb, tracer=tracer,
+                                  regions=context.get('speech_regions'))
         context['timeline'] = timeline if timeline else []
         log_cb(f"[SpeakerID] Segments: {len(context['timeline'])}")
-        
-        # 再次确保垃圾回收
-        gc.collect()
-        if torch and torch.cuda.is_available(): torch.cuda.empty_cache()
         return context
 
 class ASRProcessor(NodeProcessor):
@@ -138,76 +405,121 @@ class ASRProcessor(NodeProcessor):
         self.temp_dir = os.path.join(res_dir, "temp_segments")
         os.makedirs(self.temp_dir, exist_ok=True)
 
-    def process(self, context, config, log_cb):
+    def replay(self, delta, log_cb):
+        for line in delta.get('transcript_lines', []): log_cb(line, is_result=True)
+        # 日志文件被清理过时按缓存内容重建，供 LLM 节点读取
+        log_path = delta.get('log_path')
+        if log_path and not os.path.exists(log_path) and delta.get('transcript'):
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, 'w', encoding='utf-8') as f: f.write(delta['transcript'])
+
+    def process(self, context, config, log_cb, token, progress_cb):
         model_size = config.get('model', 'small')
         full_correction = config.get('full_text_correction', False)
         enhanced_opt = config.get('enhanced_audio', False)
         
         log_cb(f"[ASR] Transcribing ({model_size})...")
-        engine = AsyncWhisperEngine(model_size=model_size)
+        tracer = _tracer(context)
+        # [新增] 检查点：已转写的片段直接复用，只提交缺失的片段
+        journal = context.get('journal')
+        journaled = journal.load() if journal else {}
+        if journaled: log_cb(f"[ASR] Resuming: {len(journaled)} segment(s) already transcribed.")
+        engine = None
+        tasks = []
+
+        def submit(audio_in):
+            # Whisper 在第一次真正需要转写时才取得，全部片段都已完成时无需加载模型
+            nonlocal engine
+            if engine is None:
+                with tracer.span(f"model load: whisper-{model_size}", cat="model"):
+                    engine = MODELS.acquire(WHISPER, model_size)
+            return engine.submit_task(audio_in)
+
+        def record(tid, res):
+            t = next(t for t in tasks if t['id'] == tid)
+            info = t['info'] or {}
+            journal.append({'key': t['key'], 'start': info.get('start'), 'end': info.get('end'),
+                            'speaker': info.get('speaker'), 'text': res['result'].strip()})
         
         try:
             # --- 1. 处理 Segmented Audio ---
-            input_path = context['audio_path']
-            if enhanced_opt and "_clean" not in os.path.basename(input_path):
+            buf = _get_audio(context)
+            asr_clean = None
+            if enhanced_opt and not buf.is_enhanced:
                 log_cb("[ASR] Enhancing segmented input...")
-                audio_data, rate = sf.read(input_path)
-                if len(audio_data.shape) > 1: audio_data = np.mean(audio_data, axis=1)
-                clean_audio = AudioEnhancer(sr=rate).reduce_noise(audio_data)
-                clean_path = input_path.replace(".wav", "_asr_clean.wav")
-                sf.write(clean_path, clean_audio, rate)
-                input_path = clean_path
+                buf = asr_clean = _persist(context, _enhance(context, buf, 'asr_clean', token, _sub_progress(progress_cb, 0.0, 0.1)), 'asr_clean')
             
-            audio, sr = sf.read(input_path)
+            sr = buf.sr
             timeline = context.get('timeline', [])
-            tasks = []
+            # [新增] VAD 语音区间：片段收缩到其中的语音部分，纯静音片段不转写
+            regions = context.get('speech_regions')
 
             if timeline and len(timeline) > 0:
                 for i, seg in enumerate(timeline):
+                    token.check()
                     s, e = int(seg['start']*sr), int(seg['end']*sr)
+                    if regions is not None:
+                        span = regions.trim(s, e)
+                        if span is None: continue
+                        s, e = span
+                        seg = dict(seg, start=round(s / sr, 2), end=round(e / sr, 2))
                     if e <= s: continue
-                    chunk_path = os.path.join(self.temp_dir, f"chunk_{i}.wav")
-                    sf.write(chunk_path, audio[s:e], sr)
-                    tid = engine.submit_task(chunk_path)
-                    tasks.append({'id': tid, 'type': 'segment', 'info': seg, 'path': chunk_path})
+                    key = f"seg{i}:{seg['start']:.2f}-{seg['end']:.2f}"
+                    if key in journaled:
+                        tasks.append({'id': None, 'type': 'segment', 'info': seg, 'path': None, 'key': key, 'text': journaled[key]['text']})
+                        continue
+                    audio_in, chunk_path = _whisper_input(buf, self.temp_dir, f"chunk_{i}", s, e)
+                    tid = submit(audio_in)
+                    tasks.append({'id': tid, 'type': 'segment', 'info': seg, 'path': chunk_path, 'key': key})
+            elif regions is not None:
+                log_cb(f"[ASR] No timeline. Transcribing {len(regions)} speech region(s).")
+                for i, (s, e) in enumerate(regions.chunks()):
+                    token.check()
+                    seg = {'start': round(s / sr, 2), 'end': round(e / sr, 2), 'speaker': '?'}
+                    key = f"vad{i}:{seg['start']:.2f}-{seg['end']:.2f}"
+                    if key in journaled:
+                        tasks.append({'id': None, 'type': 'segment', 'info': seg, 'path': None, 'key': key, 'text': journaled[key]['text']})
+                        continue
+                    audio_in, chunk_path = _whisper_input(buf, self.temp_dir, f"chunk_{i}", s, e)
+                    tid = submit(audio_in)
+                    tasks.append({'id': tid, 'type': 'segment', 'info': seg, 'path': chunk_path, 'key': key})
             else:
                 log_cb("[ASR] No timeline. Forcing full transcription.")
-                tid = engine.submit_task(input_path)
-                tasks.append({'id': tid, 'type': 'segment', 'info': {'start':0,'end':len(audio)/sr,'speaker':'?'}, 'path':None})
+                info = {'start':0,'end':buf.duration,'speaker':'?'}
+                if 'segment_full' in journaled:
+                    tasks.append({'id': None, 'type': 'segment', 'info': info, 'path': None, 'key': 'segment_full', 'text': journaled['segment_full']['text']})
+                else:
+                    audio_in, tmp_path = _whisper_input(buf, self.temp_dir, "segment_full")
+                    tid = submit(audio_in)
+                    tasks.append({'id': tid, 'type': 'segment', 'info': info, 'path':tmp_path, 'key': 'segment_full'})
 
             # --- 2. 处理 Full Text Audio ---
             full_text_tid = None
-            full_text_result = ""
-            
-            if full_correction:
-                original_input = context.get('orig_audio_path', context['audio_path'])
-                if enhanced_opt and "_clean" not in os.path.basename(original_input):
-                    if os.path.basename(original_input) == os.path.basename(context['audio_path']) and "_asr_clean" in input_path:
-                         log_cb("[ASR] Reusing enhanced audio for full text.")
-                         original_input = input_path
-                    else:
-                        log_cb("[ASR] Enhancing full input...")
-                        orig_data, orig_rate = sf.read(original_input)
-                        if len(orig_data.shape) > 1: orig_data = np.mean(orig_data, axis=1)
-                        clean_orig = AudioEnhancer(sr=orig_rate).reduce_noise(orig_data)
-                        clean_orig_path = original_input.replace(".wav", "_full_clean.wav")
-                        sf.write(clean_orig_path, clean_orig, orig_rate)
-                        original_input = clean_orig_path
-
-                log_cb(f"[ASR] + Full Correction: {os.path.basename(original_input)}")
-                full_text_tid = engine.submit_task(original_input)
-                tasks.append({'id': full_text_tid, 'type': 'full', 'info': None, 'path': None})
-
-            # 3. 等待
+            full_text_result = context.get('full_text', "")
+
+            if full_correction and full_text_result:
+                log_cb("[ASR] Reusing full text from upstream node.")
+            elif full_correction and 'full' in journaled:
+                full_text_result = journaled['full']['text']
+            elif full_correction:
+                full_buf = _full_text_input(context, enhanced_opt, log_cb, reuse=asr_clean,
+                                            token=token, progress_cb=_sub_progress(progress_cb, 0.1, 0.2))
+                log_cb(f"[ASR] + Full Correction: {os.path.basename(context.get('orig_audio_path', ''))}")
+                audio_in, tmp_path = _whisper_input(full_buf, self.temp_dir, "full_text")
+                full_text_tid = submit(audio_in)
+                tasks.append({'id': full_text_tid, 'type': 'full', 'info': None, 'path': tmp_path, 'key': 'full'})
+
+            # 3. 等待 (Stop 时立即清空队列)；每段完成即写入检查点
             results_text = []
-            while True:
-                done = sum(1 for t in tasks if engine.get_task_status(t['id'])['status'] in ['COMPLETED', 'FAILED'])
-                if done == len(tasks): break
-                time.sleep(0.5)
+            pending = [t['id'] for t in tasks if t['id']]
+            finished = {}
+            if pending:
+                finished = _wait_whisper(engine, pending, token, _sub_progress(progress_cb, 0.2, 1.0), tracer,
+                                         on_done=record if journal else None)
 
             # 4. 收集
             for t in tasks:
-                res = engine.get_task_status(t['id'])
+                res = finished[t['id']] if t['id'] else {'status': 'COMPLETED', 'result': t['text']}
                 if res['status'] == 'COMPLETED':
                     text = res['result'].strip()
                     if t['type'] == 'segment':
@@ -223,36 +535,95 @@ class ASRProcessor(NodeProcessor):
             final_log_content = "=== Segmented Transcript (Speaker Diarized) ===\n"
             final_log_content += "\n".join(results_text)
             
-            if full_correction and full_text_result:
-                final_log_content += "\n\n=== Full Text Reference (Continuous Audio) ===\n"
-                final_log_content += full_text_result
-                log_cb("[ASR] Full text reference added.")
-
             context['transcript'] = final_log_content
-            ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            log_dir = os.path.join(os.path.dirname(self.temp_dir), "meeting_logs")
-            os.makedirs(log_dir, exist_ok=True)
-            log_path = os.path.join(log_dir, f"Log_{ts}.txt")
-            with open(log_path, 'w', encoding='utf-8') as f: f.write(final_log_content)
+            context['transcript_lines'] = results_text
+            log_path = _new_log_path(os.path.dirname(self.temp_dir))
+            with tracer.span("write log", cat="io"):
+                with open(log_path, 'w', encoding='utf-8') as f: f.write(final_log_content)
             context['log_path'] = log_path
+            if full_correction: _append_full_text(context, full_text_result, log_cb)
             
         finally:
-            # [核心修改] 任务结束后强制销毁 Whisper 引擎并清理显存
-            del engine
-            gc.collect()
-            if torch and torch.cuda.is_available():
-                torch.cuda.empty_cache()
-            # log_cb("[ASR] Memory cleared.")
+            # [修改] 任务结束 (或取消) 后归还 Whisper 引擎，Auto-Unload 策略下立即关闭并清理显存
+            if engine is not None:
+                # 提交后未进入等待即出错的任务也从任务表中移除
+                for t in tasks:
+                    if t['id']: engine.pop_task(t['id'])
+                MODELS.release(WHISPER, model_size)
+            # 取消时清理尚未删除的临时切片
+            for t in tasks:
+                if t['path'] and os.path.exists(t['path']):
+                    try: os.remove(t['path'])
+                    except: pass
             
         return context
 
+class FullTextASRProcessor(NodeProcessor):
+    """
+    [新增] 独立的全文转写节点：不依赖时间轴，可与 Speaker ID 并行执行。
+    结果写入 context['full_text']，在下游 (Whisper ASR / LLM Summary) 汇合。
+    """
+    def __init__(self, res_dir):
+        self.temp_dir = os.path.join(res_dir, "temp_segments")
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def process(self, context, config, log_cb, token, progress_cb):
+        model_size = config.get('model', 'small')
+        # [新增] 检查点中已有全文结果时直接复用
+        journal = context.get('journal')
+        journaled = journal.load() if journal else {}
+        if 'full' in journaled:
+            context['full_text'] = journaled['full']['text']
+            log_cb(f"[FullText] Restored from checkpoint ({len(context['full_text'])} chars).")
+            return _append_full_text(context, context['full_text'], log_cb)
+        full_buf = _full_text_input(context, config.get('enhanced_audio', False), log_cb,
+                                    token=token, progress_cb=_sub_progress(progress_cb, 0.0, 0.2))
+        log_cb(f"[FullText] Transcribing {os.path.basename(context.get('orig_audio_path', ''))} ({model_size})...")
+        tracer = _tracer(context)
+        with tracer.span(f"model load: whisper-{model_size}", cat="model"):
+            engine = MODELS.acquire(WHISPER, model_size)
+        audio_in, tmp_path = _whisper_input(full_buf, self.temp_dir, "full_text_node")
+        try:
+            tid = engine.submit_task(audio_in)
+            res = _wait_whisper(engine, [tid], token, _sub_progress(progress_cb, 0.2, 1.0), tracer)[tid]
+            if res['status'] == 'COMPLETED':
+                context['full_text'] = res['result'].strip()
+                if journal: journal.append({'key': 'full', 'text': context['full_text']})
+                log_cb(f"[FullText] Done ({len(context['full_text'])} chars).")
+            else:
+                log_cb(f"[FullText] Failed: {res['error']}")
+        finally:
+            if tmp_path:
+                try: os.remove(tmp_path)
+                except: pass
+            MODELS.release(WHISPER, model_size)
+        # 若本节点接在 Whisper ASR 之后，直接在此补写全文
+        return _append_full_text(context, context.get('full_text'), log_cb)
+
 class LLMProcessor(NodeProcessor):
-    def process(self, context, config, log_cb):
-        if not config.get('enable', False) or not HAS_LLM: return context
-        log_cb("[LLM] Summarizing...")
+    cacheable = False
+
+    def process(self, context, config, log_cb, token, progress_cb):
+        # [新增] fan-in: 合并来自 Full Text ASR 分支的全文参考
+        _append_full_text(context, context.get('full_text'), log_cb)
+        if not config.get('enable', False): return context
         backend = config.get('backend', 'Local')
-        Cls = llm_online.RobustMeetingExtractor if 'Online' in backend else llm_local.RobustMeetingExtractor
-        data = Cls().process(context['log_path'])
+        try: Cls = _llm_extractor(backend)
+        except ImportError as e:
+            log_cb(f"[LLM] Backend '{backend}' unavailable: {e}"); return context
+        log_cb("[LLM] Summarizing...")
+
+        # LLM 请求无法中途打断：放到后台线程执行，Stop 时立即返回并丢弃结果
+        result = {}
+        def run():
+            try: result['data'] = Cls().process(context['log_path'], token=token, progress_cb=progress_cb)
+            except Exception as e: result['data'] = {'error': str(e)}
+        worker = threading.Thread(target=run, daemon=True)
+        with _tracer(context).span(f"llm request ({backend})", cat="llm"):
+            worker.start()
+            while worker.is_alive():
+                if token.wait(0.2): token.check()
+        data = result['data']
         if 'error' not in data:
             report = Cls().generate_readable_report(data)
             log_cb("√ Summary Ready!", is_result=True)
@@ -0,0 +1,268 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+from collections import deque
+
+from .cancel import CancelToken, CancelledError
+from .tracing import NULL_TRACER
+from .processors import AdvancedVAD, WHISPER_DONE, _new_log_path
+from utilities.model_manager import MODELS, WHISPER
+
+_END = object()
+FRAME_SEC = 0.03
+
+def live_config(nodes):
+    """
+    从管道图中取流式模式用到的配置；图中没有的节点对应的阶段被跳过
+    (没有 Whisper ASR 节点时仍以默认模型转写，否则流式模式没有输出)。
+    """
+    cfg = {'enhance': False, 'room': '', 'aggressiveness': 3, 'speaker_id': False, 'model': 'small', 'llm': None}
+    for node in nodes.values():
+        label, c = node['label'], node.get('config', {})
+        if label == "Audio Enhancer": cfg['enhance'], cfg['room'] = c.get('enable', True), c.get('room', '')
+        elif label == "VAD Detector": cfg['aggressiveness'] = int(c.get('aggressiveness', 3))
+        elif label == "Speaker ID": cfg['speaker_id'] = True
+        elif label == "Whisper ASR": cfg['model'] = c.get('model', 'small')
+        elif label == "LLM Summary" and c.get('enable', False): cfg['llm'] = c
+    return cfg
+
+class LivePipeline:
+    """
+    [新增] 流式 (边录边处理) 模式：录音块经有界队列依次流过 降噪 -> VAD 分句 -> 声纹识别 -> Whisper。
+    每个阶段是一个生成器，运行在各自的线程中；下游处理不过来时上游阻塞在队列上 (背压)。
+    一句话说完后数秒内即输出转写，停止录音时只需处理尚在队列中的尾部。
+    """
+
+    def __init__(self, config, log_cb, sr=16000, token=None, tracer=NULL_TRACER, db_path="resource/speakers.db",
+                 noise_path=None, block_sec=1.0, silence_sec=0.5, max_utt_sec=20.0, backlog_sec=60.0, queue_size=8):
+        self.config = config
+        self.log_cb = log_cb
+        self.sr = sr
+        self.token = token or CancelToken()
+        self.tracer = tracer
+        self.db_path = db_path
+        # 已保存的会议室噪声样本 (见 EnhancerProcessor)；流式块太短，无法自行估计平稳噪声
+        self.noise_path = noise_path
+        self.block = int(block_sec * sr)
+        self.silence_sec = silence_sec
+        self.max_utt_sec = max_utt_sec
+        self.queue_size = queue_size
+        # 录音回调不能阻塞：输入队列预留 backlog_sec 的积压，超出时丢弃并计数 (录音文件本身不受影响)
+        self.inq = queue.Queue(maxsize=max(1, int(backlog_sec / FRAME_SEC)))
+        self.dropped = 0
+        self.lines = []
+        self.timeline = []
+        self.latencies = []
+        self.threads = []
+
+    # --- 队列工具：阻塞等待期间定期检查取消 ---
+    def _get(self, q):
+        while True:
+            try: return q.get(timeout=0.2)
+            except queue.Empty: self.token.check()
+
+    def _put(self, q, item):
+        while True:
+            try: q.put(item, timeout=0.2); return
+            except queue.Full: self.token.check()
+
+    def _iter(self, q):
+        while True:
+            item = self._get(q)
+            if item is _END: return
+            yield item
+
+    def _run_stage(self, name, fn, inq, outq):
+        gen = fn(self._iter(inq))
+        try:
+            for item in gen:
+                if outq is not None: self._put(outq, item)
+        except CancelledError:
+            pass
+        except Exception as e:
+            self.log_cb(f"[Live] {name} stage failed: {e}")
+            self.token.cancel()
+        finally:
+            gen.close()
+            if outq is not None:
+                try: self._put(outq, _END)
+                except CancelledError: pass
+
+    def start(self):
+        stages = [("blocks", self._blocks)]
+        if self.config['enhance']: stages.append(("enhance", self._enhance))
+        stages.append(("vad", self._segment))
+        if self.config['speaker_id']: stages.append(("speaker", self._identify))
+        stages += [("asr", self._transcribe), ("output", self._emit)]
+        q = self.inq
+        for i, (name, fn) in enumerate(stages):
+            out = queue.Queue(maxsize=self.queue_size) if i < len(stages) - 1 else None
+            t = threading.Thread(target=self._run_stage, args=(name, fn, q, out), name=f"live-{name}", daemon=True)
+            t.start()
+            self.threads.append(t)
+            q = out
+        self.log_cb(f"[Live] Streaming: {' -> '.join(name for name, _ in stages[1:-1])}")
+        return self
+
+    def feed(self, pcm):
+        """录音线程回调 (int16 PCM bytes)；不阻塞，积压超过上限时丢弃"""
+        try:
+            self.inq.put_nowait((time.monotonic(), pcm))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1: self.log_cb("[Live] Warning: processing is falling behind, dropping live audio.")
+
+    # --- 各阶段 (生成器) ---
+    def _blocks(self, chunks):
+        """int16 PCM 小块 -> 约 block_sec 的 float32 块: (起始采样, samples, 最后一块到达时刻)"""
+        parts, n, offset, t_in = [], 0, 0, 0.0
+        for t_in, pcm in chunks:
+            parts.append(np.frombuffer(pcm, dtype=np.int16))
+            n += len(parts[-1])
+            if n >= self.block:
+                samples = np.concatenate(parts).astype(np.float32) / 32768.0
+                yield offset, samples, t_in
+                offset += len(samples)
+                parts, n = [], 0
+        if parts: yield offset, np.concatenate(parts).astype(np.float32) / 32768.0, t_in
+
+    def _enhance(self, blocks):
+        """
+        逐块降噪；每块前拼接上一块末尾 0.5 s 作为上下文，减少块边界处噪声估计的跳变。
+        [新增] 会议室有保存的噪声样本时以其为参照 (stationary)
+        """
+        from utilities.audio_processor.enhancer import AudioEnhancer
+        from utilities.audio_processor.noise_profile import NoiseProfile
+        enhancer = AudioEnhancer(sr=self.sr)
+        noise = None
+        if self.noise_path and os.path.exists(self.noise_path):
+            noise = NoiseProfile.load(self.noise_path)
+            if noise.sr != self.sr: noise = None
+            else: self.log_cb(f"[Live] Using noise profile '{noise.source}'.")
+        keep = self.sr // 2
+        prev = np.zeros(0, dtype=np.float32)
+        for offset, samples, t_in in blocks:
+            with self.tracer.span("live enhance", cat="dsp"):
+                out = enhancer.reduce_noise(np.concatenate([prev, samples]), noise=noise)[len(prev):]
+            prev = samples[-keep:]
+            yield offset, np.asarray(out, dtype=np.float32), t_in
+
+    def _segment(self, blocks):
+        """
+        30 ms 帧级 VAD 分句：连续静音超过 silence_sec 或句长超过 max_utt_sec 时切出一句。
+        句子保留录音起点起的绝对时间，句首带 0.3 s 前导音频，不足 0.25 s 语音的片段丢弃。
+        """
+        sr, frame = self.sr, int(self.sr * FRAME_SEC)
+        agg = self.config['aggressiveness']
+        if AdvancedVAD:
+            vad = AdvancedVAD(aggressiveness=agg, sr=sr).vad
+            is_speech = lambda f: vad.is_speech((f * 32767).astype(np.int16).tobytes(), sr)
+        else:
+            threshold = 0.005 * (agg + 1)
+            is_speech = lambda f: float(np.mean(f ** 2)) > threshold
+        hang, max_frames, pad, min_speech = int(self.silence_sec / FRAME_SEC), int(self.max_utt_sec / FRAME_SEC), 10, 8
+
+        history = deque(maxlen=pad)
+        utt, utt_start, silent, voiced = [], None, 0, 0
+        pending, pos = np.zeros(0, dtype=np.float32), 0
+
+        def cut(block_end, t_in):
+            frames = utt[:len(utt) - max(silent - pad, 0)]
+            samples = np.concatenate(frames)
+            end = utt_start + len(samples)
+            # 句尾实际被录下的时刻 = 当前块到达时刻 - 句尾之后已录入的时长
+            return {'start': utt_start / sr, 'end': end / sr, 'samples': samples, 'speaker': '?',
+                    't_end': t_in - (block_end - end) / sr}
+
+        for offset, samples, t_in in blocks:
+            self.token.check()
+            pending = np.concatenate([pending, samples])
+            block_end = offset + len(samples)
+            n = len(pending) // frame
+            with self.tracer.span("live vad", cat="dsp"):
+                decisions = [is_speech(pending[k * frame:(k + 1) * frame]) for k in range(n)]
+            for k, speech in enumerate(decisions):
+                f = pending[k * frame:(k + 1) * frame]
+                if utt_start is None:
+                    if speech:
+                        utt, utt_start, silent, voiced = list(history) + [f], pos + (k - len(history)) * frame, 0, 1
+                    else:
+                        history.append(f)
+                    continue
+                utt.append(f)
+                silent = 0 if speech else silent + 1
+                voiced += speech
+                if silent >= hang or len(utt) >= max_frames:
+                    if voiced >= min_speech: yield cut(block_end, t_in)
+                    utt, utt_start = [], None
+                    history.clear()
+            pending = pending[n * frame:]
+            pos += n * frame
+        if utt_start is not None and voiced >= min_speech: yield cut(pos, time.monotonic())
+
+    def _identify(self, utts):
+        """整句提取一次声纹并匹配 (句子由停顿切分，通常只含一个说话人)"""
+        from utilities.diarization.speaker_db import SpeakerDB
+        db = SpeakerDB(self.db_path)
+        with self.tracer.span("model load: speaker encoder", cat="model"): db.load_model()
+        try:
+            for u in utts:
+                with self.tracer.span("live speaker id", cat="model"):
+                    name, title = db.match_speaker(db.extract_embedding_from_memory(u['samples']), threshold=0.30)
+                u['speaker'] = (f"{name} ({title})" if title else name) if name != "Unknown" else "Unknown"
+                yield u
+        finally:
+            db.unload_model()
+
+    def _transcribe(self, utts):
+        model_size = self.config['model']
+        with self.tracer.span(f"model load: whisper-{model_size}", cat="model"):
+            engine = MODELS.acquire(WHISPER, model_size)
+        try:
+            for u in utts:
+                tid = engine.submit_task(u['samples'])
+                try:
+                    while engine.get_task_status(tid)['status'] not in WHISPER_DONE:
+                        if self.token.wait(0.05):
+                            engine.cancel_pending()
+                            self.token.check()
+                finally:
+                    # [修改] 结果取出后即从常驻引擎的任务表中移除
+                    t = engine.pop_task(tid)
+                if t.get('finished'):
+                    self.tracer.add("transcribe segment", t['started'], t['finished'], cat="asr", tid=t['tid'], cpu=t.get('cpu'))
+                if t['status'] == 'COMPLETED' and t['result'].strip():
+                    u['text'] = t['result'].strip()
+                    yield u
+        finally:
+            MODELS.release(WHISPER, model_size)
+
+    def _emit(self, utts):
+        for u in utts:
+            line = f"[{u['start']:.1f}s] {u['speaker']}: {u['text']}"
+            self.lines.append(line)
+            self.timeline.append({'start': round(u['start'], 2), 'end': round(u['end'], 2), 'speaker': u['speaker']})
+            self.latencies.append(time.monotonic() - u['t_end'])
+            self.log_cb(line, is_result=True)
+            yield line
+
+    def finish(self, res_dir):
+        """
+        结束输入并等待尾部处理完毕，写出转写日志。
+        :return: 与 Whisper ASR 节点相同的上下文键 (transcript / transcript_lines / timeline / log_path)
+        """
+        try: self._put(self.inq, _END)
+        except CancelledError: pass
+        for t in self.threads: t.join()
+        if self.dropped: self.log_cb(f"[Live] Dropped {self.dropped * FRAME_SEC:.1f}s of live audio (recording file is complete).")
+        if self.latencies:
+            self.log_cb(f"[Live] {len(self.latencies)} utterance(s), latency avg {np.mean(self.latencies):.1f}s / max {max(self.latencies):.1f}s")
+
+        transcript = "=== Segmented Transcript (Speaker Diarized) ===\n" + "\n".join(self.lines)
+        log_path = _new_log_path(res_dir)
+        with self.tracer.span("write log", cat="io"):
+            with open(log_path, 'w', encoding='utf-8') as f: f.write(transcript)
+        return {'transcript': transcript, 'transcript_lines': list(self.lines),
+                'timeline': list(self.timeline), 'log_path': log_path}
\ No newline at end of file
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource # Unix
+except ImportError:
+    resource = None
+try:
+    import psutil # Windows 下获取峰值内存
+except ImportError:
+    psutil = None
+
+def peak_rss_mb():
+    """进程峰值常驻内存 (MB)，无法获取时返回 0"""
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    if psutil:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return 0.0
+
+def rss_mb():
+    """当前常驻内存 (MB)，用于采样某一阶段内的内存峰值；无法获取时返回 0"""
+    if psutil:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+class Tracer:
+    """
+    记录一次运行中的耗时区间 (span)：模型加载、音频解码、逐段转写、声纹提取、DB 匹配、LLM 请求等。
+    每个 span 带墙钟时间、线程 CPU 时间和结束时的进程峰值 RSS，
+    可导出为 Chrome Trace / Perfetto 可直接打开的 JSON。
+    """
+
+    def __init__(self, name="IMA Pipeline"):
+        self.name = name
+        self.t0 = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, cat="node", **args):
+        start = time.perf_counter()
+        cpu0 = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), cat=cat, cpu=time.thread_time() - cpu0, **args)
+
+    def add(self, name, start, end, cat="node", tid=None, cpu=None, **args):
+        """添加一个已结束的 span (start/end 为 time.perf_counter() 值)"""
+        if tid is None:
+            tid = threading.get_ident()
+            thread_name = threading.current_thread().name
+        else:
+            thread_name = None
+        args = dict(args)
+        if cpu is not None: args['cpu_ms'] = round(cpu * 1000, 2)
+        args['peak_rss_mb'] = round(peak_rss_mb(), 1)
+        event = {
+            "name": name, "cat": cat, "ph": "X", "pid": self.pid, "tid": tid,
+            "ts": round((start - self.t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+            "args": args
+        }
+        with self.lock:
+            self.events.append(event)
+            if thread_name and tid not in self.threads: self.threads[tid] = thread_name
+
+    def export(self, path):
+        meta = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.name}}]
+        meta += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": tname}}
+                 for tid, tname in self.threads.items()]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": meta + self.events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return path
+
+    def summary(self, top=15):
+        """按 span 名称聚合，返回文本表格的各行"""
+        stats = {}
+        for e in self.events:
+            s = stats.setdefault(e["name"], [0, 0.0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += e["dur"] / 1e6
+            s[2] += e["args"].get("cpu_ms", 0.0) / 1000
+            s[3] = max(s[3], e["args"].get("peak_rss_mb", 0.0))
+        rows = sorted(stats.items(), key=lambda kv: -kv[1][1])[:top]
+        lines = [f"{'Span':<28}{'N':>6}{'Wall(s)':>10}{'CPU(s)':>10}{'RSS(MB)':>10}"]
+        for name, (n, wall, cpu, rss) in rows:
+            lines.append(f"{name[:27]:<28}{n:>6}{wall:>10.2f}{cpu:>10.2f}{rss:>10.0f}")
+        return lines
+
+class NullTracer:
+    """未启用追踪时使用，所有操作为空"""
+    @contextmanager
+    def span(self, name, cat="node", **args):
+        yield
+
+    def add(self, *args, **kwargs):
+        pass
+
+NULL_TRACER = NullTracer()
\ No newline at end of file
@@ -0,0 +1,14 @@
+import sys
+import argparse
+from ima import batch, resume
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ima", description="IMA 命令行工具 (无界面运行管道)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    batch.add_arguments(sub.add_parser("batch", help="按保存的管道配置批量处理目录中的录音"))
+    resume.add_arguments(sub.add_parser("resume", help="从检查点恢复中断 (崩溃 / Stop) 的运行"))
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.graph import graph_from_state
+from utilities.audio_processor.audio_io import AUDIO_EXTS
+
+# 每个工作进程持有一个 GraphExecutor，模型在该进程处理的所有文件之间复用
+_executor = None
+
+def _init_worker(resource_dir, use_cache, materialize, model_budget, torch_threads=None, enhance_workers=None):
+    global _executor
+    from core.executor import GraphExecutor
+    from utilities.model_manager import MODELS, KEEP_WARM, set_torch_threads
+    # [新增] torch CPU 线程数是进程级设置，在工作进程启动时设置一次
+    set_torch_threads(torch_threads)
+    # [新增] 多进程批处理时每个工作进程内降噪不再开进程池 (否则为 N x 4 个进程)。
+    # 通过环境变量交给 enhancer 在首次导入时读取：图中没有 Enhancer 节点 (或未安装 noisereduce) 时不影响工作进程启动
+    if enhance_workers: os.environ["IMA_ENHANCE_WORKERS"] = str(enhance_workers)
+    # 批处理期间模型常驻 (不按空闲时间卸载)，仅受内存预算约束
+    MODELS.configure(policy=KEEP_WARM, budget_mb=model_budget, idle_timeout=0)
+    _executor = GraphExecutor(resource_dir, use_cache=use_cache, materialize_intermediates=materialize)
+
+def _run_file(path, state, verbose):
+    name = os.path.basename(path)
+    def log(msg, is_result=False):
+        if verbose or not is_result: print(f"[{name}] {msg}", flush=True)
+
+    nodes, links, start_id = graph_from_state(state)
+    nodes[start_id]['config'] = {'mode': 'file', 'file_path': path}
+    t0 = time.time()
+    result = {"file": path, "status": "failed", "seconds": 0.0, "audio_seconds": 0.0, "nodes": {}, "log_path": None}
+    try:
+        ctx = _executor.execute(start_id, nodes, links, {}, log, lambda p: None)
+        result["status"] = _executor.last_status
+        result["nodes"] = dict(_executor.last_timings)
+        result["log_path"] = ctx.get('log_path')
+        if ctx.get('orig_audio') is not None: result["audio_seconds"] = ctx['orig_audio'].duration
+    except Exception as e:
+        log(f"!!! {e}")
+        traceback.print_exc()
+    result["seconds"] = time.time() - t0
+    return result
+
+def find_inputs(input_path):
+    if os.path.isfile(input_path): return [input_path]
+    files = [os.path.join(input_path, f) for f in sorted(os.listdir(input_path))]
+    return [f for f in files if os.path.isfile(f) and f.lower().endswith(AUDIO_EXTS)]
+
+def format_summary(results):
+    labels = []
+    for r in results:
+        for label in r["nodes"]:
+            if label not in labels: labels.append(label)
+    header = ["File", "Status", "Audio(s)", "Total(s)", "RTF"] + labels
+    rows = []
+    for r in results:
+        rtf = r["seconds"] / r["audio_seconds"] if r["audio_seconds"] else 0.0
+        rows.append([os.path.basename(r["file"]), r["status"], f"{r['audio_seconds']:.1f}", f"{r['seconds']:.1f}", f"{rtf:.2f}"]
+                    + [f"{r['nodes'][l]:.1f}" if l in r["nodes"] else "-" for l in labels])
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    line = lambda cells: "  ".join(str(c).ljust(w) for c, w in zip(cells, widths))
+    out = [line(header), line(["-" * w for w in widths])] + [line(r) for r in rows]
+    total = sum(r["seconds"] for r in results)
+    ok = sum(1 for r in results if r["status"] == "done")
+    out.append(f"\n{ok}/{len(results)} files done, {total:.1f}s processing time.")
+    return "\n".join(out)
+
+def run_batch(args):
+    with open(args.config, 'r', encoding='utf-8') as f: state = json.load(f)
+    _, _, start_id = graph_from_state(state)
+    if start_id is None:
+        print(f"Error: no 'Audio Source' node in {args.config}"); return 2
+    files = find_inputs(args.input)
+    if not files:
+        print(f"Error: no audio files found in {args.input}"); return 2
+
+    print(f">>> Batch: {len(files)} file(s), {args.workers} worker(s), config={os.path.basename(args.config)}")
+    init_args = (args.resource, not args.no_cache, args.materialize, args.model_budget, args.torch_threads)
+    t0 = time.time()
+    results = []
+    if args.workers <= 1:
+        _init_worker(*init_args)
+        for path in files: results.append(_run_file(path, state, args.verbose))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=init_args + (1,)) as pool:
+            futures = [pool.submit(_run_file, path, state, args.verbose) for path in files]
+            for fut in as_completed(futures): results.append(fut.result())
+        results.sort(key=lambda r: files.index(r["file"]))
+
+    print("\n" + format_summary(results))
+    print(f"Wall time: {time.time() - t0:.1f}s")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f: json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Report saved: {args.report}")
+    return 0 if all(r["status"] == "done" for r in results) else 1
+
+def add_arguments(parser):
+    parser.add_argument("--config", default=os.path.join("config", "default_config.json"), help="管道配置文件 (Pipeline Designer 导出的 JSON)")
+    parser.add_argument("--input", required=True, help="录音文件或包含录音的目录")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数 (每个进程各自加载一份模型)")
+    parser.add_argument("--resource", default="resource", help="资源目录 (声纹库、日志、缓存)")
+    parser.add_argument("--report", default=None, help="将每个文件的耗时统计另存为 JSON")
+    parser.add_argument("--no-cache", action="store_true", help="禁用节点结果缓存")
+    parser.add_argument("--torch-threads", type=int, default=None, help="每个进程 torch 的 CPU 推理线程数 (默认不修改)")
+    parser.add_argument("--model-budget", type=int, default=6144, help="每个进程常驻模型的内存预算 (MB)，超出时按 LRU 卸载")
+    parser.add_argument("--materialize", action="store_true", help="[调试] 保存中间音频")
+    parser.add_argument("--verbose", action="store_true", help="同时打印转写结果")
+    parser.set_defaults(func=run_batch)
\ No newline at end of file
@@ -0,0 +1,37 @@
+import os
+import time
+
+from core.checkpoint import RunCheckpoint
+
+def list_runs(runs_dir):
+    runs = RunCheckpoint.list_runs(runs_dir)
+    if not runs:
+        print(f"No runs in {runs_dir}"); return 0
+    for run_dir, m in runs:
+        src = os.path.basename(m.get('source') or '') or '-'
+        print(f"{m['run_id']:<20} {m.get('status', '?'):<8} {len(m.get('nodes', {})):>2} node(s) done  {m.get('updated', '')}  {src}")
+    return 0
+
+def run_resume(args):
+    runs_dir = os.path.join(args.resource, "runs")
+    if args.list: return list_runs(runs_dir)
+    run_dir = args.run or RunCheckpoint.latest_resumable(runs_dir)
+    if not run_dir:
+        print(f"No interrupted run to resume in {runs_dir}"); return 2
+    if not os.path.isdir(run_dir): run_dir = os.path.join(runs_dir, run_dir)
+
+    from core.executor import GraphExecutor
+    def log(msg, is_result=False):
+        if args.verbose or not is_result: print(msg, flush=True)
+    executor = GraphExecutor(args.resource)
+    t0 = time.time()
+    ctx = executor.resume(run_dir, log, lambda p: None)
+    print(f">>> {executor.last_status} in {time.time() - t0:.1f}s" + (f", log: {ctx['log_path']}" if ctx.get('log_path') else ""))
+    return 0 if executor.last_status == 'done' else 1
+
+def add_arguments(parser):
+    parser.add_argument("--run", default=None, help="要恢复的运行 (run_id 或目录)，默认取最近一次中断的运行")
+    parser.add_argument("--list", action="store_true", help="列出 resource/runs 中的运行及其状态")
+    parser.add_argument("--resource", default="resource", help="资源目录 (声纹库、日志、缓存)")
+    parser.add_argument("--verbose", action="store_true", help="同时打印转写结果")
+    parser.set_defaults(func=run_resume)
\ No newline at end of file
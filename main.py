@@ -1,30 +1,45 @@
-import dearpygui.dearpygui as dpg
+import time
+STARTUP_T0 = time.perf_counter() # [新增] 冷启动计时起点
 import os
 import sys
-import time
+import importlib
 import threading
 import datetime
 import traceback
 import json
-import tkinter as tk
-from tkinter import filedialog
+
+# [修改] 降噪进程池的子进程 (spawn / forkserver) 会以 __mp_main__ 重新导入本文件：
+# 界面库只在主进程中导入，执行器与声纹库也只在主进程中创建
+GUI_PROCESS = __name__ != "__mp_main__"
+if GUI_PROCESS:
+    import dearpygui.dearpygui as dpg
+    import tkinter as tk
+    from tkinter import filedialog
+    from core.ui_utils import create_node, FontManager, NodeThemeManager
 
 # --- 导入 Core 包 ---
 from core.constants import *
-from core.ui_utils import create_node, FontManager 
 from core.executor import GraphExecutor
+from core.checkpoint import RunCheckpoint
 from utilities.diarization.speaker_db import SpeakerDB
+from utilities.model_manager import MODELS, AUTO_UNLOAD, KEEP_WARM
+from core.graph import required_models
+# [新增] torch / whisper / speechbrain / noisereduce / LLM 客户端均推迟到首次使用 (或后台预热) 时导入
+STARTUP_IMPORT_S = time.perf_counter() - STARTUP_T0
 
 # ==========================================
 # 1. 全局状态
 # ==========================================
-executor = GraphExecutor("resource")
+# [新增] GUI 默认让模型跨运行常驻 (空闲 10 分钟后卸载)，可在 Pipeline Designer 中切回 Auto-Unload
+executor = GraphExecutor("resource", model_policy=KEEP_WARM) if GUI_PROCESS else None
+MODEL_POLICY_LABELS = {"Keep Warm": KEEP_WARM, "Auto-Unload": AUTO_UNLOAD}
 LINK_DB = {}
 DEFAULT_CONFIG_FILE = os.path.join("config", "default_config.json")
 GLOBAL_SUMMARY_CACHE = ""
 FONTS = {} 
+STARTUP_LOG = os.path.join("resource", "startup_times.jsonl")
 
-speaker_db = SpeakerDB()
+speaker_db = SpeakerDB() if GUI_PROCESS else None
 
 # ==========================================
 # 2. Markdown 渲染 (保持不变)
@@ -87,7 +102,10 @@ def log(msg, is_result=False):
 # ==========================================
 # 4. 节点工厂 & 状态管理
 # ==========================================
-def build_enhancer_ui(nid): dpg.add_checkbox(label="Enable", default_value=True, tag=f"chk_enhance_{nid}")
+def build_enhancer_ui(nid):
+    dpg.add_checkbox(label="Enable", default_value=True, tag=f"chk_enhance_{nid}")
+    # [新增] 会议室 / 设备名：非空时噪声样本保存并在之后的录音中复用
+    dpg.add_input_text(label="Room", width=80, hint="per recording", tag=f"room_{nid}")
 def build_vad_ui(nid): dpg.add_slider_int(label="Aggressiveness", default_value=3, min_value=0, max_value=3, width=120, tag=f"vad_agg_{nid}")
 def build_spk_ui(nid): dpg.add_drag_float(label="Win(s)", default_value=1.5, width=60, tag=f"win_{nid}"); dpg.add_drag_float(label="Step(s)", default_value=0.75, width=60, tag=f"step_{nid}")
 
@@ -97,16 +115,19 @@ def build_asr_ui(nid):
     dpg.add_checkbox(label="Full Text Correction", default_value=False, tag=f"chk_ftc_{nid}")
     dpg.add_checkbox(label="Enhanced Audio", default_value=False, tag=f"chk_enhance_audio_{nid}")
 
+# [新增] 独立全文转写节点，可与 Speaker ID 并行
+def build_fulltext_ui(nid):
+    dpg.add_combo(["tiny","small","base","medium"], default_value="small", width=100, tag=f"ft_model_{nid}")
+    dpg.add_checkbox(label="Enhanced Audio", default_value=False, tag=f"chk_ft_enhance_{nid}")
+
 def build_llm_ui(nid): dpg.add_checkbox(label="Gen Summary", default_value=True, tag=f"chk_llm_{nid}"); dpg.add_radio_button(["Local","Online"], default_value="Local", tag=f"back_{nid}")
 
-NODE_FACTORY = {
-    "Audio Source":   {"ins": [], "outs": [("Audio Out", TYPE_AUDIO, COLOR_AUDIO)], "ui": None},
-    "Audio Enhancer": {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO)], "outs": [("Audio Out", TYPE_AUDIO, COLOR_AUDIO)], "ui": build_enhancer_ui},
-    "VAD Detector":   {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO)], "outs": [("Audio Out", TYPE_AUDIO, COLOR_AUDIO)], "ui": build_vad_ui},
-    "Speaker ID":     {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO)], "outs": [("Timeline Out", TYPE_TIMELINE, COLOR_TIMELINE)], "ui": build_spk_ui},
-    "Whisper ASR":    {"ins": [("Audio In", TYPE_AUDIO, COLOR_AUDIO), ("Timeline", TYPE_TIMELINE, COLOR_TIMELINE)], "outs": [("Text Out", TYPE_TEXT, COLOR_TEXT)], "ui": build_asr_ui},
-    "LLM Summary":    {"ins": [("Text In", TYPE_TEXT, COLOR_TEXT)], "outs": [("Report", TYPE_TEXT, COLOR_TEXT)], "ui": build_llm_ui},
+NODE_UI = {
+    "Audio Enhancer": build_enhancer_ui, "VAD Detector": build_vad_ui, "Speaker ID": build_spk_ui,
+    "Whisper ASR": build_asr_ui, "Full Text ASR": build_fulltext_ui, "LLM Summary": build_llm_ui,
 }
+# 端口定义统一放在 core.constants.NODE_PORTS，无界面的批处理也据此解析配置
+NODE_FACTORY = {label: {"ins": p["ins"], "outs": p["outs"], "ui": NODE_UI.get(label)} for label, p in NODE_PORTS.items()}
 
 def get_current_state():
     state = {"nodes": [], "links": []}
@@ -117,7 +138,7 @@ def get_current_state():
         pos = dpg.get_item_pos(nid)
         cfg = {}
         try:
-            if label == "Audio Enhancer": cfg['enable'] = dpg.get_value(f"chk_enhance_{nid}")
+            if label == "Audio Enhancer": cfg['enable'] = dpg.get_value(f"chk_enhance_{nid}"); cfg['room'] = dpg.get_value(f"room_{nid}")
             elif label == "VAD Detector": cfg['aggressiveness'] = dpg.get_value(f"vad_agg_{nid}")
             elif label == "Speaker ID": cfg['window'] = dpg.get_value(f"win_{nid}"); cfg['step'] = dpg.get_value(f"step_{nid}")
             elif label == "Whisper ASR": 
@@ -125,6 +146,8 @@ def get_current_state():
                 cfg['full_text_correction'] = dpg.get_value(f"chk_ftc_{nid}")
                 # [新增] 保存 enhanced_audio 状态
                 cfg['enhanced_audio'] = dpg.get_value(f"chk_enhance_audio_{nid}")
+            elif label == "Full Text ASR":
+                cfg['model'] = dpg.get_value(f"ft_model_{nid}"); cfg['enhanced_audio'] = dpg.get_value(f"chk_ft_enhance_{nid}")
             elif label == "LLM Summary": cfg['enable'] = dpg.get_value(f"chk_llm_{nid}"); cfg['backend'] = dpg.get_value(f"back_{nid}")
         except: pass
         state["nodes"].append({"label": label, "pos": pos, "config": cfg})
@@ -155,7 +178,7 @@ def load_state(state):
                 nid = create_node(label, pos, spec["ins"], spec["outs"], spec["ui"])
                 new_node_ids.append(nid)
                 try:
-                    if label == "Audio Enhancer": dpg.set_value(f"chk_enhance_{nid}", cfg.get('enable', True))
+                    if label == "Audio Enhancer": dpg.set_value(f"chk_enhance_{nid}", cfg.get('enable', True)); dpg.set_value(f"room_{nid}", cfg.get('room', ''))
                     elif label == "VAD Detector": dpg.set_value(f"vad_agg_{nid}", cfg.get('aggressiveness', 3))
                     elif label == "Speaker ID": dpg.set_value(f"win_{nid}", cfg.get('window', 1.5)); dpg.set_value(f"step_{nid}", cfg.get('step', 0.75))
                     elif label == "Whisper ASR": 
@@ -163,6 +186,8 @@ def load_state(state):
                         dpg.set_value(f"chk_ftc_{nid}", cfg.get('full_text_correction', False))
                         # [新增] 恢复 enhanced_audio 状态
                         dpg.set_value(f"chk_enhance_audio_{nid}", cfg.get('enhanced_audio', False))
+                    elif label == "Full Text ASR":
+                        dpg.set_value(f"ft_model_{nid}", cfg.get('model', 'small')); dpg.set_value(f"chk_ft_enhance_{nid}", cfg.get('enhanced_audio', False))
                     elif label == "LLM Summary": dpg.set_value(f"chk_llm_{nid}", cfg.get('enable', True)); dpg.set_value(f"back_{nid}", cfg.get('backend', 'Local'))
                 except: pass
         for l_data in state["links"]:
@@ -234,6 +259,20 @@ def spk_btn_record_add(s):
             else: log(f"❌ Failed: {msg}")
         else: log("Error: Recording not found.")
 
+def spk_btn_add_sample():
+    # [新增] 为选中的说话人追加声纹样本 (不同场合 / 设备的录音可提高识别率)
+    name = get_selected_speaker_name()
+    if not name: log("⚠️ Please select a speaker first."); return
+    try:
+        root = tk.Tk(); root.withdraw(); root.attributes('-topmost',True)
+        p = filedialog.askopenfilename(filetypes=[("Audio", "*.wav *.mp3 *.m4a *.flac *.ogg")])
+        root.destroy()
+        if p:
+            log(f"Extracting voiceprint from: {os.path.basename(p)}")
+            success, msg = speaker_db.add_exemplar(name, p)
+            log(f"✅ Sample added to '{name}': {msg}" if success else f"❌ Failed: {msg}")
+    except Exception as e: log(f"Error dialog: {e}")
+
 def spk_btn_delete():
     name = get_selected_speaker_name()
     if not name: return
@@ -287,14 +326,68 @@ def btn_export_summary():
     with open(f, "w", encoding="utf-8") as file: file.write(GLOBAL_SUMMARY_CACHE)
     log(f"Exported: {f}"); os.startfile(os.path.abspath(f))
 
-def start_processing_thread(path, mode):
+# ==========================================
+# [新增] 启动预热：窗口显示后在后台加载默认管道用到的模型，并记录冷启动耗时
+# ==========================================
+def set_model_status(text, color=(180, 180, 180)):
+    if dpg.does_item_exist("ModelStatus"):
+        dpg.set_value("ModelStatus", text)
+        dpg.configure_item("ModelStatus", color=color)
+
+def on_model_policy(s, a):
+    MODELS.configure(policy=MODEL_POLICY_LABELS[a])
+    if MODELS.policy == AUTO_UNLOAD: set_model_status("Models: load on demand (Auto-Unload)")
+    else: set_model_status("Models: kept warm after first use")
+
+def warm_up_models(state, gui_ready_s):
+    t0 = time.perf_counter()
+    # 降噪与 LLM 客户端模块首次导入较慢，一并预先导入
+    modules = ["utilities.audio_processor.enhancer"]
+    for n in state.get("nodes", []):
+        cfg = n.get("config", {})
+        if n["label"] == "LLM Summary" and cfg.get("enable", True):
+            modules.append("utilities.meeting_extractor." + ("meeting_extractor_ol" if "Online" in cfg.get("backend", "Local") else "meeting_extractor"))
+    set_model_status("Models: importing modules...", (255, 200, 80))
+    for mod in modules:
+        try: importlib.import_module(mod)
+        except ImportError as e: log(f"[Startup] Skipped {mod}: {e}")
+
+    models = required_models(state) if MODELS.policy == KEEP_WARM else []
+    def on_status(done, total, name):
+        if name: set_model_status(f"Models: loading {name} ({done + 1}/{total})...", (255, 200, 80))
+    timings = MODELS.warm_up(models, on_status)
+    warm_s = time.perf_counter() - t0
+
+    ready = [name for name, t in timings.items() if t is not None]
+    failed = [name for name, t in timings.items() if t is None]
+    if MODELS.policy == AUTO_UNLOAD: set_model_status("Models: load on demand (Auto-Unload)")
+    elif failed: set_model_status(f"Models: failed to load {', '.join(failed)}", (255, 100, 100))
+    else: set_model_status(f"Models: ready ({', '.join(ready) or 'none'})", (100, 255, 100))
+    log(f"[Startup] Warm-up {warm_s:.1f}s; ready to process {gui_ready_s + warm_s:.1f}s after launch.")
+
+    record = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "imports_s": round(STARTUP_IMPORT_S, 3),
+              "gui_ready_s": round(gui_ready_s, 3), "warm_up_s": round(warm_s, 3), "policy": MODELS.policy,
+              "models": {name: (round(t, 3) if t is not None else None) for name, t in timings.items()}}
+    try:
+        os.makedirs(os.path.dirname(STARTUP_LOG), exist_ok=True)
+        with open(STARTUP_LOG, "a", encoding="utf-8") as f: f.write(json.dumps(record) + "\n")
+    except OSError as e: log(f"[Startup] Could not write {STARTUP_LOG}: {e}")
+
+def on_gui_shown():
+    gui_ready_s = time.perf_counter() - STARTUP_T0
+    log(f"[Startup] GUI ready in {gui_ready_s:.2f}s (imports {STARTUP_IMPORT_S:.2f}s).")
+    threading.Thread(target=warm_up_models, args=(get_current_state(), gui_ready_s), daemon=True).start()
+    if RunCheckpoint.latest_resumable(executor.runs_dir): log("[Checkpoint] An interrupted run was found. Click 'Resume Run' to continue it.")
+
+def collect_pipeline():
+    """从画布读取节点与参数：:return: (start_id, nodes)"""
     nodes = {}
     ids = dpg.get_item_children(TAG_NODE_EDITOR, 1) or []
     for nid in ids:
         lbl = dpg.get_item_label(nid)
         cfg = {}
         try:
-            if lbl == "Audio Enhancer": cfg['enable'] = dpg.get_value(f"chk_enhance_{nid}")
+            if lbl == "Audio Enhancer": cfg['enable'] = dpg.get_value(f"chk_enhance_{nid}"); cfg['room'] = dpg.get_value(f"room_{nid}")
             elif lbl == "VAD Detector": cfg['aggressiveness'] = dpg.get_value(f"vad_agg_{nid}")
             elif lbl == "Speaker ID": 
                 cfg['window'] = dpg.get_value(f"win_{nid}"); cfg['step'] = dpg.get_value(f"step_{nid}")
@@ -303,6 +396,8 @@ def start_processing_thread(path, mode):
                 cfg['full_text_correction'] = dpg.get_value(f"chk_ftc_{nid}")
                 # [新增] 传递增强开关
                 cfg['enhanced_audio'] = dpg.get_value(f"chk_enhance_audio_{nid}")
+            elif lbl == "Full Text ASR":
+                cfg['model'] = dpg.get_value(f"ft_model_{nid}"); cfg['enhanced_audio'] = dpg.get_value(f"chk_ft_enhance_{nid}")
             elif lbl == "LLM Summary": 
                 cfg['enable'] = dpg.get_value(f"chk_llm_{nid}"); cfg['backend'] = dpg.get_value(f"back_{nid}")
         except: pass
@@ -316,29 +411,64 @@ def start_processing_thread(path, mode):
         nodes[nid] = {'label': lbl, 'config': cfg, 'inputs': ins, 'outputs': outs}
 
     start_id = next((nid for nid, d in nodes.items() if d['label']=="Audio Source"), None)
-    if not start_id: log("Error: No Source Node!"); return
-    nodes[start_id]['config'] = {'mode': mode, 'file_path': path}
-    
+    return start_id, nodes
+
+def clear_results():
     if dpg.does_item_exist("TranscriptBox"): dpg.delete_item("TranscriptBox", children_only=True)
     if dpg.does_item_exist("SummaryContainer"): dpg.delete_item("SummaryContainer", children_only=True)
     dpg.set_value("ResultTabs", "tab_transcript")
+
+def start_processing_thread(path, mode):
+    start_id, nodes = collect_pipeline()
+    if not start_id: log("Error: No Source Node!"); return
+    nodes[start_id]['config'] = {'mode': mode, 'file_path': path}
+    clear_results()
     threading.Thread(target=executor.execute, args=(start_id, nodes, LINK_DB.copy(), {}, log, update_progress), daemon=True).start()
 
+def watch_capture():
+    # [新增] 录音期间每秒刷新采集统计 (溢出、丢帧、延迟、积压)，出现丢失时标红
+    rec = executor.recorder
+    while rec.is_running:
+        st = rec.capture_stats()
+        lossy = st['overflows'] or st['dropped_frames']
+        if dpg.does_item_exist("CaptureStats"):
+            dpg.set_value("CaptureStats", rec.stats_line() + f" | backlog {st['backlog_ms']:.0f} ms")
+            dpg.configure_item("CaptureStats", color=(255, 100, 100) if lossy else (100, 255, 100))
+        time.sleep(1.0)
+
 def btn_rec_click(s):
     if "Start" in dpg.get_item_label(s):
         dpg.set_item_label(s, "Stop & Process"); dpg.bind_item_theme(s, "theme_red")
+        # [新增] 流式模式：录音的同时转写，停止时只需处理尾部
+        if dpg.get_value("chk_live"):
+            start_id, nodes = collect_pipeline()
+            if not start_id: log("Error: No Source Node!")
+            else:
+                clear_results()
+                try: executor.start_live(start_id, nodes, LINK_DB.copy(), log)
+                except Exception as e: log(f"[Live] Disabled: {e}")
         f = f"rec_{int(time.time())}"; executor.recorder.start(f)
         dpg.set_item_user_data(s, os.path.join(executor.res_dir, "raw", f+".wav"))
+        threading.Thread(target=watch_capture, daemon=True).start()
         log(">>> Recording...")
     else:
         dpg.set_item_label(s, "Start Recording"); dpg.bind_item_theme(s, "theme_green")
-        executor.recorder.stop(); log(">>> Processing...")
-        time.sleep(0.5); start_processing_thread(dpg.get_item_user_data(s), 'mic')
+        executor.recorder.stop(); log(executor.recorder.stats_line()); log(">>> Processing...")
+        if executor.live:
+            threading.Thread(target=executor.finish_live, args=(dpg.get_item_user_data(s), log, update_progress), daemon=True).start()
+        else:
+            time.sleep(0.5); start_processing_thread(dpg.get_item_user_data(s), 'mic')
 
 def btn_stop_click(): executor.stop(); log(">>> Stopping...")
+def btn_resume_click():
+    # [新增] 恢复最近一次中断的运行 (崩溃、断电或 STOP)
+    run_dir = RunCheckpoint.latest_resumable(executor.runs_dir)
+    if not run_dir: return log("No interrupted run to resume.")
+    clear_results()
+    threading.Thread(target=executor.resume, args=(run_dir, log, update_progress), daemon=True).start()
 def btn_load_click():
     root = tk.Tk(); root.withdraw(); root.attributes('-topmost',True)
-    p = filedialog.askopenfilename(filetypes=[("Audio", "*.wav *.mp3")])
+    p = filedialog.askopenfilename(filetypes=[("Audio", "*.wav *.mp3 *.m4a *.flac *.ogg")])
     root.destroy()
     if p: log(f"Selected: {os.path.basename(p)}"); start_processing_thread(p, 'file')
 
@@ -358,6 +488,13 @@ def build_gui():
     with dpg.theme(tag="theme_orange"):
         with dpg.theme_component(dpg.mvButton): dpg.add_theme_color(dpg.mvThemeCol_Button, (200,120,50))
 
+    # 执行器本身与 GUI 解耦，节点高亮通过回调完成
+    theme_mgr = NodeThemeManager()
+    def set_node_status(nid, status):
+        if status == 'running': dpg.split_frame()
+        theme_mgr.set_status(nid, status)
+    executor.status_cb = set_node_status
+
     with dpg.window(tag="Primary Window"):
         with dpg.tab_bar():
             with dpg.tab(label="  Dashboard  "):
@@ -366,16 +503,24 @@ def build_gui():
                     dpg.add_spacer(width=20)
                     dpg.add_button(label="Start Recording", width=180, height=50, tag="btn_rec", callback=btn_rec_click)
                     dpg.bind_item_theme("btn_rec", "theme_green")
+                    dpg.add_checkbox(label="Live", default_value=False, tag="chk_live")
                     dpg.add_spacer(width=10)
                     dpg.add_button(label="Load File", width=120, height=50, callback=btn_load_click)
                     dpg.add_spacer(width=10)
                     dpg.add_button(label="STOP", width=100, height=50, callback=btn_stop_click)
                     dpg.bind_item_theme(dpg.last_item(), "theme_orange")
+                    dpg.add_spacer(width=10)
+                    dpg.add_button(label="Resume Run", width=120, height=50, callback=btn_resume_click)
                     dpg.add_spacer(width=30)
                     dpg.add_button(label="Export Summary", width=150, height=50, callback=btn_export_summary)
+                    dpg.add_spacer(width=30)
+                    # [新增] 模型预热状态
+                    dpg.add_text("Models: starting...", tag="ModelStatus", color=(180, 180, 180))
 
                 dpg.add_spacer(height=10)
                 dpg.add_progress_bar(tag="ProgressBar", width=-20, default_value=0.0)
+                # [新增] 录音采集统计
+                dpg.add_text("", tag="CaptureStats", color=(180, 180, 180))
                 dpg.add_separator()
                 
                 with dpg.group(horizontal=True):
@@ -422,6 +567,8 @@ def build_gui():
                         with dpg.group(horizontal=True):
                             dpg.add_button(label="Update Info", width=100, callback=spk_btn_rename)
                             dpg.add_spacer(width=20)
+                            dpg.add_button(label="Add Sample", width=100, callback=spk_btn_add_sample)
+                            dpg.add_spacer(width=20)
                             dpg.add_button(label="Delete", width=100, callback=spk_btn_delete)
                             dpg.bind_item_theme(dpg.last_item(), "theme_red")
                 refresh_speaker_list()
@@ -432,6 +579,17 @@ def build_gui():
                     dpg.add_button(label="Export Config", callback=btn_export_config)
                     dpg.add_spacer(width=20)
                     dpg.add_button(label="Set as Default", callback=btn_set_default)
+                    dpg.add_spacer(width=20)
+                    # [调试] 将节点间的中间音频写成 WAV，便于排查
+                    dpg.add_checkbox(label="Save Intermediates (Debug)", default_value=executor.materialize_intermediates,
+                                     callback=lambda s, a: setattr(executor, 'materialize_intermediates', a))
+                    # [新增] 复用未变更节点的缓存结果
+                    dpg.add_checkbox(label="Use Stage Cache", default_value=executor.use_cache,
+                                     callback=lambda s, a: setattr(executor, 'use_cache', a))
+                    dpg.add_spacer(width=20)
+                    # [新增] 模型池策略：常驻复用 / 每次任务后卸载释放显存
+                    dpg.add_text("Models:")
+                    dpg.add_combo(list(MODEL_POLICY_LABELS), default_value="Keep Warm", width=120, callback=on_model_policy)
                 dpg.add_separator()
                 with dpg.node_editor(callback=link_cb, delink_callback=delink_cb, tag=TAG_NODE_EDITOR):
                     loaded = False
@@ -445,7 +603,7 @@ def build_gui():
                              create_node(name, [100,100], data["ins"], data["outs"], data["ui"])
                          ids = dpg.get_item_children(TAG_NODE_EDITOR, 1) or []
                          lbl_map = {dpg.get_item_label(i): i for i in ids}
-                         link_list = [("Audio Source",0,"Audio Enhancer",0), ("Audio Enhancer",0,"VAD Detector",0), ("VAD Detector",0,"Speaker ID",0), ("VAD Detector",0,"Whisper ASR",0), ("Speaker ID",0,"Whisper ASR",1), ("Whisper ASR",0,"LLM Summary",0)]
+                         link_list = [("Audio Source",0,"Audio Enhancer",0), ("Audio Enhancer",0,"VAD Detector",0), ("VAD Detector",0,"Speaker ID",0), ("VAD Detector",0,"Whisper ASR",0), ("Speaker ID",0,"Whisper ASR",1), ("Whisper ASR",0,"LLM Summary",0), ("Audio Enhancer",0,"Full Text ASR",0), ("Full Text ASR",0,"LLM Summary",0)]
                          for s,si,d,di in link_list:
                              if s in lbl_map and d in lbl_map:
                                  n1, n2 = lbl_map[s], lbl_map[d]
@@ -457,6 +615,8 @@ def build_gui():
     dpg.setup_dearpygui()
     dpg.show_viewport()
     dpg.set_primary_window("Primary Window", True)
+    # [新增] 第一帧绘制完成后开始后台预热，并记录窗口出现所需时间
+    dpg.set_frame_callback(2, on_gui_shown)
     dpg.start_dearpygui()
     dpg.destroy_context()
 
@@ -43,52 +43,97 @@ class AsyncWhisperEngine:
         """
         while True:
             # 阻塞等待任务
-            task_id, file_path = self.task_queue.get()
+            item = self.task_queue.get()
+            if item is None:
+                # shutdown() 发出的退出信号
+                self.task_queue.task_done()
+                break
+            task_id, audio = item
+            model = self.model
+            # [修改] 调用方已取走 (放弃) 的任务不再推理；之后只通过本地引用更新状态
+            task = self.tasks.get(task_id)
+            if model is None or task is None:
+                if task is not None: task["status"] = "CANCELLED"
+                self.task_queue.task_done()
+                continue
             
             try:
-                # 更新状态为进行中
-                self.tasks[task_id]["status"] = "PROCESSING"
-                print(f"[Worker] 开始处理任务: {task_id} | 文件: {os.path.basename(file_path)}")
+                # 更新状态为进行中 (并记录耗时，供调用方生成追踪 span)
+                task["status"] = "PROCESSING"
+                task["started"] = time.perf_counter()
+                task["tid"] = threading.get_ident()
+                cpu0 = time.thread_time()
+                print(f"[Worker] 开始处理任务: {task_id} | 文件: {os.path.basename(task['file'])}")
 
                 # 执行推理 (核心耗时步骤)
                 # fp16=True 在 GPU 上更快
-                result = self.model.transcribe(file_path, fp16=(self.device == "cuda"))
+                result = model.transcribe(audio, fp16=(self.device == "cuda"))
                 text = result["text"].strip()
 
                 # 更新结果
-                self.tasks[task_id]["status"] = "COMPLETED"
-                self.tasks[task_id]["result"] = text
+                task["finished"] = time.perf_counter()
+                task["cpu"] = time.thread_time() - cpu0
+                task["status"] = "COMPLETED"
+                task["result"] = text
                 print(f"[Worker] 任务完成: {task_id}")
 
             except Exception as e:
-                self.tasks[task_id]["status"] = "FAILED"
-                self.tasks[task_id]["error"] = str(e)
+                task["status"] = "FAILED"
+                task["error"] = str(e)
                 print(f"[Worker] 任务失败: {task_id} | 原因: {e}")
             
             finally:
                 # 标记队列任务完成
+                del model
                 self.task_queue.task_done()
 
-    def submit_task(self, audio_file_path):
+    def cancel_pending(self):
+        """
+        [新增] 清空尚未开始的任务，标记为 CANCELLED。
+        正在推理的任务无法中断，其结果会被调用方丢弃。
+        """
+        cancelled = 0
+        while True:
+            try: item = self.task_queue.get_nowait()
+            except queue.Empty: break
+            if item is not None:
+                task = self.tasks.get(item[0])
+                if task is not None: task["status"] = "CANCELLED"
+                cancelled += 1
+            self.task_queue.task_done()
+        return cancelled
+
+    def shutdown(self):
+        """[新增] 清空队列、释放模型引用并让工作线程退出"""
+        self.cancel_pending()
+        self.model = None
+        self.task_queue.put(None)
+
+    def submit_task(self, audio):
         """
-        提交一个音频文件进行转录
+        提交一个音频进行转录
+        :param audio: 音频文件路径，或 16kHz 单声道 float32 numpy 数组 (内存直传，免去写临时文件)
         :return: task_id (str) 用于后续查询
         """
-        if not os.path.exists(audio_file_path):
-            raise FileNotFoundError(f"文件未找到: {audio_file_path}")
+        if isinstance(audio, str):
+            if not os.path.exists(audio):
+                raise FileNotFoundError(f"文件未找到: {audio}")
+            label = audio
+        else:
+            label = f"<memory {len(audio) / 16000:.1f}s>"
 
         task_id = str(uuid.uuid4())[:8] # 生成简短 ID
         
         # 初始化任务状态
         self.tasks[task_id] = {
             "status": "QUEUED",
-            "file": audio_file_path,
+            "file": label,
             "result": None,
             "error": None
         }
         
         # 放入队列
-        self.task_queue.put((task_id, audio_file_path))
+        self.task_queue.put((task_id, audio))
         return task_id
 
     def get_task_status(self, task_id):
@@ -98,6 +143,13 @@ class AsyncWhisperEngine:
         """
         return self.tasks.get(task_id, None)
 
+    def pop_task(self, task_id):
+        """
+        [新增] 取出任务状态并从任务表中移除 (结果已收集或任务被放弃时调用)。
+        引擎在模型池中跨运行常驻，不移除的话任务表会随每次运行的每个片段增长。
+        """
+        return self.tasks.pop(task_id, None)
+
     def is_completed(self, task_id):
         """
         简便方法：检查是否完成
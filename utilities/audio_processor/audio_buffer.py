@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import soundfile as sf
+
+from .audio_io import TARGET_SR, decode, open_cached
+
+class AudioBuffer:
+    """
+    节点之间共享的内存音频 (单声道 float32)。
+    节点不应原地修改别的节点产生的 samples，而是通过 derive() 生成新的缓冲区，
+    或通过 view() 取零拷贝切片。只有在显式的持久化点才调用 materialize() 写盘。
+    """
+
+    def __init__(self, samples, sr, provenance=None, path=None, cache_path=None):
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.sr = int(sr)
+        # 处理链记录，如 ['raw:meeting.wav', 'clean', 'vad']
+        self.provenance = list(provenance or [])
+        # 若该缓冲区已落盘，对应的文件路径
+        self.path = path
+        # [新增] samples 映射自 AudioCache 的 .npy 时记录其路径，pickle 时只保存路径
+        self.cache_path = cache_path
+
+    @classmethod
+    def from_file(cls, path, cache=None, key=None, token=None, progress_cb=None):
+        """
+        [修改] 流式解码为 16 kHz 单声道 float32。
+        给定 AudioCache 与内容哈希 key 时只解码一次，samples 为缓存文件的内存映射 (切片零拷贝)
+        """
+        provenance = [f"raw:{os.path.basename(path)}"]
+        if cache is not None and key:
+            samples = cache.load(path, key, token=token, progress_cb=progress_cb)
+            return cls(samples, cache.sr, provenance, path=path, cache_path=cache.path_for(key))
+        return cls(decode(path, TARGET_SR, token=token, progress_cb=progress_cb), TARGET_SR, provenance, path=path)
+
+    def __getstate__(self):
+        # 检查点 / 缓存中只记录映射文件路径，不重复写出整段音频
+        state = dict(self.__dict__)
+        if self.cache_path: state['samples'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault('cache_path', None)
+        if self.samples is None:
+            if os.path.exists(self.cache_path):
+                self.samples = open_cached(self.cache_path)
+            else:
+                # 缓存已被淘汰：从原文件重新解码
+                self.samples, self.cache_path = decode(self.path, self.sr), None
+
+    def derive(self, samples, step):
+        """基于当前缓冲区生成新的缓冲区 (追加一步处理记录)"""
+        return AudioBuffer(samples, self.sr, self.provenance + [step])
+
+    def view(self, start, end):
+        """按采样点返回零拷贝切片"""
+        return self.samples[max(0, start):max(0, end)]
+
+    def has_step(self, step):
+        return step in self.provenance
+
+    @property
+    def is_enhanced(self):
+        """是否已经过任意一步降噪 (clean / asr_clean / full_clean)"""
+        return any(s.endswith('clean') for s in self.provenance)
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sr if self.sr else 0.0
+
+    def __len__(self):
+        return len(self.samples)
+
+    def materialize(self, path):
+        """写入 WAV 文件 (持久化点)，返回路径"""
+        if self.path and os.path.abspath(self.path) == os.path.abspath(path): return path
+        sf.write(path, self.samples, self.sr)
+        self.path = path
+        return path
+
+    def __repr__(self):
+        return f"AudioBuffer({self.duration:.1f}s @ {self.sr}Hz, {' > '.join(self.provenance)})"
\ No newline at end of file
@@ -0,0 +1,254 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from math import gcd
+import numpy as np
+import soundfile as sf
+from numpy.lib.stride_tricks import as_strided
+
+# 管道内部统一的采样率：Whisper 与声纹模型都直接接收 16 kHz 单声道 float32
+TARGET_SR = 16000
+# 可导入的音频格式 (soundfile 不支持的容器由 ffmpeg 解码)
+AUDIO_EXTS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".aac", ".opus", ".wma")
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def link_or_copy(src, dst):
+    """硬链接 (同一分区内不占额外空间)；跨分区或文件系统不支持时退回完整复制"""
+    try: os.link(src, dst)
+    except OSError: shutil.copy2(src, dst)
+
+def _read_mono(f, start, end):
+    """从打开的 SoundFile 读取 [start, end) 的单声道 float32，超出文件范围的部分补零"""
+    out = np.zeros(max(end - start, 0), dtype=np.float32)
+    lo, hi = max(start, 0), min(end, f.frames)
+    if hi > lo:
+        f.seek(lo)
+        audio = f.read(hi - lo, dtype='float32', always_2d=True)
+        out[lo - start:lo - start + len(audio)] = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return out
+
+class Resampler:
+    """
+    有理数倍率 (L/M) 的多相 FIR 重采样 (Kaiser 窗 sinc 低通，截止于较低采样率的奈奎斯特频率)。
+    输出按块计算：第 r 相的输出行是输入的等步长 (M) 零拷贝视图，每相一次矩阵-向量乘法。
+    """
+
+    def __init__(self, sr_in, sr_out=TARGET_SR, zero_crossings=16, beta=8.6):
+        g = gcd(int(sr_in), int(sr_out))
+        self.sr_in, self.sr_out = int(sr_in), int(sr_out)
+        self.L, self.M = self.sr_out // g, self.sr_in // g
+        L, M = self.L, self.M
+        width = max(L, M)
+        n_taps = 2 * zero_crossings * width + 1
+        c = (n_taps - 1) // 2
+        t = np.arange(n_taps) - c
+        h = (L / width) * np.sinc(t / width) * np.kaiser(n_taps, beta)
+        self.K = -(-n_taps // L)
+        h = np.concatenate([h, np.zeros(self.K * L - n_taps)])
+        # 第 r 个输出相位：y[q*L + r] = x[q*M + a_r : q*M + a_r + K] @ taps[r]
+        t_r = np.arange(L) * M + c
+        self.offsets = t_r // L - (self.K - 1)
+        self.taps = np.stack([h[p + np.arange(self.K) * L][::-1] for p in t_r % L]).astype(np.float32)
+
+    def out_len(self, n_in):
+        return -(-n_in * self.L // self.M)
+
+    def iter_blocks(self, read, n_in, block_sec=30.0, token=None):
+        """read(start, end) 返回输入片段 (越界部分补零)；按顺序产出 (输出起点, float32 输出块)"""
+        L, M, K = self.L, self.M, self.K
+        n_out = self.out_len(n_in)
+        q_total = -(-n_out // L)
+        q_block = max(1, int(block_sec * self.sr_in) // M)
+        lo_off, hi_off = int(self.offsets.min()), int(self.offsets.max()) + K
+        for q0 in range(0, q_total, q_block):
+            if token: token.check()
+            q = min(q_block, q_total - q0)
+            base = q0 * M + lo_off
+            x = np.ascontiguousarray(read(base, (q0 + q - 1) * M + hi_off), dtype=np.float32)
+            y = np.empty((q, L), dtype=np.float32)
+            for r in range(L):
+                rows = as_strided(x[self.offsets[r] - lo_off:], shape=(q, K), strides=(x.strides[0] * M, x.strides[0]), writeable=False)
+                y[:, r] = rows @ self.taps[r]
+            start = q0 * L
+            yield start, y.reshape(-1)[:n_out - start]
+
+def _decode_ffmpeg(path, sr, out, token, progress_cb, block_sec):
+    """soundfile 不支持的容器 (m4a / aac 等) 由 ffmpeg 解码为 f32le 流，先落到临时文件以确定长度"""
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-f", "f32le", "-ac", "1", "-ar", str(sr), "-"]
+    with tempfile.TemporaryFile() as raw, tempfile.TemporaryFile() as err:
+        try: proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+        except FileNotFoundError: raise RuntimeError(f"Decoding {os.path.basename(path)} requires ffmpeg on PATH.")
+        try:
+            for block in iter(lambda: proc.stdout.read(1 << 20), b''):
+                if token: token.check()
+                raw.write(block)
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()
+            proc.wait()
+        if proc.returncode:
+            err.seek(0)
+            raise RuntimeError(f"ffmpeg failed to decode {os.path.basename(path)}: {err.read().decode(errors='replace').strip()}")
+        n = raw.tell() // 4
+        dst = out(n) if out else np.empty(n, dtype=np.float32)
+        raw.seek(0)
+        step = int(block_sec * sr)
+        for s in range(0, n, step):
+            chunk = np.frombuffer(raw.read(step * 4), dtype='<f4')
+            dst[s:s + len(chunk)] = chunk
+            if progress_cb: progress_cb(min(s + step, n) / n)
+        return dst
+
+def decode(path, sr=TARGET_SR, out=None, token=None, progress_cb=None, block_sec=30.0):
+    """
+    流式解码为单声道 float32 并重采样到 sr，内存占用与文件长度无关 (输出数组除外)
+    :param out: callable(n) -> 可写数组；默认在内存中分配
+    """
+    try: f = sf.SoundFile(path)
+    except RuntimeError:
+        return _decode_ffmpeg(path, sr, out, token, progress_cb, block_sec)
+    with f:
+        read = lambda s, e: _read_mono(f, s, e)
+        if f.samplerate == sr:
+            n = f.frames
+            dst = out(n) if out else np.empty(n, dtype=np.float32)
+            step = int(block_sec * sr)
+            for s in range(0, n, step):
+                if token: token.check()
+                dst[s:s + step] = read(s, min(s + step, n))
+                if progress_cb: progress_cb(min(s + step, n) / n)
+            return dst
+        rs = Resampler(f.samplerate, sr)
+        n = rs.out_len(f.frames)
+        dst = out(n) if out else np.empty(n, dtype=np.float32)
+        for s, y in rs.iter_blocks(read, f.frames, block_sec, token):
+            dst[s:s + len(y)] = y
+            if progress_cb: progress_cb((s + len(y)) / max(n, 1))
+        return dst
+
+class AudioCache:
+    """
+    [新增] 解码缓存：每个音频文件 (按内容哈希) 只解码一次，得到 16 kHz 单声道 float32 的 .npy，
+    之后以内存映射打开 (copy-on-write，节点误写不会改动缓存文件)。切片是零拷贝的，
+    多小时录音只占用页缓存而不是进程堆内存。按总大小做 LRU 淘汰 (同 StageCache)。
+    """
+
+    def __init__(self, cache_dir, max_bytes=4 * 1024**3, sr=TARGET_SR):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sr = sr
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # [新增] (绝对路径, 大小, 修改时间) -> 内容哈希，重复导入同一文件时无需重新读取整个文件
+        self.index_path = os.path.join(cache_dir, "hash_index.json")
+        try:
+            with open(self.index_path, encoding='utf-8') as f: self.hashes = json.load(f)
+        except (OSError, ValueError):
+            self.hashes = {}
+        # [修改] 只在启动时去掉已不存在的文件，索引不会无限增长
+        self.hashes = {k: v for k, v in self.hashes.items() if os.path.exists(k.rsplit('|', 2)[0])}
+
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def content_hash(self, path):
+        """文件内容的 sha256 (文件未变化时直接查索引)"""
+        stat_key = self._stat_key(path)
+        key = self.hashes.get(stat_key)
+        if key: return key
+        key = file_hash(path)
+        self.remember(path, key)
+        return key
+
+    def remember(self, path, key):
+        with self.lock:
+            stat_key = self._stat_key(path)
+            if self.hashes.get(stat_key) == key: return
+            self.hashes[stat_key] = key
+            tmp = f"{self.index_path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f: json.dump(self.hashes, f)
+                os.replace(tmp, self.index_path)
+            except OSError: pass
+
+    def ingest(self, path, store_dir):
+        """
+        [新增] 入库：按内容哈希把音频放入 store_dir (默认 resource/raw)。
+        以硬链接引用源文件而不是整份复制；同名但内容不同的文件加哈希后缀，不会互相覆盖。
+        :return: (入库后的路径, 内容哈希)
+        """
+        key = self.content_hash(path)
+        target = os.path.join(store_dir, os.path.basename(path))
+        if os.path.abspath(path) == os.path.abspath(target): return target, key
+        if os.path.exists(target) and not (os.path.samefile(path, target) or self.content_hash(target) == key):
+            stem, ext = os.path.splitext(target)
+            target = f"{stem}_{key[:8]}{ext}"
+        if not os.path.exists(target):
+            link_or_copy(path, target)
+            self.remember(target, key)
+        return target, key
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}_{self.sr}.npy")
+
+    def load(self, path, key, token=None, progress_cb=None):
+        """:return: 只读语义的 float32 内存映射数组"""
+        cache_path = self.path_for(key)
+        if os.path.exists(cache_path):
+            try:
+                samples = open_cached(cache_path)
+                os.utime(cache_path, None) # 刷新 LRU 时间
+                if progress_cb: progress_cb(1.0)
+                return samples
+            except (OSError, ValueError) as e:
+                print(f"[AudioCache] Corrupted entry {os.path.basename(cache_path)}: {e}")
+        tmp = f"{cache_path}.{threading.get_ident()}.tmp"
+        try:
+            holder = []
+            def alloc(n):
+                holder.append(np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(n,)))
+                return holder[0]
+            decode(path, self.sr, out=alloc, token=token, progress_cb=progress_cb)
+            holder[0].flush()
+            del holder[:]
+            os.replace(tmp, cache_path)
+        finally:
+            if os.path.exists(tmp): os.remove(tmp)
+        self._evict(keep=cache_path)
+        return open_cached(cache_path)
+
+    def _evict(self, keep=None):
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                full = os.path.join(self.cache_dir, name)
+                if not name.endswith('.npy') or full == keep: continue
+                try:
+                    st = os.stat(full)
+                    entries.append((st.st_mtime, st.st_size, full))
+                except FileNotFoundError: pass
+            total = sum(e[1] for e in entries) + (os.path.getsize(keep) if keep else 0)
+            for _, size, full in sorted(entries):
+                if total <= self.max_bytes: break
+                # 正在使用的映射在 POSIX 上不受删除影响；Windows 上删除失败则留到下次
+                try:
+                    os.remove(full)
+                    total -= size
+                except OSError: pass
+
+def open_cached(cache_path):
+    return np.load(cache_path, mmap_mode='c')
\ No newline at end of file
@@ -1,45 +1,165 @@
 import os
+import atexit
+import threading
+import multiprocessing
 import numpy as np
 import noisereduce as nr
 import soundfile as sf
-from pydub import AudioSegment
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# [新增] 块级降噪的进程池 (所有 AudioEnhancer 共用，首次并行处理时创建)
+_POOL = None
+# 并行分支 (Enhancer / asr_clean / full_clean) 可能同时取用进程池
+_POOL_LOCK = threading.Lock()
+# [新增] 进程级覆盖 (批处理的工作进程设为 1，避免 N 个工作进程各自再启动降噪进程)；
+# 由环境变量 IMA_ENHANCE_WORKERS 传入，调用方无需为此导入本模块 (及 noisereduce)
+_DEFAULT_WORKERS = int(os.environ["IMA_ENHANCE_WORKERS"]) if os.environ.get("IMA_ENHANCE_WORKERS") else None
+
+def default_workers():
+    """留一个核给界面 / Whisper，最多 4 个进程 (noisereduce 单块内部是单线程的)"""
+    if _DEFAULT_WORKERS is not None: return _DEFAULT_WORKERS
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+def set_default_workers(workers):
+    global _DEFAULT_WORKERS
+    _DEFAULT_WORKERS = workers
+
+def _mp_context():
+    """
+    不使用 fork：调用方进程里已有界面、Whisper 工作线程与 torch 线程，fork 后子进程可能死锁。
+    POSIX 上用 forkserver (服务进程预先导入本模块，之后按需派生)，Windows 上用 spawn。
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+def _pool(workers):
+    """
+    进程池只创建一次 (在锁内)，之后不再重建：其他分支可能正在向它提交块。
+    各调用方的并行度由在途块数 (2 x workers) 控制。
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=max(workers, default_workers()), mp_context=_mp_context())
+        return _POOL
+
+@atexit.register
+def _shutdown_pool():
+    if _POOL is not None: _POOL.shutdown(wait=False, cancel_futures=True)
+
+def _reduce_block(block, sr, noise_clip=None):
+    """
+    工作进程中执行的单块降噪 (模块级函数，便于 pickle)
+    [修改] 给定 noise_clip 时使用 stationary 模式，以整段录音共用的噪声样本为参照，不再逐块重新估计噪声
+    """
+    if noise_clip is None: return np.asarray(nr.reduce_noise(y=block, sr=sr), dtype=np.float32)
+    return np.asarray(nr.reduce_noise(y=block, sr=sr, y_noise=noise_clip, stationary=True), dtype=np.float32)
 
 class AudioEnhancer:
-    def __init__(self, sr=16000):
+    def __init__(self, sr=16000, workers=None):
         self.sr = sr
+        # 并行降噪的进程数；1 表示在当前线程中逐块处理
+        self.workers = workers or default_workers()
 
-    def reduce_noise(self, audio_data):
+    def reduce_noise(self, audio_data, token=None, progress_cb=None, block_sec=30.0, overlap_sec=1.0, out=None, noise=None):
         """
         [新增] 直接对 numpy 数组进行降噪处理，符合项目缓解复杂环境噪声的策略 [cite: 31, 32]
+        [修改] 长音频按块处理 (块间线性交叉淡化)，块在进程池中并行降噪，结果按顺序重叠相加
+        :param token: 取消令牌 (需提供 check())，可选
+        :param progress_cb: 进度回调 progress_cb(0~1)，可选
+        :param out: 可选的预分配 float32 输出数组 (长度与输入相同)
+        :param noise: 可选的 NoiseProfile，见 noise_profile.py
+        """
+        n = len(audio_data)
+        if out is None: out = np.empty(n, dtype=np.float32)
+        read = lambda s, e: audio_data[s:e]
+        for start, chunk in self.iter_reduce(read, n, token, progress_cb, block_sec, overlap_sec, noise):
+            out[start:start + len(chunk)] = chunk
+        return out
+
+    def iter_reduce(self, read, n, token=None, progress_cb=None, block_sec=30.0, overlap_sec=1.0, noise=None):
+        """
+        [新增] 流式块降噪：read(start, end) 按需读取输入，按时间顺序产出已定稿的 (start, 输出片段)。
+        同时在途的块不超过 2 x workers 个，峰值内存与录音时长无关；输出可直接写盘或交给下一阶段。
         """
-        # 使用 noisereduce 库处理平稳噪声 
-        reduced_audio = nr.reduce_noise(y=audio_data, sr=self.sr)
-        return reduced_audio
-    
-    def process_file(self, input_path, output_path):
+        block = int(block_sec * self.sr)
+        overlap = int(overlap_sec * self.sr)
+        clip = None if noise is None else noise.clip
+        if n <= block + overlap:
+            if token: token.check()
+            # 使用 noisereduce 库处理平稳噪声 
+            reduced_audio = _reduce_block(np.asarray(read(0, n), dtype=np.float32), self.sr, clip)
+            if progress_cb: progress_cb(1.0)
+            yield 0, reduced_audio
+            return
+
+        hop = block - overlap
+        ramp = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)
+        pool = _pool(self.workers) if self.workers > 1 else None
+        pending = deque()
+        it = iter(range(0, n - overlap, hop))
+
+        def submit():
+            start = next(it, None)
+            if start is None: return
+            if token: token.check()
+            y = np.asarray(read(start, min(start + block, n)), dtype=np.float32)
+            pending.append((start, pool.submit(_reduce_block, y, self.sr, clip) if pool else _reduce_block(y, self.sr, clip)))
+
+        try:
+            for _ in range(2 * self.workers if pool else 1): submit()
+            tail = None
+            while pending:
+                start, fut = pending.popleft()
+                y = fut.result() if pool else fut
+                # 取走一个结果就补提交一个，保持进程池满载
+                submit()
+                end = start + len(y)
+                if start > 0: y[:overlap] = y[:overlap] * ramp + tail
+                if end < n:
+                    tail = y[-overlap:] * (1.0 - ramp)
+                    y = y[:-overlap]
+                if progress_cb: progress_cb(end / n)
+                yield start, y
+        finally:
+            if pool:
+                for _, fut in pending: fut.cancel()
+
+    def process_file(self, input_path, output_path, block_sec=30.0):
         """
         处理离线文件：读取 -> 降噪 -> 增益增强 -> 保存
+        [修改] 按块读写，内存占用与文件长度无关：第一遍降噪写盘并记录峰值，第二遍归一化
         """
         # 1. 读取音频 (符合 FR1)
-        audio, sr = sf.read(input_path)
-        
-        # 确保是单声道
-        if len(audio.shape) > 1:
-            audio = np.mean(audio, axis=1)
-
-        # 2. 降噪处理 (符合 Mitigation 32)
-        print(f"正在为 {input_path} 进行降噪...")
-        reduced_audio = nr.reduce_noise(y=audio, sr=self.sr)
-
-        # 3. 增益增强 (提高后续 ASR 的准确度)
-        # 将数据转换回 int16 以便 pydub 处理音量平衡
-        audio_int16 = (reduced_audio * 32767).astype(np.int16)
-        segment = AudioSegment(audio_int16.tobytes(), frame_rate=self.sr, sample_width=2, channels=1)
-        
-        # 归一化到 -20dBFS
-        normalized_segment = segment.normalize(headroom=0.1)
-        
+        with sf.SoundFile(input_path) as src:
+            n, channels = src.frames, src.channels
+            def read(s, e):
+                src.seek(s)
+                audio = src.read(e - s, dtype='float32')
+                # 确保是单声道
+                return audio.mean(axis=1) if channels > 1 else audio
+
+            # 2. 降噪处理 (符合 Mitigation 32)
+            print(f"正在为 {input_path} 进行降噪...")
+            peak = 0.0
+            with sf.SoundFile(output_path, 'w', samplerate=self.sr, channels=1, subtype='FLOAT') as dst:
+                for _, chunk in self.iter_reduce(read, n, block_sec=block_sec):
+                    peak = max(peak, float(np.max(np.abs(chunk))) if len(chunk) else 0.0)
+                    dst.write(chunk)
+
+        # 3. 增益增强 (提高后续 ASR 的准确度)：归一化到峰值 -0.1 dBFS (同 pydub normalize(headroom=0.1))
+        if peak > 0:
+            gain = 10 ** (-0.1 / 20) / peak
+            step = int(block_sec * self.sr)
+            with sf.SoundFile(output_path, 'r+') as f:
+                for s in range(0, f.frames, step):
+                    f.seek(s)
+                    chunk = f.read(step, dtype='float32')
+                    f.seek(s)
+                    f.write(chunk * gain)
         # 4. 保存结果到 resource 文件夹
-        enhanced_audio = np.array(normalized_segment.get_array_of_samples()).astype(np.float32) / 32767.0
-        sf.write(output_path, enhanced_audio, self.sr)
         print(f"处理完成！已保存至: {output_path}")
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+import hashlib
+import numpy as np
+
+from .vad_engine import frame_matrix
+
+class NoiseProfile:
+    """
+    平稳噪声样本 (空调、投影仪等)：取录音中最安静的若干帧拼接而成，
+    作为 noisereduce stationary 模式的 y_noise。同一录音 / 同一会议室只需估计一次。
+    """
+
+    def __init__(self, clip, sr, level_db, source=None):
+        self.clip = np.asarray(clip, dtype=np.float32)
+        self.sr = int(sr)
+        self.level_db = float(level_db)
+        self.source = source
+        # 内容摘要，参与降噪结果的去重 key
+        self.id = hashlib.blake2b(self.clip.tobytes(), digest_size=8).hexdigest()
+
+    @classmethod
+    def estimate(cls, audio_np, sr, seconds=5.0, frame_ms=30, source=None):
+        """选取能量最低的帧 (总计约 seconds 秒，按时间顺序拼接)；数字静音 (全零) 帧不计入"""
+        frame_len = int(sr * frame_ms / 1000)
+        frames = frame_matrix(audio_np, frame_len)
+        if len(frames) == 0: return None
+        energy_db = 10.0 * np.log10(np.einsum('ij,ij->i', frames, frames) / frame_len + 1e-10)
+        candidates = np.flatnonzero(energy_db > -90.0)
+        if len(candidates) == 0: candidates = np.arange(len(frames))
+        k = max(1, min(len(candidates), int(seconds * 1000 / frame_ms)))
+        idx = np.sort(candidates[np.argpartition(energy_db[candidates], k - 1)[:k]])
+        return cls(frames[idx].reshape(-1), sr, float(np.median(energy_db[idx])), source)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, clip=self.clip, sr=self.sr, level_db=self.level_db, source=str(self.source or ""))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['clip'], int(data['sr']), float(data['level_db']), str(data['source']) or None)
+
+    def __repr__(self):
+        return f"NoiseProfile({len(self.clip) / self.sr:.1f}s @ {self.level_db:.1f} dB, {self.source or 'recording'})"
\ No newline at end of file
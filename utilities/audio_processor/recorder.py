@@ -1,38 +1,130 @@
 import os
-import wave
 import threading
+import numpy as np
 import pyaudio
 import webrtcvad
 from datetime import datetime
 
+from .wav_writer import WavStreamWriter, repair_header
+from .ring_buffer import RingBuffer
+from .vad_engine import save_index
+
 class RealTimeAudioProvider:
-    def __init__(self, sr=16000, chunk_ms=30, resource_path="resource"):
+    def __init__(self, sr=16000, chunk_ms=30, resource_path="resource", ring_sec=30.0):
         self.sr = sr
         self.chunk_size = int(sr * chunk_ms / 1000)
-        self.vad = webrtcvad.Vad(3)
+        # [修改] 录音时逐帧 (chunk_ms) 判决，停止时写出语音索引 <录音名>.vad.npz，离线 VAD 节点直接复用
+        self.vad_aggressiveness = 3
+        self.vad = webrtcvad.Vad(self.vad_aggressiveness)
+        self.vad_mask = bytearray()
         self.is_running = False
-        self.all_frames = []
         self.resource_path = resource_path
         self.custom_filename = None
+        # [新增] 当前 (或最近一次) 录音文件路径，开始录音时即确定
+        self.path = None
+        # [新增] 流式模式下每个录音块的回调 on_chunk(pcm_bytes)，在录音线程中调用，不能阻塞
+        self.on_chunk = None
+        # [新增] 回调模式采集：PortAudio 线程写入环形缓冲区 (可容纳 ring_sec 秒积压)，录音线程取出写盘
+        self.ring_sec = ring_sec
+        self.ring = None
+        self.stats = self._new_stats()
+
+    @staticmethod
+    def _new_stats():
+        # overflows: 驱动报告的输入溢出次数；dropped_frames: 环形缓冲区满而丢弃的采样数；
+        # latency: ADC 采样到回调的延迟；backlog: 环形缓冲区中尚未写盘的积压
+        return {'callbacks': 0, 'overflows': 0, 'dropped_frames': 0,
+                'latency_ms': 0.0, 'max_latency_ms': 0.0}
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio 回调 (音频线程)：只记账并拷贝进环形缓冲区，不能阻塞"""
+        st = self.stats
+        st['callbacks'] += 1
+        if status & pyaudio.paInputOverflow: st['overflows'] += 1
+        st['dropped_frames'] += self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        adc, now = time_info.get('input_buffer_adc_time', 0), time_info.get('current_time', 0)
+        # 部分声卡驱动不提供时间戳 (为 0)
+        if adc > 0 and now >= adc:
+            st['latency_ms'] = (now - adc) * 1000
+            st['max_latency_ms'] = max(st['max_latency_ms'], st['latency_ms'])
+        return (None, pyaudio.paContinue)
 
     def _record_loop(self):
         p = pyaudio.PyAudio()
+        # [修改] 回调模式取代阻塞的 stream.read()：录音线程被挤占时不再静默丢失音频
         stream = p.open(format=pyaudio.paInt16, channels=1, rate=self.sr,
-                        input=True, frames_per_buffer=self.chunk_size)
-        
-        while self.is_running:
-            data = stream.read(self.chunk_size, exception_on_overflow=False)
-            self.all_frames.append(data)
-                
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-        self._save_to_file()
+                        input=True, frames_per_buffer=self.chunk_size, stream_callback=self._callback)
+        # [修改] 不再把整场录音累积在内存中：每块经有界队列交给后台线程写盘，崩溃时已录部分仍可播放
+        writer = WavStreamWriter(self.path, self.sr)
+        try:
+            stream.start_stream()
+            while self.is_running:
+                self._drain(writer, timeout=0.1)
+        except Exception as e:
+            # [新增] 写盘失败 (磁盘已满等) 或 on_chunk 出错：停止录音，已写入的部分照常收尾
+            print(f"[Recorder] Recording stopped: {e}")
+            self.is_running = False
+        finally:
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
+            try:
+                # 回调已停止，取完环形缓冲区中的剩余数据 (写入线程已出错时不再写)
+                while writer.error is None and self._drain(writer, timeout=0, partial=True): pass
+            except Exception as e:
+                print(f"[Recorder] Failed to flush remaining audio: {e}")
+            finally:
+                # [修改] 无论上面是否出错都关闭文件、回填 WAV 头并写出语音索引
+                self._finish(writer)
+                print(f">>> {self.stats_line()}")
+
+    def _drain(self, writer, timeout, partial=False):
+        samples = self.ring.read(self.chunk_size, timeout, partial)
+        if samples is None: return False
+        data = samples.tobytes()
+        writer.write(data)
+        # 尾部不足一帧的数据不做判决 (webrtcvad 只接受 10/20/30 ms 的帧)
+        if len(samples) == self.chunk_size:
+            try: self.vad_mask.append(self.vad.is_speech(data, self.sr))
+            except Exception: self.vad_mask.append(0)
+        if self.on_chunk: self.on_chunk(data)
+        return True
+
+    def capture_stats(self):
+        """采集统计的快照 (供界面轮询)"""
+        st = dict(self.stats)
+        ring = self.ring
+        if ring is None: return dict(st, captured_sec=0.0, backlog_ms=0.0, max_backlog_ms=0.0)
+        st['captured_sec'] = ring.head / self.sr
+        st['backlog_ms'] = len(ring) / self.sr * 1000
+        st['max_backlog_ms'] = ring.peak / self.sr * 1000
+        return st
 
-    def _save_to_file(self):
-        if not self.all_frames:
+    def stats_line(self):
+        st = self.capture_stats()
+        return (f"[Recorder] {st['captured_sec']:.1f}s captured | overflows {st['overflows']} | "
+                f"dropped {st['dropped_frames'] / self.sr:.2f}s | latency {st['latency_ms']:.0f} ms "
+                f"(max {st['max_latency_ms']:.0f}) | backlog max {st['max_backlog_ms']:.0f} ms")
+
+    def _finish(self, writer):
+        try: duration = writer.close()
+        except Exception as e:
+            duration = writer.duration
+            print(f"[Recorder] Failed to close {os.path.basename(writer.path)}: {e}")
+            try: repair_header(writer.path)
+            except OSError: pass
+        self.custom_filename = None
+        if writer.bytes_written == 0:
+            os.remove(writer.path)
             return
-            
+        try:
+            save_index(writer.path, np.frombuffer(bytes(self.vad_mask), dtype=np.uint8).astype(bool),
+                       self.chunk_size, self.sr, self.vad_aggressiveness, writer.bytes_written // 2)
+        except OSError as e:
+            print(f"[Recorder] Failed to write speech index: {e}")
+        print(f"\n>>> 录音已妥善保存至: {writer.path} ({duration:.1f}s)")
+
+    def _new_path(self):
         # --- 修改开始: 确保保存到 resource/raw 目录 ---
         raw_dir = os.path.join(self.resource_path, "raw")
         if not os.path.exists(raw_dir):
@@ -46,20 +138,15 @@ class RealTimeAudioProvider:
             
         full_path = os.path.join(raw_dir, file_name)
         # --- 修改结束 ---
-        
-        with wave.open(full_path, 'wb') as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(self.sr)
-            wf.writeframes(b''.join(self.all_frames))
-        
-        print(f"\n>>> 录音已妥善保存至: {full_path} ")
-        self.all_frames = []
-        self.custom_filename = None 
+        return full_path
 
     def start(self, filename=None):
         self.is_running = True
         self.custom_filename = filename
+        self.path = self._new_path()
+        self.ring = RingBuffer(int(self.ring_sec * self.sr))
+        self.stats = self._new_stats()
+        self.vad_mask = bytearray()
         self.thread = threading.Thread(target=self._record_loop, daemon=True)
         self.thread.start()
 
@@ -0,0 +1,53 @@
+import threading
+import numpy as np
+
+class RingBuffer:
+    """
+    [新增] 预分配的 int16 环形缓冲区 (单生产者 / 单消费者)。
+    PortAudio 回调线程写入：只做一次数组拷贝，不分配内存、不等待；缓冲区满时丢弃新数据并返回丢弃数。
+    录音线程读出，被 GIL / 界面 / Whisper 挤占时数据暂存在这里，而不是在声卡驱动中溢出。
+    [修改] 锁只保护 head / tail 的读写，数据拷贝在锁外进行：生产者只写 [head, tail + capacity)，
+           消费者只读 [tail, head)，两段互不重叠，回调线程不会等待消费者的拷贝。
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buf = np.zeros(self.capacity, dtype=np.int16)
+        # 累计写入 / 读出的采样数 (取模得到环内位置)
+        self.head = 0
+        self.tail = 0
+        # 最大积压 (采样数)
+        self.peak = 0
+        self.cond = threading.Condition()
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def write(self, samples):
+        """:return: 因缓冲区已满而丢弃的采样数"""
+        with self.cond:
+            n = min(len(samples), self.capacity - (self.head - self.tail))
+        i = self.head % self.capacity
+        first = min(n, self.capacity - i)
+        self.buf[i:i + first] = samples[:first]
+        self.buf[:n - first] = samples[first:n]
+        with self.cond:
+            self.head += n
+            self.peak = max(self.peak, self.head - self.tail)
+            self.cond.notify()
+        return len(samples) - n
+
+    def read(self, n, timeout=None, partial=False):
+        """
+        等待至少 n 个采样后读出 n 个 (partial=True 时有多少读多少，最多 n 个)
+        :return: int16 数组；超时仍不足时返回 None
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.head - self.tail >= (1 if partial else n), timeout): return None
+            n = min(n, self.head - self.tail)
+        i = self.tail % self.capacity
+        first = min(n, self.capacity - i)
+        out = np.concatenate([self.buf[i:i + first], self.buf[:n - first]])
+        with self.cond:
+            self.tail += n
+        return out
\ No newline at end of file
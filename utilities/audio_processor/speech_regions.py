@@ -0,0 +1,96 @@
+import numpy as np
+
+class SpeechRegions:
+    """
+    VAD 输出的语音区间索引：原始时间轴上若干不重叠、有序的 [start, end) 采样区间。
+    与拼接后的 _vad.wav 不同，下游节点据此跳过静音，同时保留真实的会议时间坐标。
+    """
+
+    def __init__(self, starts, ends, sr, total):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.sr = int(sr)
+        # 原始音频的总采样数
+        self.total = int(total)
+
+    @classmethod
+    def from_mask(cls, mask, frame_len, sr, total, pad_sec=0.1, merge_gap_sec=0.3):
+        """
+        由逐帧语音标记构造区间：每段两端各外扩 pad_sec，间隔小于 merge_gap_sec 的相邻区间合并
+        :param mask: bool 数组，第 i 帧覆盖采样 [i*frame_len, (i+1)*frame_len)
+        """
+        m = np.concatenate([[False], np.asarray(mask, dtype=bool), [False]])
+        edges = np.flatnonzero(m[1:] != m[:-1])
+        starts, ends = edges[0::2] * frame_len, edges[1::2] * frame_len
+        pad = int(pad_sec * sr)
+        starts = np.maximum(starts - pad, 0)
+        ends = np.minimum(ends + pad, total)
+        if len(starts) > 1:
+            # 外扩后重叠或间隔过小的区间合并
+            keep = np.concatenate([[True], starts[1:] - ends[:-1] > int(merge_gap_sec * sr)])
+            idx = np.flatnonzero(keep)
+            starts = starts[idx]
+            ends = np.maximum.reduceat(ends, idx)
+        return cls(starts, ends, sr, total)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def speech_samples(self):
+        return int(np.sum(self.ends - self.starts))
+
+    @property
+    def speech_sec(self):
+        return self.speech_samples / self.sr
+
+    @property
+    def ratio(self):
+        """语音占比 (0~1)"""
+        return self.speech_samples / self.total if self.total else 0.0
+
+    def clip(self, start, end):
+        """
+        与采样区间 [start, end) 求交
+        :return: (starts, ends) 两个数组，仅包含与该区间重叠的部分
+        """
+        lo = np.searchsorted(self.ends, start, side='right')
+        hi = np.searchsorted(self.starts, end, side='left')
+        return np.maximum(self.starts[lo:hi], start), np.minimum(self.ends[lo:hi], end)
+
+    def speech_in(self, start, end):
+        """[start, end) 内的语音采样数"""
+        s, e = self.clip(start, end)
+        return int(np.sum(e - s))
+
+    def trim(self, start, end):
+        """
+        把 [start, end) 收缩到其中第一段语音的起点与最后一段语音的终点
+        :return: (start, end)；区间内没有语音时返回 None
+        """
+        s, e = self.clip(start, end)
+        if len(s) == 0: return None
+        return int(s[0]), int(e[-1])
+
+    def chunks(self, max_sec=30.0, max_gap_sec=2.0):
+        """
+        把间隔不超过 max_gap_sec 的相邻区间合并成不超过 max_sec 的转写块 (单个超长区间按 max_sec 切开)
+        :return: [(start, end)] 采样坐标
+        """
+        limit, max_gap = int(max_sec * self.sr), int(max_gap_sec * self.sr)
+        out = []
+        for s, e in zip(self.starts.tolist(), self.ends.tolist()):
+            if out and e - out[-1][0] <= limit and s - out[-1][1] <= max_gap:
+                out[-1] = (out[-1][0], e)
+                continue
+            while e - s > limit:
+                out.append((s, s + limit)); s += limit
+            out.append((s, e))
+        return out
+
+    def to_seconds(self):
+        """[(start_s, end_s)]，供日志与导出使用"""
+        return [(round(s / self.sr, 2), round(e / self.sr, 2)) for s, e in zip(self.starts.tolist(), self.ends.tolist())]
+
+    def __repr__(self):
+        return f"SpeechRegions({len(self)} regions, {self.speech_sec:.1f}s speech / {self.total / self.sr:.1f}s)"
\ No newline at end of file
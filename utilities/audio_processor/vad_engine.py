@@ -0,0 +1,171 @@
+import os
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# 不同灵敏度 (0~3) 对应的能量门限：高于噪声底 hi dB 判为语音，低于 lo dB 退出语音 (滞回)
+ENERGY_THRESHOLDS_DB = {0: (6.0, 3.0), 1: (8.0, 4.0), 2: (10.0, 5.0), 3: (12.0, 6.0)}
+# 过零率高于此值的帧不能触发语音 (摩擦噪声、嘶声)，只能延续已开始的语音段
+ZCR_NOISE = 0.35
+MIN_SPEECH_DB = -60.0
+
+def frame_matrix(audio_np, frame_len):
+    """零拷贝把一维音频重排为 (帧数, frame_len) 的矩阵，末尾不足一帧的部分丢弃"""
+    x = np.ascontiguousarray(audio_np, dtype=np.float32)
+    n = len(x) // frame_len
+    return as_strided(x, shape=(n, frame_len), strides=(x.strides[0] * frame_len, x.strides[0]), writeable=False)
+
+def frame_features(frames):
+    """
+    逐帧特征 (全部向量化)
+    :return: (log_energy dB, zcr 0~1)
+    """
+    energy_db = 10.0 * np.log10(np.einsum('ij,ij->i', frames, frames) / max(frames.shape[1], 1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(frames.shape[1] - 1, 1)
+    return energy_db, zcr
+
+def _runs(mask):
+    """:return: (starts, ends) —— mask 中连续 True 区段的起止帧 [start, end)"""
+    m = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(m[1:] != m[:-1])
+    return edges[0::2], edges[1::2]
+
+def hysteresis(high, low):
+    """滞回：low 为 True 的连续区段中只要包含一个 high 帧，整段判为语音"""
+    starts, ends = _runs(low)
+    out = np.zeros(len(low), dtype=bool)
+    if len(starts) == 0: return out
+    # 用前缀和统计每个区段内的 high 帧数
+    csum = np.concatenate([[0], np.cumsum(high, dtype=np.int64)])
+    hits = csum[ends] - csum[starts]
+    keep = hits > 0
+    delta = np.zeros(len(low) + 1, dtype=np.int32)
+    np.add.at(delta, starts[keep], 1)
+    np.add.at(delta, ends[keep], -1)
+    return np.cumsum(delta[:-1]) > 0
+
+def smooth(mask, hangover, min_frames):
+    """
+    去除短于 min_frames 的语音毛刺，再把每段语音向后延长 hangover 帧 (拖尾)，
+    避免词间短停顿把一句话切碎
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if min_frames > 1:
+        starts, ends = _runs(mask)
+        short = (ends - starts) < min_frames
+        if short.any():
+            mask = mask.copy()
+            delta = np.zeros(len(mask) + 1, dtype=np.int32)
+            np.add.at(delta, starts[short], 1)
+            np.add.at(delta, ends[short], -1)
+            mask[np.cumsum(delta[:-1]) > 0] = False
+    if hangover > 0 and mask.any():
+        # 某帧在最近 hangover+1 帧内出现过语音即保持语音
+        csum = np.concatenate([[0], np.cumsum(mask, dtype=np.int64)])
+        idx = np.arange(1, len(mask) + 1)
+        mask = csum[idx] - csum[np.maximum(idx - hangover - 1, 0)] > 0
+    return mask
+
+class FrameVAD:
+    """
+    [新增] 面向长录音的帧级 VAD：输出逐帧 (默认 30 ms) 的语音布尔掩码。
+    - energy 后端：strided 帧矩阵 + 向量化能量 / 过零率，噪声底取能量的低分位数，高低双门限滞回
+    - webrtc 后端：按块 (block_sec) 转换 int16，只对帧做 is_speech 调用，不再构造逐帧的数组切片列表
+    两种后端的结果都经过去毛刺与拖尾平滑。backend='auto' 时有 webrtcvad 则用 webrtc。
+    """
+
+    def __init__(self, aggressiveness=3, sr=16000, frame_ms=30, backend="auto",
+                 hangover_ms=240, min_speech_ms=90, block_sec=60.0):
+        self.aggressiveness = int(min(max(aggressiveness, 0), 3))
+        self.sr = sr
+        self.frame_ms = frame_ms
+        self.hangover_ms = hangover_ms
+        self.min_speech_ms = min_speech_ms
+        self.block_sec = block_sec
+        self.vad = None
+        if backend in ("auto", "webrtc"):
+            try:
+                import webrtcvad
+                self.vad = webrtcvad.Vad(self.aggressiveness)
+            except ImportError:
+                if backend == "webrtc": raise
+        self.backend = "webrtc" if self.vad is not None else "energy"
+
+    def frame_len(self, sr=None):
+        return int((sr or self.sr) * self.frame_ms / 1000)
+
+    def raw_mask(self, audio_np, sr=None):
+        """未平滑的逐帧判决"""
+        sr = sr or self.sr
+        if self.backend == "webrtc": return self._webrtc_mask(audio_np, sr)
+        return self._energy_mask(frame_matrix(audio_np, self.frame_len(sr)))
+
+    def speech_mask(self, audio_np, sr=None):
+        """:return: bool 数组，第 i 帧覆盖采样 [i*frame_len, (i+1)*frame_len)"""
+        return self.smooth(self.raw_mask(audio_np, sr))
+
+    def smooth(self, raw):
+        """对逐帧原始判决 (如录音时生成的语音索引) 做去毛刺与拖尾平滑"""
+        return smooth(raw, self.hangover_ms // self.frame_ms, max(1, self.min_speech_ms // self.frame_ms))
+
+    def process(self, audio_np, sr=None):
+        """兼容旧接口：返回拼接后的语音 (会丢失时间坐标)"""
+        mask = self.speech_mask(audio_np, sr)
+        frames = frame_matrix(audio_np, self.frame_len(sr))
+        return frames[mask].reshape(-1).copy() if mask.any() else np.array([], dtype=np.float32)
+
+    def _energy_mask(self, frames):
+        if len(frames) == 0: return np.zeros(0, dtype=bool)
+        # 按块计算特征，长录音的中间矩阵 (符号位、差分) 不会随时长线性占用内存
+        step = max(1, int(self.block_sec * 1000 / self.frame_ms))
+        feats = [frame_features(frames[i:i + step]) for i in range(0, len(frames), step)]
+        energy_db = np.concatenate([f[0] for f in feats])
+        zcr = np.concatenate([f[1] for f in feats])
+        # 噪声底：能量的第 10 百分位 (会议中总有停顿)；另设绝对下限，数字静音永远不算语音
+        floor = np.percentile(energy_db, 10)
+        hi_db, lo_db = ENERGY_THRESHOLDS_DB[self.aggressiveness]
+        high = (energy_db > floor + hi_db) & (zcr < ZCR_NOISE) & (energy_db > MIN_SPEECH_DB)
+        low = energy_db > max(floor + lo_db, MIN_SPEECH_DB)
+        return hysteresis(high, low)
+
+    def _webrtc_mask(self, audio_np, sr):
+        frame_len = self.frame_len(sr)
+        n_frames = len(audio_np) // frame_len
+        block = max(1, int(self.block_sec * sr) // frame_len) * frame_len
+        n_bytes = frame_len * 2
+        out = np.zeros(n_frames, dtype=bool)
+        is_speech = self.vad.is_speech
+        for b in range(0, n_frames * frame_len, block):
+            chunk = audio_np[b:min(b + block, n_frames * frame_len)]
+            pcm = np.clip(chunk * 32767, -32768, 32767).astype(np.int16).tobytes()
+            k = b // frame_len
+            out[k:k + len(chunk) // frame_len] = [is_speech(pcm[i:i + n_bytes], sr) for i in range(0, len(pcm), n_bytes)]
+        return out
+
+# --- [新增] 录音时生成的语音索引 (旁路文件 <录音名>.vad.npz)，离线 VAD 直接复用，无需重新扫描整段音频 ---
+def index_path(audio_path):
+    return os.path.splitext(audio_path)[0] + ".vad.npz"
+
+def save_index(audio_path, raw_mask, frame_len, sr, aggressiveness, total):
+    """
+    :param raw_mask: 逐帧未平滑的 webrtc 判决
+    :param total: 录音的总采样数，用于校验索引与音频是否对应
+    """
+    path = index_path(audio_path)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, mask=np.packbits(np.asarray(raw_mask, dtype=bool)), n_frames=len(raw_mask),
+             frame_len=frame_len, sr=sr, aggressiveness=aggressiveness, total=total)
+    os.replace(tmp, path)
+    return path
+
+def load_index(audio_path):
+    """:return: {'mask', 'frame_len', 'sr', 'aggressiveness', 'total'}；没有索引或文件损坏时返回 None"""
+    path = index_path(audio_path)
+    if not os.path.exists(path): return None
+    try:
+        with np.load(path) as data:
+            index = {k: int(data[k]) for k in ('n_frames', 'frame_len', 'sr', 'aggressiveness', 'total')}
+            index['mask'] = np.unpackbits(data['mask'], count=index.pop('n_frames')).astype(bool)
+        return index
+    except (OSError, ValueError, KeyError):
+        return None
\ No newline at end of file
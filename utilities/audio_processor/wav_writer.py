@@ -0,0 +1,107 @@
+import os
+import wave
+import time
+import queue
+import struct
+import threading
+
+_END = None
+
+class WavStreamWriter:
+    """
+    [新增] 边录边写的 WAV 写入器：录音线程只把 PCM 块放进有界队列，后台线程批量写盘。
+    wave 模块在每次写入后回填 RIFF / data 长度，另每隔 sync_sec 秒 fsync 一次，
+    程序崩溃或断电时最多丢失最后 sync_sec 秒，文件始终可以直接播放；内存占用与录音时长无关。
+    """
+
+    def __init__(self, path, sr=16000, channels=1, sampwidth=2, max_queue=512, sync_sec=1.0):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.sr = sr
+        self.sync_sec = sync_sec
+        self.block_align = channels * sampwidth
+        self.bytes_written = 0
+        self.error = None
+        self._f = open(path, 'wb')
+        self._wav = wave.open(self._f, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(sampwidth)
+        self._wav.setframerate(sr)
+        # 立即写出头部，空文件也是合法的 WAV
+        self._wav.writeframes(b'')
+        self._q = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="wav-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def duration(self):
+        return self.bytes_written / self.block_align / self.sr
+
+    def write(self, pcm):
+        """
+        录音线程调用；队列满 (磁盘长时间阻塞) 时等待，而不是丢弃音频。
+        [修改] 等待期间定期检查写入线程是否已出错，出错时抛出而不是永远阻塞
+        """
+        while True:
+            if self.error: raise self.error
+            try:
+                self._q.put(pcm, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        last_sync = time.monotonic()
+        try:
+            while True:
+                batch = [self._q.get()]
+                # 一次取走队列中已有的全部块，合并成一次写入
+                while batch[-1] is not _END:
+                    try: batch.append(self._q.get_nowait())
+                    except queue.Empty: break
+                done = batch[-1] is _END
+                data = b''.join(batch[:-1] if done else batch)
+                if data:
+                    self._wav.writeframes(data)
+                    self.bytes_written += len(data)
+                now = time.monotonic()
+                if done or now - last_sync >= self.sync_sec:
+                    self._f.flush()
+                    os.fsync(self._f.fileno())
+                    last_sync = now
+                if done: return
+        except Exception as e:
+            self.error = e
+            print(f"[Recorder] Write failed: {e}")
+            # 丢弃队列中剩余的块，正在等待 put 的录音线程随即看到 error
+            while True:
+                try: self._q.get_nowait()
+                except queue.Empty: break
+
+    def close(self):
+        """写完队列中剩余的数据并关闭文件；:return: 已写入的时长 (秒)"""
+        if self._thread.is_alive():
+            self._q.put(_END)
+            self._thread.join()
+        try: self._wav.close()
+        finally: self._f.close()
+        return self.duration
+
+def repair_header(path):
+    """
+    修复异常中断的录音：按实际文件长度回填 RIFF / data 长度 (仅处理 44 字节的标准 PCM 头)。
+    :return: 是否修改了文件
+    """
+    size = os.path.getsize(path)
+    if size < 44: return False
+    with open(path, 'r+b') as f:
+        head = f.read(44)
+        if head[:4] != b'RIFF' or head[8:16] != b'WAVEfmt ' or head[36:40] != b'data': return False
+        if struct.unpack('<I', head[16:20])[0] != 16: return False
+        riff, data = struct.unpack('<I', head[4:8])[0], struct.unpack('<I', head[40:44])[0]
+        block_align = struct.unpack('<H', head[32:34])[0] or 1
+        actual = (size - 44) // block_align * block_align
+        if riff == 36 + actual and data == actual: return False
+        f.seek(4); f.write(struct.pack('<I', 36 + actual))
+        f.seek(40); f.write(struct.pack('<I', actual))
+    return True
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import threading
+import numpy as np
+
+class IVFIndex:
+    """
+    [新增] 倒排文件 (IVF) 近似最近邻索引：球面 k-means 把已录入声纹分到 n_lists 个簇，
+    查询时只对最近的 nprobe 个簇内的声纹做精确余弦打分，全公司规模 (数千人) 的声纹库不必与每个窗口逐一比较。
+    索引只记录 SQLite 行 id 与所属簇，向量本身仍来自 SpeakerMatrix；录入 / 删除时增量分配，
+    规模较训练时变化一倍以上才需要重新训练。
+    """
+
+    def __init__(self, centroids, ids, lists, trained_on):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lists = np.asarray(lists, dtype=np.int32)
+        self.trained_on = int(trained_on)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids, vectors, n_lists=None, iters=15, seed=0):
+        """vectors: (S, D) 已归一化的声纹；n_lists 默认约为 2·sqrt(S)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        n_lists = max(1, min(n, n_lists or int(2 * np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(n, n_lists, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            counts = np.bincount(assign, minlength=n_lists)
+            # 空簇重新取一个随机声纹作为中心
+            empty = counts == 0
+            sums[empty] = vectors[rng.choice(n, int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        return cls(centroids, ids, np.argmax(vectors @ centroids.T, axis=1), n)
+
+    def add(self, ids, vectors):
+        """增量加入 (已存在的 id 重新分配)"""
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        if len(ids) == 0: return
+        lists = np.argmax(np.atleast_2d(vectors) @ self.centroids.T, axis=1)
+        self.remove(ids)
+        self.ids = np.concatenate([self.ids, ids])
+        self.lists = np.concatenate([self.lists, lists.astype(np.int32)])
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, ids)
+        self.ids, self.lists = self.ids[keep], self.lists[keep]
+
+    def sync(self, ids, vectors):
+        """与声纹库对齐 (其他进程修改过数据库时)；:return: 是否有变化"""
+        ids = np.asarray(ids, dtype=np.int64)
+        stale = self.ids[~np.isin(self.ids, ids)]
+        missing = ~np.isin(ids, self.ids)
+        if len(stale): self.remove(stale)
+        if missing.any(): self.add(ids[missing], np.asarray(vectors)[missing])
+        return bool(len(stale) or missing.any())
+
+    def needs_retrain(self, n):
+        return n > 2 * self.trained_on or n < self.trained_on // 2
+
+    def search(self, queries, vectors, rows, k=1, nprobe=8):
+        """
+        :param queries: (N, D) 已归一化的查询
+        :param vectors: 声纹矩阵；rows[j] 为 self.ids[j] 在其中的行号
+        :return: (行号 (N, k), 分数 (N, k))，按分数降序；候选不足 k 个时补 -1 / -inf
+        """
+        n_q = len(queries)
+        best_i = np.full((n_q, k), -1, dtype=np.int64)
+        best_s = np.full((n_q, k), -np.inf, dtype=np.float32)
+        if n_q == 0 or len(self.ids) == 0: return best_i, best_s
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        order = np.argsort(self.lists, kind='stable')
+        bounds = np.searchsorted(self.lists[order], np.arange(len(self.centroids) + 1))
+        # 按簇分组：探查同一簇的所有查询与簇内声纹一次矩阵乘法
+        for c in np.unique(probe):
+            members = rows[order[bounds[c]:bounds[c + 1]]]
+            if len(members) == 0: continue
+            qi = np.nonzero((probe == c).any(axis=1))[0]
+            s = queries[qi] @ vectors[members].T
+            cat_s = np.hstack([best_s[qi], s])
+            cat_i = np.hstack([best_i[qi], np.broadcast_to(members, s.shape)])
+            sel = np.argpartition(-cat_s, k - 1, axis=1)[:, :k]
+            best_s[qi] = np.take_along_axis(cat_s, sel, axis=1)
+            best_i[qi] = np.take_along_axis(cat_i, sel, axis=1)
+        order = np.argsort(-best_s, axis=1, kind='stable')
+        return np.take_along_axis(best_i, order, axis=1), np.take_along_axis(best_s, order, axis=1)
+
+    def save(self, path):
+        tmp = f"{path}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, centroids=self.centroids, ids=self.ids, lists=self.lists, trained_on=self.trained_on)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """:return: IVFIndex；文件不存在或损坏时返回 None"""
+        try:
+            with np.load(path) as z:
+                return cls(z['centroids'], z['ids'], z['lists'], int(z['trained_on']))
+        except (OSError, ValueError, KeyError):
+            return None
\ No newline at end of file
@@ -1,67 +1,109 @@
 import numpy as np
+from contextlib import nullcontext
 from .speaker_db import SpeakerDB
 
 class SpeakerEngine:
-    def __init__(self):
+    def __init__(self, db_path="resource/speakers.db"):
         # 实例化 DB 时会自动加载模型 (init -> load_model)
-        self.db = SpeakerDB()
+        self.db = SpeakerDB(db_path)
 
-    def diarize(self, audio_np, sr=16000, window_sec=1.5, step_sec=0.75):
+    def diarize(self, audio_np, sr=16000, window_sec=1.5, step_sec=0.75, auto_unload=True,
+                token=None, progress_cb=None, tracer=None, regions=None, min_speech=0.5,
+                batch_size=32, min_tail_sec=0.5, shared_features=True):
         """
         对音频进行滑窗识别，并在结束后释放显存。
+        auto_unload: 结束后归还模型 (由模型池策略决定是否真正卸载)；False 时本实例继续持有模型
+        token / progress_cb: 可选的取消令牌与进度回调，每批窗口检查一次
+        tracer: 可选，记录每批声纹提取与匹配耗时
+        regions: 可选的 SpeechRegions，语音占比不足 min_speech 的窗口跳过 (不提取声纹)，
+                 被跳过的静音处不合并相邻片段；时间坐标始终为原始音频时间
+        [新增] batch_size: 每次前向计算的窗口数 (ECAPA 整批推理，而不是每个窗口一次)
+        [修改] torch 的 CPU 线程数是进程级设置，由启动方通过 model_manager.set_torch_threads 设置一次
+        [新增] 音频末尾不足一个窗口 (但不短于 min_tail_sec) 的部分补零成窗，以相对长度告知模型
+        [新增] shared_features: 每批中相互衔接的窗口 (中间没有跳过的静音窗口) 只计算一次 Fbank 特征，
+               重叠窗口从特征矩阵中切片，特征前端不再随窗口重叠重复计算 (模型不支持时自动退回逐窗口波形)
         """
         if len(audio_np) == 0:
-            self.db.unload_model() # 安全起见
+            if auto_unload: self.db.unload_model() # 安全起见
             return []
 
         window_samples = int(window_sec * sr)
         step_samples = int(step_sec * sr)
         total_samples = len(audio_np)
-        
-        segments = []
-        
+
+        # 1. 规划窗口：(start, end)，None 为被跳过的静音断点
+        starts = list(range(0, total_samples - window_samples + 1, step_samples))
+        # 最后一个整窗未覆盖到音频末尾时才补尾窗
+        if not starts or starts[-1] + window_samples < total_samples:
+            tail = starts[-1] + step_samples if starts else 0
+            if total_samples - tail >= min_tail_sec * sr: starts.append(tail)
+        plan = []
+        # [新增] 每个窗口所属的连续段编号：遇到静音断点或与上一窗口之间有空隙时开始新的一段
+        runs = []
+        for i in starts:
+            end = min(i + window_samples, total_samples)
+            if regions is not None and regions.speech_in(i, end) < min_speech * (end - i):
+                if plan and plan[-1] is not None: plan.append(None)
+                continue
+            if not plan or plan[-1] is None or i > plan[-1][1]: runs.append(len(runs) and runs[-1] + 1)
+            else: runs.append(runs[-1])
+            plan.append((i, end))
+        windows = [w for w in plan if w is not None]
+
+        span = (lambda name, cat: tracer.span(name, cat=cat)) if tracer else (lambda name, cat: nullcontext())
+        embeddings = []
         try:
-            # 1. 滑动窗口遍历
-            for i in range(0, total_samples - window_samples + 1, step_samples):
-                chunk = audio_np[i : i + window_samples]
-                
+            hop = self.db.feature_hop() if shared_features and windows else None
+            for b in range(0, len(windows), batch_size):
+                if token: token.check()
+                if progress_cb: progress_cb(b / len(windows))
+                batch = windows[b:b + batch_size]
+                if hop:
+                    # 窗口 [i, end) 对应全局帧 i/hop ... end/hop (与单独计算该窗口的帧数相同)；
+                    # 只在连续段内共享特征，跳过的静音与窗口间的空隙不计算
+                    sliced = []
+                    with span("features", "model"):
+                        for k0 in range(len(batch)):
+                            if k0 and runs[b + k0] == runs[b + k0 - 1]: continue
+                            k1 = k0 + 1
+                            while k1 < len(batch) and runs[b + k1] == runs[b + k0]: k1 += 1
+                            g0, g1 = batch[k0][0] // hop, batch[k1 - 1][1] // hop + 1
+                            feats = self.db.compute_features(audio_np, g0, g1, sr=sr)
+                            sliced += [feats[i // hop - g0:i // hop - g0 + (end - i) // hop + 1] for i, end in batch[k0:k1]]
+                    with span(f"embedding batch ({len(batch)})", "model"):
+                        embeddings.append(self.db.embed_features(sliced))
+                    continue
+                chunks = np.zeros((len(batch), window_samples), dtype=np.float32)
+                lengths = []
+                for k, (i, end) in enumerate(batch):
+                    chunks[k, :end - i] = audio_np[i:end]
+                    lengths.append(end - i)
                 # 提取声纹 (如果模型被卸载，这里会自动重载)
-                embedding = self.db.extract_embedding_from_memory(chunk)
-                
-                # 数据库匹配 (纯 CPU)
-                name, title = self.db.match_speaker(embedding, threshold=0.30)
-                
-                if name != "Unknown":
-                    display_name = f"{name} ({title})" if title else name
-                else:
-                    display_name = "Unknown"
-                
-                start_t = i / sr
-                end_t = (i + window_samples) / sr
-                
-                segments.append({
-                    "start": float(f"{start_t:.2f}"),
-                    "end": float(f"{end_t:.2f}"),
-                    "speaker": display_name
-                })
+                with span(f"embedding batch ({len(batch)})", "model"):
+                    embeddings.append(self.db.extract_embeddings(chunks, lengths))
         finally:
-            # [关键] 任务完成或出错后，立即卸载模型，释放 GPU
-            # print("[SpeakerEngine] Task done, unloading model...")
-            self.db.unload_model()
+            # [关键] 任务完成或出错后归还模型，Auto-Unload 策略下立即释放 GPU
+            if auto_unload: self.db.unload_model()
 
-        # 2. 合并连续的相同说话人
-        if not segments:
-            return []
-            
+        # [修改] 数据库匹配 (纯 CPU)：全部窗口与声纹库一次矩阵乘法
+        with span("db match", "db"):
+            matches = self.db.match_speakers(np.concatenate(embeddings), threshold=0.30) if embeddings else []
+        names = [(f"{name} ({title})" if title else name) if name != "Unknown" else "Unknown" for name, title in matches]
+
+        it = iter(names)
+        segments = [None if w is None else {"start": float(f"{w[0] / sr:.2f}"), "end": float(f"{w[1] / sr:.2f}"),
+                                            "speaker": next(it)} for w in plan]
+
+        # 2. 合并连续的相同说话人 (None 为静音断点)
         merged = []
-        current = segments[0]
+        current = None
         
-        for next_seg in segments[1:]:
-            if next_seg['speaker'] == current['speaker']:
+        for next_seg in segments:
+            if current is not None and next_seg is not None and next_seg['speaker'] == current['speaker']:
                 current['end'] = next_seg['end']
             else:
-                merged.append(current)
+                if current is not None: merged.append(current)
                 current = next_seg
-        merged.append(current)
+        if current is not None: merged.append(current)
         
         return merged
\ No newline at end of file
@@ -0,0 +1,127 @@
+import numpy as np
+
+class SpeakerMatrix:
+    """
+    [新增] 声纹库的内存矩阵：已录入声纹按行 L2 归一化为 (S, D) float32 矩阵。
+    所有窗口与所有说话人的余弦相似度由一次矩阵乘法 (N, D) @ (D, S) 得到，取代逐窗口查询 SQLite 与 Python 循环。
+    [新增] 挂载 IVFIndex (attach_index) 后改为近似检索，只比较最近 nprobe 个簇内的声纹。
+    [新增] 多样本声纹：矩阵的每行是该说话人的中心向量；有样本 (exemplars) 时先按中心向量取前 rerank 个候选，
+           再以候选人各样本中的最高分重新排序。样本在内存中保持 int8 量化 (按说话人连续存放)，只在打分时反量化。
+    """
+
+    def __init__(self, names, titles, embeddings, dim=192, ids=None, exemplars=None, rerank=5):
+        self.names = list(names)
+        self.titles = [t if t else "" for t in titles]
+        self.ids = np.asarray(ids if ids is not None else range(len(self.names)), dtype=np.int64)
+        m = np.asarray(embeddings, dtype=np.float32).reshape(len(self.names), -1) if self.names else np.zeros((0, dim), np.float32)
+        self.matrix = _normalize(m)
+        self.index = None
+        self.nprobe = 8
+        self.rerank = rerank
+        # exemplars: (所属行号 (X,), int8 码 (X, D), 缩放 (X,))
+        self.codes = None
+        if exemplars is not None and len(exemplars[0]):
+            owner, codes, scales = (np.asarray(a) for a in exemplars)
+            order = np.argsort(owner, kind='stable')
+            self.codes = np.ascontiguousarray(codes[order], dtype=np.int8)
+            self.scales = np.asarray(scales, dtype=np.float32)[order]
+            self.offsets = np.searchsorted(owner[order], np.arange(len(self.names) + 1))
+
+    @classmethod
+    def from_rows(cls, rows, exemplar_rows=(), rerank=5):
+        """
+        rows: [(id, name, title, 中心向量 float16 BLOB)]
+        exemplar_rows: [(speaker_id, int8 BLOB, scale)]
+        """
+        ids = [r[0] for r in rows]
+        pos = {i: k for k, i in enumerate(ids)}
+        exemplar_rows = [e for e in exemplar_rows if e[0] in pos]
+        exemplars = None
+        if exemplar_rows:
+            exemplars = (np.array([pos[e[0]] for e in exemplar_rows]),
+                         np.stack([np.frombuffer(e[1], dtype=np.int8) for e in exemplar_rows]),
+                         np.array([e[2] for e in exemplar_rows], dtype=np.float32))
+        return cls([r[1] for r in rows], [r[2] for r in rows], [np.frombuffer(r[3], dtype=np.float16) for r in rows],
+                   ids=ids, exemplars=exemplars, rerank=rerank)
+
+    def attach_index(self, index, nprobe=8):
+        """index 中的 id 需与本矩阵一致 (先调用 index.sync)"""
+        pos = {int(i): r for r, i in enumerate(self.ids)}
+        self._rows = np.array([pos[int(i)] for i in index.ids], dtype=np.int64)
+        self.index, self.nprobe = index, nprobe
+
+    def __len__(self):
+        return len(self.names)
+
+    def scores(self, embeddings):
+        """:return: (N, S) 与中心向量的余弦相似度"""
+        q = _normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        return q @ self.matrix.T
+
+    def top_k(self, embeddings, k=1, exact=False):
+        """
+        :return: (索引 (N, k'), 分数 (N, k'))，按分数降序，k' = min(k, S)
+        近似检索时候选不足 k' 个的位置为 -1 / -inf；exact=True 强制精确检索 (仍做样本重排)
+        """
+        q = _normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        k = min(k, len(self))
+        if self.codes is None: return self._coarse(q, k, exact)
+        idx, top = self._coarse(q, min(max(k, self.rerank), len(self)), exact)
+        s = self._rerank(q, idx, top)
+        order = np.argsort(-s, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(s, order, axis=1)
+
+    def _coarse(self, q, k, exact):
+        """按中心向量检索"""
+        if self.index is not None and not exact and len(self):
+            return self.index.search(q, self.matrix, self._rows, k, self.nprobe)
+        s = q @ self.matrix.T
+        if k == 0: return np.zeros((len(s), 0), dtype=np.int64), np.zeros((len(s), 0), dtype=np.float32)
+        idx = np.argpartition(-s, k - 1, axis=1)[:, :k] if k < s.shape[1] else np.broadcast_to(np.arange(k), s.shape).copy()
+        top = np.take_along_axis(s, idx, axis=1)
+        order = np.argsort(-top, axis=1, kind='stable')
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def _rerank(self, q, idx, top, chunk=256):
+        """候选人的分数改为其各样本余弦相似度的最大值 (没有样本的说话人保留中心向量分数)"""
+        out = top.copy()
+        counts = np.diff(self.offsets)
+        for c0 in range(0, len(idx), chunk):
+            qi, ci = np.nonzero(idx[c0:c0 + chunk] >= 0)
+            qi += c0
+            rows = idx[qi, ci]
+            cnt = counts[rows]
+            has = cnt > 0
+            qi, ci, rows, cnt = qi[has], ci[has], rows[has], cnt[has]
+            if len(rows) == 0: continue
+            # 展开为 (查询, 样本) 对：样本下标 = 该说话人的起点 + 组内序号
+            starts = np.cumsum(cnt) - cnt
+            e = np.repeat(self.offsets[rows] - starts, cnt) + np.arange(int(cnt.sum()))
+            dots = np.einsum('ij,ij->i', q[np.repeat(qi, cnt)], self.codes[e].astype(np.float32)) * self.scales[e]
+            out[qi, ci] = np.maximum.reduceat(dots, starts)
+        return out
+
+    def match(self, embeddings, threshold=0.25):
+        """:return: 每个窗口的 (Name, Title)，最高分不超过 threshold 时为 ("Unknown", "")"""
+        idx, top = self.top_k(embeddings, 1)
+        if idx.shape[1] == 0: return [("Unknown", "")] * len(idx)
+        return [(self.names[i], self.titles[i]) if s > threshold else ("Unknown", "") for i, s in zip(idx[:, 0], top[:, 0])]
+
+def quantize(vector):
+    """[新增] 归一化后按向量对称量化为 int8：:return: (int8 BLOB, scale)，x ≈ code * scale"""
+    v = _normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+    scale = max(float(np.abs(v).max()), 1e-12) / 127.0
+    return np.round(v / scale).astype(np.int8).tobytes(), scale
+
+def dequantize(blob, scale):
+    return np.frombuffer(blob, dtype=np.int8).astype(np.float32) * scale
+
+def centroid(vectors):
+    """[新增] 各样本归一化后的均值 (再归一化)，以 float16 BLOB 存储"""
+    c = _normalize(_normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32))).mean(axis=0, keepdims=True))[0]
+    return c.astype(np.float16).tobytes()
+
+def _normalize(m):
+    norm = np.linalg.norm(m, axis=1, keepdims=True)
+    # 零向量 (异常声纹) 的相似度为 0，而不是 NaN
+    return m / np.where(norm > 0, norm, 1.0)
\ No newline at end of file
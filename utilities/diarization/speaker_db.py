@@ -3,28 +3,57 @@ import numpy as np
 import os
 import datetime
 import io
-import gc
+import threading
+from utilities.model_manager import MODELS, SPEAKER_ENCODER
+from .matcher import SpeakerMatrix, quantize, dequantize, centroid
+from .ann_index import IVFIndex
 
-# 尝试导入声纹提取模型 (SpeechBrain)
-try:
-    from speechbrain.inference.speaker import EncoderClassifier
-    import torch
-    HAS_MODEL = True
-except ImportError:
-    HAS_MODEL = False
-    print("[Warning] SpeechBrain not found. Voiceprint extraction will be simulated.")
+# [修改] SpeechBrain / torch 导入较慢，推迟到首次提取声纹时检测
+_HAS_MODEL = None
+
+def has_model():
+    global _HAS_MODEL
+    if _HAS_MODEL is None:
+        try:
+            import torch
+            from speechbrain.inference.speaker import EncoderClassifier
+            _HAS_MODEL = True
+        except ImportError:
+            _HAS_MODEL = False
+            print("[Warning] SpeechBrain not found. Voiceprint extraction will be simulated.")
+    return _HAS_MODEL
+
+# [新增] 录入人数达到该值时使用近似最近邻索引 (IVF)，以下为精确的矩阵乘法
+ANN_MIN_SPEAKERS = 2000
+ANN_NPROBE = 8
+# [新增] 每位说话人最多保留的声纹样本数；按中心向量取前 RERANK_CANDIDATES 名后用样本重排
+MAX_EXEMPLARS = 16
+RERANK_CANDIDATES = 5
+
+# [新增] 进程级声纹矩阵缓存：数据库路径 -> (文件签名, SpeakerMatrix)，GUI 与各次管道运行共享
+_MATRICES = {}
+_MATRIX_LOCK = threading.Lock()
+_INDEX_LOCK = threading.Lock()
+
+def _db_signature(path):
+    try: st = os.stat(path); return (st.st_size, st.st_mtime_ns)
+    except OSError: return None
 
 class SpeakerDB:
-    def __init__(self, db_path="resource/speakers.db"):
+    def __init__(self, db_path="resource/speakers.db", ann_min=ANN_MIN_SPEAKERS, nprobe=ANN_NPROBE, rerank=RERANK_CANDIDATES):
         self.db_path = db_path
+        # [新增] ann_min=None 时始终精确检索
+        self.ann_min = ann_min
+        self.nprobe = nprobe
+        self.rerank = rerank
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self._init_db()
-        self.classifier = None
-        self._load_model() # 初始化时加载，保证 UI 响应快
+        self.classifier = None # [修改] 首次使用时从模型池获取 (GUI 启动后由后台线程预热)
 
     def _init_db(self):
         """初始化 SQLite 数据库"""
-        conn = sqlite3.connect(self.db_path)
+        # [修改] 自动提交模式，迁移由显式的 BEGIN IMMEDIATE 事务保护 (多个进程同时打开时只有一个执行迁移)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS speakers (
@@ -32,59 +61,183 @@ class SpeakerDB:
                 name TEXT NOT NULL UNIQUE,
                 title TEXT,
                 embedding BLOB NOT NULL,
+                created_at TEXT,
+                centroid BLOB
+            )
+        ''')
+        # [新增] 多样本声纹：int8 量化的样本 (centroid 为 float16 中心向量；speakers.embedding 为旧版 float32 单声纹列，
+        #        保留并随中心向量更新，旧版程序仍可读取，直到显式调用 compact)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS exemplars (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                speaker_id INTEGER NOT NULL,
+                embedding BLOB NOT NULL,
+                scale REAL NOT NULL,
                 created_at TEXT
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_exemplars_speaker ON exemplars (speaker_id)")
         # 自动迁移
-        cursor.execute("PRAGMA table_info(speakers)")
-        columns = [info[1] for info in cursor.fetchall()]
-        if "title" not in columns:
-            try:
-                cursor.execute("ALTER TABLE speakers ADD COLUMN title TEXT")
-                conn.commit()
-            except Exception as e:
-                print(f"[Error] Migration failed: {e}")
-        conn.commit()
-        conn.close()
+        try:
+            columns = [info[1] for info in cursor.execute("PRAGMA table_info(speakers)").fetchall()]
+            pending = "centroid" not in columns or cursor.execute("SELECT 1 FROM speakers WHERE centroid IS NULL LIMIT 1").fetchone()
+            if "title" not in columns or pending:
+                # [新增] 修改表结构前备份 (已有备份时不覆盖，保留最早的版本)
+                backup = f"{self.db_path}.bak"
+                if pending and not os.path.exists(backup):
+                    tmp = f"{backup}.{os.getpid()}.tmp"
+                    dst = sqlite3.connect(tmp)
+                    try: conn.backup(dst)
+                    finally: dst.close()
+                    os.replace(tmp, backup)
+                cursor.execute("BEGIN IMMEDIATE")
+                # 取得写锁后重新检查：其他进程可能已完成迁移
+                columns = [info[1] for info in cursor.execute("PRAGMA table_info(speakers)").fetchall()]
+                if "title" not in columns:
+                    cursor.execute("ALTER TABLE speakers ADD COLUMN title TEXT")
+                if "centroid" not in columns:
+                    cursor.execute("ALTER TABLE speakers ADD COLUMN centroid BLOB")
+                # [新增] 旧版 float32 单声纹 -> 一个 int8 样本 + float16 中心向量 (旧列原样保留)
+                legacy = cursor.execute("SELECT id, embedding, created_at FROM speakers WHERE centroid IS NULL").fetchall()
+                for sid, blob, created in legacy:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    code, scale = quantize(vector)
+                    cursor.execute("INSERT INTO exemplars (speaker_id, embedding, scale, created_at) VALUES (?, ?, ?, ?)", (sid, code, scale, created))
+                    cursor.execute("UPDATE speakers SET centroid=? WHERE id=?", (centroid(vector), sid))
+                cursor.execute("COMMIT")
+                if legacy: print(f"[SpeakerDB] Migrated {len(legacy)} voiceprints to quantized exemplars (backup: {backup}).")
+        except Exception as e:
+            if conn.in_transaction: cursor.execute("ROLLBACK")
+            print(f"[Error] Migration failed: {e}")
+        finally:
+            conn.close()
+
+    def compact(self):
+        """
+        [新增] 显式压缩：清空旧版 float32 声纹列并 VACUUM，只保留量化样本与中心向量。
+        压缩后旧版程序无法再读取该数据库；新录入的声纹仍会写入旧列，可再次压缩。
+        :return: 释放的字节数
+        """
+        before = os.path.getsize(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE speakers SET embedding=x'' WHERE centroid IS NOT NULL")
+            conn.execute("COMMIT")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        self._invalidate()
+        return before - os.path.getsize(self.db_path)
 
     def _load_model(self):
-        """加载声纹提取模型"""
+        """[修改] 从进程级模型池取得声纹模型 (已加载时直接复用)"""
         if self.classifier is not None:
             return # 避免重复加载
 
-        if HAS_MODEL:
+        if has_model():
             try:
-                # print("[SpeakerDB] Loading model to GPU...")
-                self.classifier = EncoderClassifier.from_hparams(
-                    source="speechbrain/spkrec-ecapa-voxceleb",
-                    savedir="resource/models/spkrec-ecapa-voxceleb",
-                    run_opts={"device": "cuda" if torch.cuda.is_available() else "cpu"}
-                )
+                self.classifier = MODELS.acquire(SPEAKER_ENCODER)
             except Exception as e:
                 print(f"Error loading speaker model: {e}")
 
     def unload_model(self):
-        """[新增] 卸载模型并释放显存"""
-        if self.classifier:
-            del self.classifier
+        """[修改] 归还模型；是否真正卸载并释放显存由模型池的策略决定 (Auto-Unload / Keep Warm)"""
+        if self.classifier is not None:
             self.classifier = None
-        
-        if HAS_MODEL:
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-        # print("[SpeakerDB] Model unloaded and GPU memory cleared.")
+            MODELS.release(SPEAKER_ENCODER)
 
     def _ensure_model(self):
         """确保模型已加载（懒加载机制）"""
         if self.classifier is None:
             self._load_model()
 
+    def load_model(self):
+        """[新增] 预先取得声纹模型 (避免在第一个窗口中计入加载耗时)，用完调用 unload_model 归还"""
+        self._ensure_model()
+
     def extract_embedding_from_memory(self, audio_np):
         self._ensure_model() # 自动重载
         if not self.classifier:
             return np.random.rand(192).astype(np.float32)
-        
+        return self._encode(audio_np)
+
+    def extract_embeddings(self, chunks, lengths=None):
+        """
+        [新增] 批量提取声纹：一次前向计算整批窗口
+        :param chunks: (B, T) 数组，不足 T 的窗口尾部补零
+        :param lengths: 各窗口的有效采样数 (换算为 SpeechBrain 的相对长度，补零部分不参与统计池化)
+        :return: (B, 192) float32
+        """
+        self._ensure_model()
+        if not self.classifier:
+            return np.random.rand(len(chunks), 192).astype(np.float32)
+        import torch
+        batch = torch.from_numpy(np.ascontiguousarray(chunks, dtype=np.float32))
+        rel = None if lengths is None else torch.from_numpy(np.asarray(lengths, dtype=np.float32) / batch.shape[1])
+        if torch.cuda.is_available():
+            batch = batch.to("cuda")
+            if rel is not None: rel = rel.to("cuda")
+        with torch.inference_mode():
+            embedding = self.classifier.encode_batch(batch, rel)
+        return embedding.reshape(len(chunks), -1).cpu().numpy()
+
+    def feature_hop(self):
+        """
+        [新增] 声纹模型特征前端 (Fbank) 的帧移 (采样数)；模型不可用或不是 SpeechBrain 的
+        compute_features / mean_var_norm / embedding_model 结构时返回 None (退回整段波形推理)
+        """
+        self._ensure_model()
+        mods = getattr(self.classifier, 'mods', None)
+        if mods is None or not all(hasattr(mods, m) for m in ("compute_features", "mean_var_norm", "embedding_model")):
+            return None
+        return int(getattr(getattr(mods.compute_features, 'compute_STFT', None), 'hop_length', 160))
+
+    def compute_features(self, audio_np, g0, g1, sr=16000, block_sec=30.0):
+        """
+        [新增] 计算全局帧 [g0, g1) 的 Fbank 特征 (第 g 帧以采样 g·hop 为中心)。
+        按块计算，每块两侧多取半个 FFT 窗的真实音频作为上下文，块边界不引入补零。
+        注意：Fbank 的 top_db 截断以每次输入的最大值为参照，窗口边缘又带有真实上下文，
+        切片得到的特征与逐窗口 encode_batch 的特征并不逐位相同 (差异程度用 bench_diarize --compare-features 测量)。
+        :return: CPU 上的 (g1 - g0, n_mels) float32 张量
+        """
+        import torch
+        fbank = self.classifier.mods.compute_features
+        hop = self.feature_hop()
+        n_fft = int(getattr(getattr(fbank, 'compute_STFT', None), 'n_fft', 400))
+        pad = -(-(n_fft // 2) // hop) * hop
+        block = max(1, int(block_sec * sr) // hop)
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        out = []
+        with torch.inference_mode():
+            for b0 in range(g0, g1, block):
+                b1 = min(b0 + block, g1)
+                lo = max(b0 * hop - pad, 0)
+                hi = min((b1 - 1) * hop + pad + 1, len(audio_np))
+                seg = torch.from_numpy(np.ascontiguousarray(audio_np[lo:hi], dtype=np.float32)).unsqueeze(0).to(device)
+                j0 = (b0 * hop - lo) // hop
+                out.append(fbank(seg)[0, j0:j0 + b1 - b0].float().cpu())
+        return torch.cat(out)
+
+    def embed_features(self, feats):
+        """
+        [新增] 由 Fbank 特征切片整批提取声纹 (与 encode_batch 相同的句级归一化与 ECAPA 前向，跳过特征前端)
+        :param feats: [(n_frames_i, n_mels) 张量]，不足最长者的尾部补零并以相对长度标注
+        :return: (B, 192) float32
+        """
+        import torch
+        n = max(len(f) for f in feats)
+        batch = torch.zeros(len(feats), n, feats[0].shape[1])
+        for k, f in enumerate(feats): batch[k, :len(f)] = f
+        rel = torch.tensor([len(f) / n for f in feats])
+        if torch.cuda.is_available(): batch, rel = batch.to("cuda"), rel.to("cuda")
+        mods = self.classifier.mods
+        with torch.inference_mode():
+            embedding = mods.embedding_model(mods.mean_var_norm(batch, rel), rel)
+        return embedding.reshape(len(feats), -1).cpu().numpy()
+
+    def _encode(self, audio_np):
+        import torch
         signal = torch.from_numpy(audio_np).float().unsqueeze(0)
         # 如果模型在 GPU，确保输入也在 GPU (SpeechBrain通常自动处理，但显式转换更稳)
         if torch.cuda.is_available():
@@ -94,35 +247,93 @@ class SpeakerDB:
         return embedding.squeeze().cpu().numpy()
 
     def extract_embedding(self, audio_path):
+        # [修改] 录入声纹时临时借用模型，结束后归还 (GUI 中的实例不长期占用模型)
+        held = self.classifier is not None
         self._ensure_model()
-        if not self.classifier:
-            return np.random.rand(192).astype(np.float32)
-        signal = self.classifier.load_audio(audio_path)
-        embedding = self.classifier.encode_batch(signal)
-        return embedding.squeeze().cpu().numpy()
+        try:
+            if not self.classifier:
+                return np.random.rand(192).astype(np.float32)
+            # [修改] 与管道共用解码层：任意支持的格式 (mp3 / m4a ...) 统一解码为 16 kHz 单声道
+            from utilities.audio_processor.audio_io import decode
+            return self._encode(decode(audio_path))
+        finally:
+            if not held: self.unload_model()
 
     def add_speaker(self, name, title, audio_path):
         try:
             vector = self.extract_embedding(audio_path)
-            vector_bytes = vector.tobytes()
+            # [修改] 第一个样本以 int8 量化存入 exemplars，speakers 保存 float16 中心向量 (旧列保存 float32 声纹，兼容旧版程序)
+            code, scale = quantize(vector)
+            now = datetime.datetime.now().isoformat()
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            cursor.execute("INSERT INTO speakers (name, title, embedding, created_at) VALUES (?, ?, ?, ?)",
-                           (name, title, vector_bytes, datetime.datetime.now().isoformat()))
+            cursor.execute("INSERT INTO speakers (name, title, embedding, centroid, created_at) VALUES (?, ?, ?, ?, ?)",
+                           (name, title, np.asarray(vector, dtype=np.float32).tobytes(), centroid(vector), now))
+            sid = cursor.lastrowid
+            cursor.execute("INSERT INTO exemplars (speaker_id, embedding, scale, created_at) VALUES (?, ?, ?, ?)", (sid, code, scale, now))
             conn.commit()
             conn.close()
+            self._invalidate()
+            self._update_index(add=(sid, vector))
             return True, "Success"
         except sqlite3.IntegrityError:
             return False, f"Name '{name}' already exists."
         except Exception as e:
             return False, str(e)
 
+    def add_exemplar(self, name, audio_path):
+        """
+        [新增] 为已录入的说话人追加一段声纹样本 (不同场合 / 设备的录音)，并重新计算中心向量。
+        超过 MAX_EXEMPLARS 时丢弃与其余样本最相似 (最冗余) 的一个。
+        """
+        try:
+            vector = self.extract_embedding(audio_path)
+            code, scale = quantize(vector)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                row = cursor.execute("SELECT id FROM speakers WHERE name=?", (name,)).fetchone()
+                if not row: return False, f"Speaker '{name}' not found."
+                sid = row[0]
+                cursor.execute("INSERT INTO exemplars (speaker_id, embedding, scale, created_at) VALUES (?, ?, ?, ?)",
+                               (sid, code, scale, datetime.datetime.now().isoformat()))
+                center, n = self._refresh_centroid(cursor, sid)
+                conn.commit()
+            finally:
+                conn.close()
+            self._invalidate()
+            self._update_index(add=(sid, center))
+            return True, f"Success ({n} samples)"
+        except Exception as e:
+            return False, str(e)
+
+    @staticmethod
+    def _refresh_centroid(cursor, sid):
+        """裁剪多余样本并更新中心向量；:return: (中心向量, 样本数)"""
+        rows = cursor.execute("SELECT id, embedding, scale FROM exemplars WHERE speaker_id=? ORDER BY id", (sid,)).fetchall()
+        ids = [r[0] for r in rows]
+        vectors = np.stack([dequantize(r[1], r[2]) for r in rows])
+        while len(ids) > MAX_EXEMPLARS:
+            sims = vectors @ vectors.T
+            np.fill_diagonal(sims, -np.inf)
+            drop = int(np.argmax(sims.max(axis=1)))
+            cursor.execute("DELETE FROM exemplars WHERE id=?", (ids.pop(drop),))
+            vectors = np.delete(vectors, drop, axis=0)
+        blob = centroid(vectors)
+        center = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        cursor.execute("UPDATE speakers SET centroid=?, embedding=? WHERE id=?", (blob, center.tobytes(), sid))
+        return center, len(ids)
+
     def delete_speaker(self, name):
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        ids = [row[0] for row in cursor.execute("SELECT id FROM speakers WHERE name=?", (name,))]
         cursor.execute("DELETE FROM speakers WHERE name=?", (name,))
+        cursor.executemany("DELETE FROM exemplars WHERE speaker_id=?", [(i,) for i in ids])
         conn.commit()
         conn.close()
+        self._invalidate()
+        self._update_index(remove=ids)
 
     def update_speaker_info(self, current_name, new_name=None, new_title=None):
         if not new_name and not new_title: return False, "Nothing to update."
@@ -136,6 +347,7 @@ class SpeakerDB:
             elif new_title:
                 cursor.execute("UPDATE speakers SET title=? WHERE name=?", (new_title, current_name))
             conn.commit()
+            self._invalidate()
             return True, "Success"
         except sqlite3.IntegrityError:
             return False, f"Name '{new_name}' already exists."
@@ -152,27 +364,70 @@ class SpeakerDB:
         conn.close()
         return data
 
-    def match_speaker(self, input_embedding, threshold=0.25):
-        # 匹配不需要加载模型，纯 CPU 计算
+    def matrix(self):
+        """
+        [新增] 已录入声纹的归一化矩阵 (首次使用时从 SQLite 读取一次)。
+        本进程内的录入 / 删除 / 改名会使其失效；数据库文件被其他进程修改时按文件签名重新读取。
+        """
+        key = os.path.abspath(self.db_path)
+        sig = _db_signature(self.db_path)
+        with _MATRIX_LOCK:
+            cached = _MATRICES.get(key)
+            if cached and cached[0] == sig: return cached[1]
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, title, embedding FROM speakers")
-        rows = cursor.fetchall()
-        conn.close()
+        try:
+            rows = conn.execute("SELECT id, name, title, centroid FROM speakers WHERE centroid IS NOT NULL ORDER BY id").fetchall()
+            exemplars = conn.execute("SELECT speaker_id, embedding, scale FROM exemplars ORDER BY id").fetchall()
+        finally: conn.close()
+        matrix = SpeakerMatrix.from_rows(rows, exemplars, rerank=self.rerank)
+        if self.ann_min and len(matrix) >= self.ann_min:
+            matrix.attach_index(self._load_index(matrix), self.nprobe)
+        with _MATRIX_LOCK: _MATRICES[key] = (sig, matrix)
+        return matrix
 
-        best_score = -1.0
-        best_info = ("Unknown", "")
-
-        norm_input = np.linalg.norm(input_embedding)
-        
-        for name, title, blob in rows:
-            target_emb = np.frombuffer(blob, dtype=np.float32)
-            score = np.dot(input_embedding, target_emb) / (norm_input * np.linalg.norm(target_emb))
-            if score > best_score:
-                best_score = score
-                safe_title = title if title else ""
-                best_info = (name, safe_title)
-        
-        if best_score > threshold:
-            return best_info
-        return ("Unknown", "")
\ No newline at end of file
+    def _invalidate(self):
+        with _MATRIX_LOCK: _MATRICES.pop(os.path.abspath(self.db_path), None)
+
+    def index_path(self):
+        """[新增] 近似检索索引与数据库放在一起：speakers.db -> speakers.ivf.npz"""
+        return os.path.splitext(self.db_path)[0] + ".ivf.npz"
+
+    def _load_index(self, matrix):
+        """读取持久化的索引并与声纹库对齐；不存在或规模变化过大时重新训练"""
+        with _INDEX_LOCK:
+            index = IVFIndex.load(self.index_path())
+            changed = index is None or index.centroids.shape[1] != matrix.matrix.shape[1]
+            if changed or index.needs_retrain(len(matrix)):
+                index, changed = IVFIndex.build(matrix.ids, matrix.matrix), True
+            else:
+                changed = index.sync(matrix.ids, matrix.matrix)
+            if changed:
+                try: index.save(self.index_path())
+                except OSError as e: print(f"[SpeakerDB] Failed to save index: {e}")
+            return index
+
+    def _update_index(self, add=None, remove=None):
+        """[新增] 录入 / 删除时增量更新已持久化的索引 (尚未建立索引时无需处理)"""
+        with _INDEX_LOCK:
+            index = IVFIndex.load(self.index_path())
+            if index is None: return
+            if add is not None:
+                vec = np.asarray(add[1], dtype=np.float32).reshape(1, -1)
+                index.add([add[0]], vec / max(float(np.linalg.norm(vec)), 1e-12))
+            if remove: index.remove(remove)
+            try: index.save(self.index_path())
+            except OSError as e: print(f"[SpeakerDB] Failed to save index: {e}")
+
+    def match_speakers(self, embeddings, threshold=0.25):
+        """[新增] 整批匹配：(N, 192) 的声纹一次矩阵乘法打分，返回每个窗口的 (Name, Title)"""
+        return self.matrix().match(embeddings, threshold)
+
+    def top_speakers(self, embeddings, k=3):
+        """[新增] 每个窗口得分最高的 k 个说话人：[[(Name, Title, score), ...], ...]"""
+        m = self.matrix()
+        idx, top = m.top_k(embeddings, k)
+        return [[(m.names[i], m.titles[i], float(sc)) for i, sc in zip(row_i, row_s) if i >= 0] for row_i, row_s in zip(idx, top)]
+
+    def match_speaker(self, input_embedding, threshold=0.25):
+        # [修改] 匹配不需要加载模型，纯 CPU 计算；使用内存中的声纹矩阵，不再每次查询 SQLite
+        return self.match_speakers([input_embedding], threshold)[0]
\ No newline at end of file
@@ -38,7 +38,7 @@ class RobustMeetingExtractor:
         # 初始化客户端
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url="https://api.deepseek.com",
+            base_url=os.environ.get("IMA_LLM_BASE_URL", "https://api.deepseek.com"), # 可指向本地兼容服务 (基准测试桩)
             http_client=custom_http_client
         )
         
@@ -274,11 +274,20 @@ class RobustMeetingExtractor:
             
         return json_full_path
     
-    def process(self, input_file: str) -> Dict[str, Any]:
+    def process(self, input_file: str, token=None, progress_cb=None) -> Dict[str, Any]:
+        """
+        token: 可选取消令牌，LLM 返回后若已取消则不再保存结果
+        progress_cb: 可选进度回调 (读取 -> 请求 -> 保存)
+        """
         try:
             transcript = self.load_transcript(input_file)
+            if progress_cb: progress_cb(0.1)
             data = self.extract_to_json(transcript)
+            if token is not None and token.cancelled:
+                return {"error": "Cancelled by user."}
+            if progress_cb: progress_cb(0.9)
             self.save_results(data, input_file)
+            if progress_cb: progress_cb(1.0)
             return data
         except Exception as e:
             return {"error": str(e)}
\ No newline at end of file
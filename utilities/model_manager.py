@@ -0,0 +1,224 @@
+import gc
+import time
+import threading
+from contextlib import contextmanager
+
+# 模型卸载策略
+AUTO_UNLOAD = "auto_unload"  # 引用归零 (任务结束) 立即卸载并释放显存，即原先的 Auto-Unload 行为
+KEEP_WARM = "keep_warm"      # 跨运行常驻；超出内存预算时按 LRU 淘汰，空闲超过 idle_timeout 秒后卸载
+POLICIES = (AUTO_UNLOAD, KEEP_WARM)
+
+# 模型种类
+WHISPER = "whisper"
+SPEAKER_ENCODER = "speaker_encoder"
+
+SPEAKER_MODEL_SOURCE = "speechbrain/spkrec-ecapa-voxceleb"
+SPEAKER_MODEL_DIR = "resource/models/spkrec-ecapa-voxceleb"
+
+# 无法统计参数量时的估算值 (MB, fp32 权重)
+ESTIMATED_MB = {
+    (WHISPER, "tiny"): 150, (WHISPER, "base"): 290, (WHISPER, "small"): 970,
+    (WHISPER, "medium"): 3000, (WHISPER, "large"): 6200, (SPEAKER_ENCODER, None): 85,
+}
+
+def _device():
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def set_torch_threads(n):
+    """
+    [新增] 设置本进程 torch 的 CPU 推理线程数 (进程级设置，只在启动时调用一次，不随单次运行修改)
+    :return: 是否已设置 (未安装 torch 或 n 为空时不设置)
+    """
+    if not n: return False
+    try: import torch
+    except ImportError: return False
+    torch.set_num_threads(int(n))
+    return True
+
+def _load_whisper(size):
+    from utilities.ASR.whisper_engine import AsyncWhisperEngine
+    return AsyncWhisperEngine(model_size=size or "small")
+
+def _load_speaker_encoder(_):
+    from speechbrain.inference.speaker import EncoderClassifier
+    return EncoderClassifier.from_hparams(source=SPEAKER_MODEL_SOURCE, savedir=SPEAKER_MODEL_DIR,
+                                          run_opts={"device": _device()})
+
+def _model_mb(model):
+    """按参数量估算模型占用 (MB)；AsyncWhisperEngine 取其内部的 model"""
+    module = getattr(model, 'model', model)
+    params = getattr(module, 'parameters', None)
+    if not callable(params): return 0.0
+    try: return sum(p.numel() * p.element_size() for p in params()) / (1024 * 1024)
+    except Exception: return 0.0
+
+class ModelManager:
+    """
+    进程级模型池：Whisper (按模型大小) 与声纹编码器在各次运行、各节点之间共享，避免每次任务重新加载。
+    - acquire / release 引用计数，使用中的模型不会被卸载
+    - 加载新模型前按内存预算 (budget_mb) 以 LRU 顺序淘汰空闲模型
+    - 卸载时机由策略决定：AUTO_UNLOAD 引用归零即卸载；KEEP_WARM 常驻直到空闲超时或被淘汰
+    """
+
+    def __init__(self, policy=AUTO_UNLOAD, budget_mb=6144, idle_timeout=600):
+        self.policy = policy
+        self.budget_mb = budget_mb
+        self.idle_timeout = idle_timeout
+        self.loaders = {WHISPER: _load_whisper, SPEAKER_ENCODER: _load_speaker_encoder}
+        # AsyncWhisperEngine 的工作线程持有模型，需显式关闭
+        self.unloaders = {WHISPER: lambda engine: engine.shutdown()}
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.stats = {"loads": 0, "hits": 0, "evictions": 0}
+        self._reaper = None
+
+    def configure(self, policy=None, budget_mb=None, idle_timeout=None):
+        """切换策略 / 预算；切换到 AUTO_UNLOAD 或预算变小时立即卸载多余的空闲模型"""
+        if policy is not None and policy not in POLICIES: raise ValueError(f"Unknown model policy: {policy}")
+        with self.lock:
+            if policy is not None: self.policy = policy
+            if budget_mb is not None: self.budget_mb = budget_mb
+            if idle_timeout is not None: self.idle_timeout = idle_timeout
+        if self.policy == AUTO_UNLOAD: self.unload_idle()
+        else: self._make_room(0)
+        self._ensure_reaper()
+
+    def acquire(self, kind, variant=None):
+        """取得模型 (未加载时加载)，用完后必须调用 release"""
+        key = (kind, variant)
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        # 同一模型只加载一次；不同模型可并行加载
+        with key_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry:
+                    entry['refs'] += 1
+                    entry['last_used'] = time.monotonic()
+                    self.stats["hits"] += 1
+                    return entry['model']
+            self._make_room(ESTIMATED_MB.get(key, 0))
+            t0 = time.perf_counter()
+            model = self.loaders[kind](variant)
+            mb = _model_mb(model) or ESTIMATED_MB.get(key, 0)
+            with self.lock:
+                self.entries[key] = {'model': model, 'mb': mb, 'refs': 1, 'last_used': time.monotonic()}
+                self.stats["loads"] += 1
+            print(f"[Models] Loaded {self._name(key)} ({mb:.0f} MB) in {time.perf_counter() - t0:.1f}s")
+        # 实际占用可能大于估算值，加载后再检查一次预算
+        self._make_room(0)
+        self._ensure_reaper()
+        return model
+
+    def release(self, kind, variant=None):
+        key = (kind, variant)
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry: return
+            entry['refs'] = max(entry['refs'] - 1, 0)
+            entry['last_used'] = time.monotonic()
+            if entry['refs'] or self.policy != AUTO_UNLOAD: return
+            del self.entries[key]
+        self._unload(key, entry)
+
+    @contextmanager
+    def use(self, kind, variant=None):
+        model = self.acquire(kind, variant)
+        try:
+            yield model
+        finally:
+            self.release(kind, variant)
+
+    def warm_up(self, models, status_cb=None):
+        """
+        预先加载 [(kind, variant), ...] 并立即归还 (KEEP_WARM 策略下保持常驻)。
+        status_cb(done, total, name): 每个模型开始加载前回调，全部完成时 name 为 None
+        :return: {模型名: 耗时秒数}，加载失败的模型为 None
+        """
+        timings = {}
+        for i, (kind, variant) in enumerate(models):
+            name = self._name((kind, variant))
+            if status_cb: status_cb(i, len(models), name)
+            t0 = time.perf_counter()
+            try:
+                self.acquire(kind, variant)
+                self.release(kind, variant)
+                timings[name] = time.perf_counter() - t0
+            except Exception as e:
+                print(f"[Models] Warm-up failed ({name}): {e}")
+                timings[name] = None
+        if status_cb: status_cb(len(models), len(models), None)
+        return timings
+
+    def is_loaded(self, kind, variant=None):
+        return (kind, variant) in self.entries
+
+    def unload_idle(self, older_than=0.0):
+        """卸载所有空闲 (无引用) 且空闲时间超过 older_than 秒的模型"""
+        now = time.monotonic()
+        with self.lock:
+            victims = [(k, e) for k, e in self.entries.items()
+                       if e['refs'] == 0 and now - e['last_used'] >= older_than]
+            for k, _ in victims: del self.entries[k]
+        for k, e in victims: self._unload(k, e)
+        return len(victims)
+
+    def status(self):
+        """当前池中的模型：[{name, mb, refs, idle_s}]，供界面与日志显示"""
+        now = time.monotonic()
+        with self.lock:
+            return [{"name": self._name(k), "mb": round(e['mb']), "refs": e['refs'],
+                     "idle_s": round(now - e['last_used'])} for k, e in self.entries.items()]
+
+    def _name(self, key):
+        kind, variant = key
+        return f"{kind}-{variant}" if variant else kind
+
+    def _make_room(self, need_mb):
+        """淘汰最久未使用的空闲模型，直到 (已加载 + need_mb) 不超过预算"""
+        victims = []
+        with self.lock:
+            total = sum(e['mb'] for e in self.entries.values()) + need_mb
+            idle = sorted((e['last_used'], k) for k, e in self.entries.items() if e['refs'] == 0)
+            for _, k in idle:
+                if total <= self.budget_mb: break
+                e = self.entries.pop(k)
+                total -= e['mb']
+                victims.append((k, e))
+            self.stats["evictions"] += len(victims)
+        for k, e in victims: self._unload(k, e, reason="budget")
+        if total > self.budget_mb:
+            print(f"[Models] Warning: {total:.0f} MB in use exceeds budget {self.budget_mb} MB (all models busy).")
+
+    def _unload(self, key, entry, reason=None):
+        unloader = self.unloaders.get(key[0])
+        try:
+            if unloader: unloader(entry['model'])
+        except Exception as e:
+            print(f"[Models] Unload error ({self._name(key)}): {e}")
+        entry['model'] = None
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available(): torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        print(f"[Models] Unloaded {self._name(key)}" + (f" ({reason})" if reason else ""))
+
+    def _ensure_reaper(self):
+        """KEEP_WARM 且设置了空闲超时时，启动后台线程定期卸载空闲模型"""
+        if self.policy != KEEP_WARM or not self.idle_timeout: return
+        if self._reaper and self._reaper.is_alive(): return
+        self._reaper = threading.Thread(target=self._reap, daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        while self.policy == KEEP_WARM and self.idle_timeout:
+            time.sleep(max(1.0, min(30.0, self.idle_timeout / 4)))
+            if self.policy == KEEP_WARM and self.idle_timeout:
+                self.unload_idle(self.idle_timeout)
+
+# 进程级单例：GUI、批处理与基准测试共用
+MODELS = ModelManager()
\ No newline at end of file